@@ -1,8 +1,8 @@
 import streamlit as st
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-from tensorflow.keras.applications.efficientnet import EfficientNetB0, preprocess_input, decode_predictions
+from utils.arranque import registrar, resumen
+from utils.modelos import obtener_modelo, precargar
 
 # Configuración de la página
 st.set_page_config(page_title="Clasificador de Imágenes", layout="wide")
@@ -13,13 +13,11 @@ st.markdown("""
 Sube una imagen y el modelo preentrenado **EfficientNetB0** te dirá qué contiene.
 *Ejemplo: perros, gatos, coches, flores, etc.*
 """)
+registrar("app-1", "primer_pintado")
 
-# Cargar el modelo
-@st.cache_resource
-def load_model():
-    return EfficientNetB0(weights="imagenet")
-
-model = load_model()
+# TensorFlow y el modelo se cargan en segundo plano (registro compartido) mientras se elige la imagen;
+# local=True: la app llama al modelo directamente, también con el pool de modelos
+precargar("efficientnet", local=True)
 
 # Widget para subir la imagen
 uploaded_file = st.file_uploader("Elige una imagen...", type=["jpg", "jpeg", "png"])
@@ -32,8 +30,7 @@ if uploaded_file is not None:
     # Clasificar cuando se presione el botón
     if st.button("Clasificar"):
         st.write("🔍 Analizando...")
-
-        
+        from tensorflow.keras.applications.efficientnet import preprocess_input, decode_predictions
 
         # Preprocesar imagen
         image = image.convert("RGB")  # Elimina canal alfa si lo hay
@@ -43,6 +40,7 @@ if uploaded_file is not None:
         image_array = np.expand_dims(image_array, axis=0)
         
         # Predicción
+        model = obtener_modelo("efficientnet")
         predictions = model.predict(image_array)
         decoded_predictions = decode_predictions(predictions, top=3)[0]
 
@@ -50,6 +48,7 @@ if uploaded_file is not None:
         st.success("✅ Predicciones:")
         for i, (imagenet_id, label, prob) in enumerate(decoded_predictions):
             st.write(f"{i+1}. **{label}** (probabilidad: {prob*100:.2f}%)")
+        registrar("app-1", "primera_prediccion")
 
 # Sidebar con información adicional
 with st.sidebar:
@@ -62,3 +61,5 @@ with st.sidebar:
     """)
     st.markdown("---")
     st.markdown("👨‍💻 [Código en GitHub](https://github.com/LuisEduardoRomeroOlmos/Proyectos/tree/main)")
+    if (arranque := resumen("app-1")):
+        st.caption(arranque)
@@ -1,8 +1,8 @@
 import streamlit as st
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2, preprocess_input, decode_predictions
+from utils.arranque import registrar, resumen
+from utils.modelos import obtener_modelo, precargar
 
 # Configuración de la página
 st.set_page_config(page_title="Clasificador de Imágenes", layout="wide")
@@ -13,13 +13,11 @@ st.markdown("""
 Sube una imagen y el modelo preentrenado **MobileNetV2** te dirá qué contiene.
 *Ejemplo: perros, gatos, coches, etc.*
 """)
+registrar("app", "primer_pintado")
 
-# Cargar el modelo (se cachea para no cargarlo en cada ejecución)
-@st.cache_resource
-def load_model():
-    return MobileNetV2(weights="imagenet")
-
-model = load_model()
+# TensorFlow y el modelo se cargan en segundo plano (registro compartido) mientras se elige la imagen;
+# local=True: la app llama al modelo directamente, también con el pool de modelos
+precargar("imagenet", local=True)
 
 # Widget para subir la imagen
 uploaded_file = st.file_uploader("Elige una imagen...", type=["jpg", "jpeg", "png"])
@@ -32,7 +30,8 @@ if uploaded_file is not None:
     # Preprocesar y predecir
     if st.button("Clasificar"):
         st.write("🔍 Analizando...")
-        
+        from tensorflow.keras.applications.mobilenet_v2 import preprocess_input, decode_predictions
+
         # Redimensionar y preprocesar
         image = image.resize((224, 224))  # Tamaño esperado por MobileNetV2
         image_array = np.array(image)
@@ -40,6 +39,7 @@ if uploaded_file is not None:
         image_array = np.expand_dims(image_array, axis=0)  # Añadir dimensión batch
 
         # Hacer la predicción
+        model = obtener_modelo("imagenet")
         predictions = model.predict(image_array)
         decoded_predictions = decode_predictions(predictions, top=3)[0]  # Top 3 resultados
 
@@ -47,6 +47,7 @@ if uploaded_file is not None:
         st.success("✅ Predicciones:")
         for i, (imagenet_id, label, prob) in enumerate(decoded_predictions):
             st.write(f"{i+1}. **{label}** (probabilidad: {prob*100:.2f}%)")
+        registrar("app", "primera_prediccion")
 
 # Sidebar con información adicional
 with st.sidebar:
@@ -59,3 +60,5 @@ with st.sidebar:
     """)
     st.markdown("---")
     st.markdown("Código en [GitHub](https://github.com/LuisEduardoRomeroOlmos/Proyectos/tree/main)")
+    if (arranque := resumen("app")):
+        st.caption(arranque)
@@ -1,14 +1,12 @@
 import streamlit as st
 
-import numpy as np
+from utils.arranque import registrar, resumen
 
-from PIL import Image
+from utils.modelos import precargar
 
-import tensorflow as tf
+from utils.lotes import predecir
 
-from tensorflow.keras.models import load_model
-
-from tensorflow.keras.preprocessing import image
+from utils.preprocessing import preparar_lote
 
 
 
@@ -28,37 +26,13 @@ Sube una imagen de tu mascota y el modelo predecirá si es un **gato** o un **pe
 
 """)
 
+registrar("app2", "primer_pintado")
 
 
-# Función para cargar y preprocesar imagen desde un archivo subido
-
-def cargar_preprocesar_imagen_desde_bytes(file, tamaño=(128, 128)):
-
-    img = Image.open(file).convert("RGB")
-
-    img = img.resize(tamaño)
-
-    img_array = image.img_to_array(img)
-
-    img_array = np.expand_dims(img_array, axis=0)
-
-    img_array = img_array / 255.0
-
-    return img_array
-
 
+# El registro compartido carga TensorFlow y el modelo fine-tuned en segundo plano
 
-# Cargar el modelo fine-tuned
-
-@st.cache_resource
-
-def cargar_modelo():
-
-    return load_model("mobile_fine_tuning.keras")
-
-
-
-modelo = cargar_modelo()
+precargar("gato_perro")
 
 
 
@@ -92,13 +66,13 @@ if uploaded_file is not None:
 
             # Preprocesar la imagen
 
-            img_array = cargar_preprocesar_imagen_desde_bytes(uploaded_file)
+            img_array = preparar_lote([uploaded_file], "gato_perro")
 
 
 
             # Hacer predicción
 
-            prediction = modelo.predict(img_array)
+            prediction = predecir("gato_perro", img_array)
 
 
 
@@ -116,6 +90,8 @@ if uploaded_file is not None:
 
             st.write(f"🔢 Confianza del modelo: **{probabilidad:.2f}%**")
 
+            registrar("app2", "primera_prediccion")
+
 
 
 # Sidebar con info adicional
@@ -139,3 +115,7 @@ with st.sidebar:
     st.markdown("---")
 
     st.markdown("Código en [GitHub](https://github.com/LuisEduardoRomeroOlmos/Proyectos/tree/main)")
+
+    if (arranque := resumen("app2")):
+
+        st.caption(arranque)
@@ -1,110 +1,49 @@
+import time
 import streamlit as st
-import numpy as np
-from PIL import Image
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.applications.efficientnet import preprocess_input
-import wikipedia
+from utils.arranque import importar_en_segundo_plano, registrar, resumen
+from utils.modelos import precargar, version_perfil
+from utils.lotes import predecir
+from utils.preprocessing import preparar_lote
+from utils.cache_predicciones import en_cache
+from utils.etiquetas import titulo_wiki
+from utils.resultados import mostrar_top, top_k_nombres
+from utils.wiki import esperar_info, obtener_info_async
+from utils.metricas import etapa, mostrar_admin, observar, servir
 
 # Configuración de la página
 st.set_page_config(page_title="🦴 Clasificador de Razas de Perros", layout="wide")
+# Página de métricas oculta (?admin=<token>) y endpoint /metrics si está configurado
+mostrar_admin("app4")
+servir()
 
 st.title("🐶 Clasificador de Perros 🐾")
 st.markdown("""
 Sube una imagen de tu lomito y el modelo predecirá a cuál de las 120 razas del dataset Stanford Dogs pertenece,
 mostrando además información relevante de Wikipedia.
 """)
-
-wikipedia.set_lang("es")
+registrar("app4", "primer_pintado")
 
 # --- Funciones ---
-#def cargar_preprocesar_imagen_desde_bytes(file, tamanio=(300, 300)):
- #   img = Image.open(file).convert("RGB")
-  #  img = img.resize(tamanio)
-   # img_array = image.img_to_array(img)
-    #img_array = np.expand_dims(img_array, axis=0)
-    #img_array = img_array / 255.0
-    #return img_array
-def cargar_preprocesar_imagen_desde_bytes(file, tamanio=(300, 300)):
-    img = Image.open(file).convert("RGB")
-    img = img.resize(tamanio)
-    img_array = image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = preprocess_input(img_array)  # ⚠️ cambio importante
-    return img_array
-
-@st.cache_resource
-def cargar_modelo():
-    return load_model("Modelos/Clasificacion_perros.keras")
-
-modelo = cargar_modelo()
-
-@st.cache_data
-def nombres_perros():
-    return {
-        0: "Chihuahua", 1: "Japanese spaniel", 2: "Maltese dog", 3: "Pekinese", 4: "Shih-Tzu",
-        5: "Blenheim spaniel", 6: "Papillon", 7: "Toy terrier", 8: "Rhodesian ridgeback",
-        9: "Afghan hound", 10: "Basset", 11: "Beagle", 12: "Bloodhound", 13: "Bluetick",
-        14: "Black-and-tan coonhound", 15: "Walker hound", 16: "English foxhound",
-        17: "Redbone", 18: "Borzoi", 19: "Irish wolfhound", 20: "Italian greyhound",
-        21: "Whippet", 22: "Ibizan hound", 23: "Norwegian elkhound", 24: "Otterhound",
-        25: "Saluki", 26: "Scottish deerhound", 27: "Weimaraner", 28: "Staffordshire bullterrier",
-        29: "American Staffordshire terrier", 30: "Bedlington terrier", 31: "Border terrier",
-        32: "Kerry blue terrier", 33: "Irish terrier", 34: "Norfolk terrier", 35: "Norwich terrier",
-        36: "Yorkshire terrier", 37: "Wire-haired fox terrier", 38: "Lakeland terrier",
-        39: "Sealyham terrier", 40: "Airedale", 41: "Cairn", 42: "Australian terrier",
-        43: "Dandie Dinmont", 44: "Boston bull", 45: "Miniature schnauzer", 46: "Giant schnauzer",
-        47: "Standard schnauzer", 48: "Scotch terrier", 49: "Tibetan terrier",
-        50: "Silky terrier", 51: "Soft-coated wheaten terrier", 52: "West Highland white terrier",
-        53: "Lhasa", 54: "Flat-coated retriever", 55: "Curly-coated retriever",
-        56: "Golden retriever", 57: "Labrador retriever", 58: "Chesapeake Bay retriever",
-        59: "German short-haired pointer", 60: "Vizsla", 61: "English setter",
-        62: "Irish setter", 63: "Gordon setter", 64: "Brittany spaniel", 65: "Clumber",
-        66: "English springer", 67: "Welsh springer spaniel", 68: "Cocker spaniel",
-        69: "Sussex spaniel", 70: "Irish water spaniel", 71: "Kuvasz", 72: "Schipperke",
-        73: "Groenendael", 74: "Malinois", 75: "Briard", 76: "Kelpie", 77: "Komondor",
-        78: "Old English sheepdog", 79: "Shetland sheepdog", 80: "Collie",
-        81: "Border collie", 82: "Bouvier des Flandres", 83: "Rottweiler",
-        84: "German shepherd", 85: "Doberman", 86: "Miniature pinscher",
-        87: "Greater Swiss Mountain dog", 88: "Bernese mountain dog", 89: "Appenzeller",
-        90: "EntleBucher", 91: "Boxer", 92: "Bull mastiff", 93: "Tibetan mastiff",
-        94: "French bulldog", 95: "Great Dane", 96: "Saint Bernard", 97: "Eskimo dog",
-        98: "Malamute", 99: "Siberian husky", 100: "Affenpinscher", 101: "Basenji",
-        102: "Pug", 103: "Leonberg", 104: "Newfoundland", 105: "Great Pyrenees",
-        106: "Samoyed", 107: "Pomeranian", 108: "Chow", 109: "Keeshond",
-        110: "Brabancon griffon", 111: "Pembroke", 112: "Cardigan", 113: "Toy poodle",
-        114: "Miniature poodle", 115: "Standard poodle", 116: "Mexican hairless",
-        117: "Dingo", 118: "Dhole", 119: "African hunting dog"
-    }
-
-nombres_clases = nombres_perros()
-
-def obtener_info_wikipedia(nombre):
-    try:
-        page = wikipedia.page(nombre, auto_suggest=True)
-        return {
-            "titulo": page.title,
-            "resumen": page.summary[:1000] + "...",
-            "url": page.url,
-            "imagenes": [img for img in page.images if img.lower().endswith(('.jpg', '.jpeg', '.png'))][:3]
-        }
-    except wikipedia.exceptions.DisambiguationError as e:
-        try:
-            page = wikipedia.page(e.options[0])
-            return {
-                "titulo": page.title,
-                "resumen": f"(Resultado alternativo)\n\n{page.summary[:1000]}...",
-                "url": page.url,
-                "imagenes": [img for img in page.images if img.lower().endswith(('.jpg', '.jpeg', '.png'))][:3]
-            }
-        except:
-            return None
-    except wikipedia.exceptions.PageError:
-        return None
-    except Exception as e:
-        st.error(f"Error al consultar Wikipedia: {str(e)}")
-        return None
+# El registro compartido carga TensorFlow y el modelo en segundo plano mientras se elige la imagen;
+# wikipedia solo hace falta si una etiqueta no está en el almacén local
+precargar("perros")
+importar_en_segundo_plano("wikipedia")
+
+
+def clasificar(uploaded_file):
+    # Decodificación y redimensionado los mide abrir_imagen; el resto del preprocesamiento
+    # (paso a float32 en el lote y preprocess_input de EfficientNet) es la normalización
+    estadisticas = []
+    inicio = time.perf_counter()
+    lote = preparar_lote([uploaded_file], "perros", estadisticas=estadisticas)
+    total_ms = (time.perf_counter() - inicio) * 1000
+    decodificacion_ms = sum(e["decodificacion_ms"] for e in estadisticas)
+    redimension_ms = sum(e["redimension_ms"] for e in estadisticas)
+    observar("app4", "decodificacion", decodificacion_ms / 1000)
+    observar("app4", "redimension", redimension_ms / 1000)
+    observar("app4", "normalizacion", max(0.0, total_ms - decodificacion_ms - redimension_ms) / 1000)
+    with etapa("app4", "inferencia"):
+        return {"probabilidades": predecir("perros", lote)}
 
 # --- Interfaz principal ---
 uploaded_file = st.file_uploader("Elige una imagen de perro...", type=["jpg", "jpeg", "png"])
@@ -120,14 +59,18 @@ if uploaded_file is not None:
 
     with col_results:
         if classify_btn:
-            with st.spinner("Analizando la imagen..."):
+            with st.spinner("Analizando la imagen..."), etapa("app4", "clasificacion"):
                 try:
-                    img_array = cargar_preprocesar_imagen_desde_bytes(uploaded_file)
-                    predictions = modelo.predict(img_array)
-                    predicted_class = int(np.argmax(predictions[0]))
-                    confidence = float(np.max(predictions[0])) * 100
-                    class_name = nombres_clases.get(predicted_class, f"Clase {predicted_class}")
-                    wiki_info = obtener_info_wikipedia(class_name)
+                    # El perfil "perros" aplica el preprocess_input de EfficientNet;
+                    # la misma imagen ya clasificada se sirve desde la caché
+                    predictions = en_cache(uploaded_file.getvalue(), "perros", lambda: clasificar(uploaded_file),
+                                           version_perfil("perros"))["probabilidades"]
+                    etiquetas_top, indices_top, valores_top = top_k_nombres("perros", predictions)
+                    predicted_class = int(indices_top[0, 0])
+                    confidence = float(valores_top[0, 0]) * 100
+                    class_name = etiquetas_top[0, 0]
+                    # Desde el almacén local; si falta, se consulta en segundo plano
+                    wiki_futuro = obtener_info_async(titulo_wiki("perros", predicted_class, "es"), "es")
                 except Exception as e:
                     st.error(f"Ocurrió un error en la predicción: {e}")
                     st.stop()
@@ -138,17 +81,15 @@ if uploaded_file is not None:
                 
                 st.success(f"🐺 Es de raza **{class_name}**")
                 st.write(f"🔢 Confianza del modelo: **{confidence:.2f}%**")
+            registrar("app4", "primera_prediccion")
 
             with result_tabs[1]:
                 st.subheader("Mejores 5 Coincidencias: ")
-                top5 = np.argsort(predictions[0])[::-1][:5]
-                for i, idx in enumerate(top5):
-                    nombre = nombres_clases.get(idx, f"Clase {idx}")
-                    porcentaje = predictions[0][idx] * 100
-                    st.write(f"*{i+1}. {nombre}* — {porcentaje:.2f}%")
-                    st.progress(float(predictions[0][idx]))
+                mostrar_top("perros", predictions)
 
             with result_tabs[2]:
+                with st.spinner("Consultando Wikipedia..."), etapa("app4", "wikipedia"):
+                    wiki_info = esperar_info(wiki_futuro)
                 if wiki_info:
                     st.subheader(wiki_info["titulo"])
                     st.write(wiki_info["resumen"])
@@ -169,4 +110,6 @@ with st.sidebar:
 *Autor:* Romero Luis E.
 """)
     st.markdown("---")
-    st.markdown("👨‍💻 [Código en GitHub](https://github.com/LuisEduardoRomeroOlmos/Proyectos)")
\ No newline at end of file
+    st.markdown("👨‍💻 [Código en GitHub](https://github.com/LuisEduardoRomeroOlmos/Proyectos)")
+    if (arranque := resumen("app4")):
+        st.caption(arranque)
\ No newline at end of file
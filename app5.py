@@ -1,14 +1,15 @@
+import os
 import streamlit as st
-import numpy as np
-import pandas as pd
-from PIL import Image
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
-import wikipedia
-import io
-from fpdf import FPDF
-import matplotlib.cm as cm
+from utils.arranque import importar_en_segundo_plano, registrar, resumen
+from utils.modelos import precargar, version_perfil
+from utils.lotes import predecir
+from utils.preprocessing import preparar_lote
+from utils.cache_predicciones import clave, en_cache
+from utils.etiquetas import nombres, titulo_wiki
+from utils.historial import RUTA_DB as RUTA_HISTORIAL, HistorialSesion
+from utils.resultados import mostrar_top, top_k_nombres
+from utils.wiki import IDIOMAS, esperar_info, obtener_info_async
+from utils.reportes import EntradaInforme, generar_async
 
 
 # Configuración
@@ -19,149 +20,149 @@ Sube una imagen de un perro y el modelo predecirá a cuál de las 120 razas del
 mostrando además información relevante de Wikipedia.
 """)
 st.caption("📂 También puedes arrastrar y soltar la imagen aquí.")
+registrar("app5", "primer_pintado")
 
-# Idioma Wikipedia
-idioma = st.selectbox("🌐 Idioma de Wikipedia", ["es", "en"])
-wikipedia.set_lang(idioma)
-
-# Carga y preprocesamiento
-def cargar_preprocesar_imagen_desde_bytes(file, tamanio=(224, 224)):
-    img = Image.open(file).convert("RGB")
-    img = img.resize(tamanio)
-    img_array = image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    return img_array / 255.0
-
-@st.cache_resource
-def cargar_modelo():
-    return load_model("Modelos/Clasificacion_perros.keras")
-
-modelo = cargar_modelo()
-
-@st.cache_data
-def nombres_perros():
-    return {
-        0: "Chihuahua", 1: "Japanese spaniel", 2: "Maltese dog", 3: "Pekinese", 4: "Shih-Tzu",
-        5: "Blenheim spaniel", 6: "Papillon", 7: "Toy terrier", 8: "Rhodesian ridgeback",
-        9: "Afghan hound", 10: "Basset", 11: "Beagle", 12: "Bloodhound", 13: "Bluetick",
-        14: "Black-and-tan coonhound", 15: "Walker hound", 16: "English foxhound",
-        17: "Redbone", 18: "Borzoi", 19: "Irish wolfhound", 20: "Italian greyhound",
-        21: "Whippet", 22: "Ibizan hound", 23: "Norwegian elkhound", 24: "Otterhound",
-        25: "Saluki", 26: "Scottish deerhound", 27: "Weimaraner", 28: "Staffordshire bullterrier",
-        29: "American Staffordshire terrier", 30: "Bedlington terrier", 31: "Border terrier",
-        32: "Kerry blue terrier", 33: "Irish terrier", 34: "Norfolk terrier", 35: "Norwich terrier",
-        36: "Yorkshire terrier", 37: "Wire-haired fox terrier", 38: "Lakeland terrier",
-        39: "Sealyham terrier", 40: "Airedale", 41: "Cairn", 42: "Australian terrier",
-        43: "Dandie Dinmont", 44: "Boston bull", 45: "Miniature schnauzer", 46: "Giant schnauzer",
-        47: "Standard schnauzer", 48: "Scotch terrier", 49: "Tibetan terrier",
-        50: "Silky terrier", 51: "Soft-coated wheaten terrier", 52: "West Highland white terrier",
-        53: "Lhasa", 54: "Flat-coated retriever", 55: "Curly-coated retriever",
-        56: "Golden retriever", 57: "Labrador retriever", 58: "Chesapeake Bay retriever",
-        59: "German short-haired pointer", 60: "Vizsla", 61: "English setter",
-        62: "Irish setter", 63: "Gordon setter", 64: "Brittany spaniel", 65: "Clumber",
-        66: "English springer", 67: "Welsh springer spaniel", 68: "Cocker spaniel",
-        69: "Sussex spaniel", 70: "Irish water spaniel", 71: "Kuvasz", 72: "Schipperke",
-        73: "Groenendael", 74: "Malinois", 75: "Briard", 76: "Kelpie", 77: "Komondor",
-        78: "Old English sheepdog", 79: "Shetland sheepdog", 80: "Collie",
-        81: "Border collie", 82: "Bouvier des Flandres", 83: "Rottweiler",
-        84: "German shepherd", 85: "Doberman", 86: "Miniature pinscher",
-        87: "Greater Swiss Mountain dog", 88: "Bernese mountain dog", 89: "Appenzeller",
-        90: "EntleBucher", 91: "Boxer", 92: "Bull mastiff", 93: "Tibetan mastiff",
-        94: "French bulldog", 95: "Great Dane", 96: "Saint Bernard", 97: "Eskimo dog",
-        98: "Malamute", 99: "Siberian husky", 100: "Affenpinscher", 101: "Basenji",
-        102: "Pug", 103: "Leonberg", 104: "Newfoundland", 105: "Great Pyrenees",
-        106: "Samoyed", 107: "Pomeranian", 108: "Chow", 109: "Keeshond",
-        110: "Brabancon griffon", 111: "Pembroke", 112: "Cardigan", 113: "Toy poodle",
-        114: "Miniature poodle", 115: "Standard poodle", 116: "Mexican hairless",
-        117: "Dingo", 118: "Dhole", 119: "African hunting dog"
-    }
-
-
-nombres_clases = nombres_perros()
-
-def obtener_info_wikipedia(nombre):
-    try:
-        page = wikipedia.page(nombre, auto_suggest=True)
-        return {
-            "titulo": page.title,
-            "resumen": page.summary[:1000] + "...",
-            "url": page.url,
-            "imagenes": [img for img in page.images if img.lower().endswith(('.jpg', '.jpeg', '.png'))][:3]
-        }
-    except wikipedia.exceptions.DisambiguationError as e:
-        try:
-            page = wikipedia.page(e.options[0])
-            return {
-                "titulo": page.title,
-                "resumen": f"(Resultado alternativo)\n\n{page.summary[:1000]}...",
-                "url": page.url,
-                "imagenes": [img for img in page.images if img.lower().endswith(('.jpg', '.jpeg', '.png'))][:3]
-            }
-        except:
-            return None
-    except wikipedia.exceptions.PageError:
-        return None
-    except Exception as e:
-        st.error(f"Error al consultar Wikipedia: {str(e)}")
-        return None
+# Idioma de Wikipedia y de los nombres: el selector está en la pestaña de Wikipedia
+# (un fragmento), así que cambiarlo solo vuelve a pintar esa pestaña. El resto de
+# secciones lo leen de la sesión
+if "idioma" not in st.session_state:
+    st.session_state.idioma = IDIOMAS[0]
 
-# Grad-CAM (estructura inicial, requiere implementación real)
-
-
-def obtener_heatmap_gradcam(img_array, modelo, clase_idx):
-    # Detectar la última capa Conv2D dentro de MobileNetV2 (modelo base)
-    base_model = None
-    # Buscamos dentro de capas anidadas
-    for layer in modelo.layers:
-        if hasattr(layer, "layers"):  # submodelo
-            base_model = layer
-            break
-    if base_model is None:
-        base_model = modelo  # si no tiene submodelo, usar modelo directamente
-
-    # Buscar última Conv2D en el base_model
-    def buscar_ultima_conv2d(layer):
-        if isinstance(layer, tf.keras.layers.Conv2D):
-            return layer.name
-        if hasattr(layer, 'layers'):
-            for sublayer in reversed(layer.layers):
-                name = buscar_ultima_conv2d(sublayer)
-                if name:
-                    return name
-        return None
+# El registro compartido carga TensorFlow y el modelo en segundo plano mientras se elige la imagen;
+# lo que solo usan las pestañas de resultados (Grad-CAM, PDF) se importa también en segundo plano
+precargar("perros")
+importar_en_segundo_plano("utils.gradcam", "fpdf", "wikipedia")
 
-    ultima_capa_conv = buscar_ultima_conv2d(base_model)
-    if ultima_capa_conv is None:
-        st.error("No se encontró una capa Conv2D en el modelo.")
+# Historial: anillo de tamaño fijo por sesión; lo más antiguo pasa al almacén en disco
+if "historial" not in st.session_state:
+    st.session_state.historial = HistorialSesion("perros")
+
+# Cada cuánto vuelve a mirar una sección si su tarea en segundo plano ha terminado (s)
+INTERVALO_S = 0.5
+
+
+# Secciones de resultados: cada una es un fragmento, así que sus botones y su
+# selector solo vuelven a ejecutar esa sección, nunca la predicción. Grad-CAM y
+# Wikipedia llegan como futuros lanzados al terminar la predicción: ninguna
+# sección los espera en la ejecución completa. Mientras el suyo no ha
+# terminado, la sección se registra con run_every (`sondeo`) y se vuelve a
+# ejecutar sola hasta la siguiente ejecución completa; una vez listo, repintar
+# es barato. Si ya estaba listo, se registra sin repetición.
+def seccion(funcion, pendiente, *args):
+    st.fragment(funcion, run_every=INTERVALO_S if pendiente else None)(pendiente, *args)
+
+
+def _cambiar_idioma():
+    st.session_state.idioma = st.session_state.selector_idioma
+
+
+def seccion_wikipedia(sondeo, resultado):
+    st.selectbox("🌐 Idioma de Wikipedia", list(IDIOMAS), index=IDIOMAS.index(st.session_state.idioma),
+                 key="selector_idioma", on_change=_cambiar_idioma)
+    idioma = st.session_state.idioma
+    # Desde el almacén local; si falta, se consulta en segundo plano
+    if idioma not in resultado["wiki"]:
+        titulo = titulo_wiki("perros", resultado["predicted_class"], idioma)
+        resultado["wiki"][idioma] = obtener_info_async(titulo, idioma)
+    futuro = resultado["wiki"][idioma]
+    if sondeo and not futuro.done():
+        st.info("⏳ Consultando Wikipedia...")
+        return
+    # Sin sondeo solo se llega aquí con un futuro pendiente al cambiar de idioma,
+    # en una ejecución del fragmento: esperar solo bloquea esta sección
+    with st.spinner("Consultando Wikipedia..."):
+        wiki_info = esperar_info(futuro)
+    if wiki_info:
+        st.subheader(wiki_info["titulo"])
+        st.write(wiki_info["resumen"])
+        for img_url in wiki_info["imagenes"]:
+            st.image(img_url, use_container_width=True)
+        st.page_link(wiki_info["url"], label="📖 Ver artículo completo")
+    else:
+        st.warning("Información no encontrada en Wikipedia.")
+
+
+def heatmap_listo(resultado):
+    """Heatmap de Grad-CAM del resultado (esperando a que termine) o None si no se pudo calcular."""
+    try:
+        return resultado["cam"].result()
+    except Exception:
         return None
 
-    inputs = modelo.input if hasattr(modelo, 'input') else modelo.inputs[0]
-
-    grad_model = tf.keras.models.Model(
-        inputs=inputs,
-        outputs=[modelo.get_layer(ultima_capa_conv).output, modelo.output]
-    )
 
-    with tf.GradientTape() as tape:
-        conv_outputs, predictions = grad_model(img_array)
-        loss = predictions[:, clase_idx]
-
-    grads = tape.gradient(loss, conv_outputs)[0]
-    conv_outputs = conv_outputs[0]
-    weights = tf.reduce_mean(grads, axis=(0, 1))
+def seccion_gradcam(sondeo, resultado):
+    if sondeo and not resultado["cam"].done():
+        st.info("⏳ Calculando Grad-CAM...")
+        return
+    if "cam_color" not in resultado:
+        # Se colorea una vez: las repeticiones del sondeo vuelven a pintar la misma imagen
+        from utils.gradcam import colorear_heatmap
+        cam = heatmap_listo(resultado)
+        resultado["cam_color"] = None if cam is None else colorear_heatmap(cam, (224, 224))
+    if resultado["cam_color"] is None:
+        st.info(f"🧠 Visualización Grad-CAM no disponible: {resultado['cam'].exception()}")
+    else:
+        st.image(resultado["cam_color"], caption="Grad-CAM", use_container_width=True)
+
+
+@st.fragment
+def seccion_informe(resultado, datos):
+    # El PDF solo se genera si se pide, en un hilo aparte
+    if st.button("📄 Generar informe (PDF)"):
+        idioma = st.session_state.idioma
+        nombres_top, _, valores_top = top_k_nombres("perros", resultado["predictions"], idioma=idioma)
+        wiki_info = esperar_info(resultado["wiki"][idioma]) if idioma in resultado["wiki"] else None
+        resultado["entrada_informe"] = EntradaInforme(
+            imagen=datos,
+            titulo="Resultado de Clasificación",
+            clase=str(nombres_top[0, 0]),
+            confianza=resultado["confidence"] / 100,
+            top=tuple(zip(nombres_top[0].tolist(), valores_top[0].tolist())),
+            heatmap=heatmap_listo(resultado),
+            url=wiki_info["url"] if wiki_info else None,
+        )
+        resultado["informe"] = generar_async([resultado["entrada_informe"]])
+    if "informe" in resultado:
+        with st.spinner("Generando informe..."):
+            ruta_informe = resultado["informe"].result()
+            # Los temporales se comparten entre sesiones y los más antiguos se borran:
+            # si el de esta sesión ya no está, se vuelve a generar
+            if not os.path.exists(ruta_informe):
+                resultado["informe"] = generar_async([resultado["entrada_informe"]])
+                ruta_informe = resultado["informe"].result()
+        with open(ruta_informe, "rb") as informe:
+            st.download_button("📥 Descargar resultado (PDF)", data=informe,
+                               file_name="resultado_perro.pdf", mime="application/pdf")
+
+
+# Sidebar: se pinta antes que los resultados; el historial va en un hueco que
+# se llena en cuanto se conoce la predicción de esta ejecución
+with st.sidebar:
+    st.markdown("## ℹ️ Acerca de")
+    st.markdown("""
+*Tecnologías:*
+- TensorFlow/Keras
+- Wikipedia API  
+*Dataset:* Stanford Dogs Dataset  
+*Autor:* Romero Luis E.
+""")
+    st.markdown("---")
+    st.markdown("👨‍💻 [Código en GitHub](https://github.com/LuisEduardoRomeroOlmos/Proyectos)")
+    if (arranque := resumen("app5")):
+        st.caption(arranque)
+    historial_lateral = st.container()
 
-    cam = np.zeros(conv_outputs.shape[0:2], dtype=np.float32)
-    for i, w in enumerate(weights):
-        cam += w * conv_outputs[:, :, i]
 
-    cam = np.maximum(cam, 0)
-    cam = cam / cam.max() if cam.max() != 0 else cam
-    heatmap = Image.fromarray(np.uint8(cm.jet(cam.numpy()) * 255)).resize((224, 224))
-    return heatmap
+def mostrar_historial():
+    historial = st.session_state.historial
+    if len(historial):
+        with historial_lateral:
+            st.markdown("### 🐾 Historial de Predicciones")
+            razas = nombres("perros", st.session_state.idioma)
+            for registro in historial.ultimos(5):
+                st.write(f"{razas[registro['clase']]}: {registro['confianza'] * 100:.2f}%")
+            st.caption(f"{len(historial)} en memoria ({historial.bytes()} B); los anteriores en {RUTA_HISTORIAL}")
 
-# Historial
-if "historial" not in st.session_state:
-    st.session_state.historial = []
 
 # Carga imagen
 uploaded_file = st.file_uploader("Elige una imagen de perro...", type=["jpg", "jpeg", "png"])
@@ -175,77 +176,58 @@ if uploaded_file is not None:
         classify_btn = st.button("🪄 Clasificar", type="primary", use_container_width=True)
 
     with col2:
+        datos = uploaded_file.getvalue()
+        clave_imagen = clave(datos, "perros_224")
         if classify_btn:
             with st.spinner("Analizando la imagen..."):
                 try:
-                    img_array = cargar_preprocesar_imagen_desde_bytes(uploaded_file)
-                    predictions = modelo.predict(img_array)
-                    predicted_class = int(np.argmax(predictions[0]))
-                    confidence = float(np.max(predictions[0])) * 100
-                    class_name = nombres_clases.get(predicted_class, f"Clase {predicted_class}")
-                    wiki_info = obtener_info_wikipedia(class_name)
-                    st.session_state.historial.append((class_name, confidence))
+                    # La misma imagen ya clasificada se sirve desde la caché
+                    predictions = en_cache(datos, "perros_224", lambda: {
+                        "probabilidades": predecir("perros", preparar_lote([uploaded_file], "perros_224"))
+                    }, version_perfil("perros_224"))["probabilidades"]
+                    _, indices_top, valores_top = top_k_nombres("perros", predictions)
+                    predicted_class = int(indices_top[0, 0])
+                    from utils.gradcam import gradcam_async
+                    # El resultado se guarda en la sesión para seguir mostrándolo en las
+                    # reejecuciones; Grad-CAM y Wikipedia empiezan ya en segundo plano
+                    idioma = st.session_state.idioma
+                    st.session_state.resultado = {
+                        "clave": clave_imagen,
+                        "predictions": predictions,
+                        "predicted_class": predicted_class,
+                        "confidence": float(valores_top[0, 0]) * 100,
+                        "cam": gradcam_async("perros", datos, "perros_224", predicted_class),
+                        "wiki": {idioma: obtener_info_async(titulo_wiki("perros", predicted_class, idioma), idioma)},
+                    }
+                    st.session_state.historial.agregar(predicted_class, float(valores_top[0, 0]), clave_imagen)
                 except Exception as e:
                     st.error(f"Ocurrió un error en la predicción: {e}")
                     st.stop()
 
+mostrar_historial()
+
+if uploaded_file is not None:
+    resultado = st.session_state.get("resultado")
+    if resultado is not None and resultado["clave"] == clave_imagen:
+        with col2:
             result_tabs = st.tabs(["📚 Análisis", "📊 Top 5", "🌍 Wikipedia", "🖼️ Grad-CAM", "📥 Descargar"])
 
+            # La raza se pinta en cuanto termina la pasada hacia delante, antes que el resto de secciones
             with result_tabs[0]:
+                class_name = nombres("perros", st.session_state.idioma)[resultado["predicted_class"]]
                 st.markdown(f"### 🐶 Raza detectada: {class_name}")
-                st.metric("Confianza", f"{confidence:.2f}%")
+                st.metric("Confianza", f"{resultado['confidence']:.2f}%")
+            registrar("app5", "primera_prediccion")
 
             with result_tabs[1]:
-                top5 = np.argsort(predictions[0])[::-1][:5]
-                top5_dict = {nombres_clases[i]: predictions[0][i] for i in top5}
-                df = pd.DataFrame.from_dict(top5_dict, orient="index", columns=["Probabilidad"])
-                st.bar_chart(df)
+                mostrar_top("perros", resultado["predictions"], idioma=st.session_state.idioma)
 
             with result_tabs[2]:
-                if wiki_info:
-                    st.subheader(wiki_info["titulo"])
-                    st.write(wiki_info["resumen"])
-                    for img_url in wiki_info["imagenes"]:
-                        st.image(img_url, use_container_width=True)
-                    st.page_link(wiki_info["url"], label="📖 Ver artículo completo")
-                else:
-                    st.warning("Información no encontrada en Wikipedia.")
+                futuro_wiki = resultado["wiki"].get(st.session_state.idioma)
+                seccion(seccion_wikipedia, futuro_wiki is None or not futuro_wiki.done(), resultado)
 
             with result_tabs[3]:
-                heatmap = obtener_heatmap_gradcam(img_array, modelo, predicted_class)
-                if heatmap is not None:
-                    st.image(heatmap, caption="Grad-CAM", use_container_width=True)
-                else:
-                    st.info("🧠 Visualización Grad-CAM aún no implementada.")
+                seccion(seccion_gradcam, not resultado["cam"].done(), resultado)
 
             with result_tabs[4]:
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", size=12)
-                pdf.cell(200, 10, txt="Resultado de Clasificación", ln=True)
-                pdf.cell(200, 10, txt=f"Raza: {class_name}", ln=True)
-                pdf.cell(200, 10, txt=f"Confianza: {confidence:.2f}%", ln=True)
-                if wiki_info:
-                    pdf.multi_cell(0, 10, txt=f"Wikipedia: {wiki_info['url']}")
-                pdf_output = io.BytesIO()
-                pdf.output(pdf_output)
-                st.download_button("📄 Descargar resultado (PDF)", data=pdf_output.getvalue(),
-                                   file_name="resultado_perro.pdf", mime="application/pdf")
-
-# Sidebar
-with st.sidebar:
-    st.markdown("## ℹ️ Acerca de")
-    st.markdown("""
-*Tecnologías:*
-- TensorFlow/Keras
-- Wikipedia API  
-*Dataset:* Stanford Dogs Dataset  
-*Autor:* Romero Luis E.
-""")
-    st.markdown("---")
-    st.markdown("👨‍💻 [Código en GitHub](https://github.com/LuisEduardoRomeroOlmos/Proyectos)")
-
-    if st.session_state.historial:
-        st.markdown("### 🐾 Historial de Predicciones")
-        for raza, conf in reversed(st.session_state.historial[-5:]):
-            st.write(f"{raza}: {conf:.2f}%")
+                seccion_informe(resultado, datos)
@@ -1,60 +1,87 @@
 import streamlit as st
-import numpy as np
-import tensorflow as tf
-from PIL import Image
-from tensorflow.keras.models import Model
-from utils.gradcam import make_gradcam_heatmap, save_and_display_gradcam
-from utils.preprocessing import preprocess_image
-
-# 1) Carga tu modelo completo
-full_model = tf.keras.models.load_model('Modelos/Clasificacion_melanoma_V1_P2.keras')
-
-# 2) Separa la base EfficientNet y localiza 'top_conv'
-base_model      = full_model.layers[0]
-last_conv_layer = base_model.get_layer("top_conv")
-
-# 3) Forzamos un forward pass para definir shapes
-dummy = np.zeros((1,300,300,3), dtype=np.float32)
-_ = full_model(dummy)
-
-# 4) Reconstruye manualmente el head (las capas 1 en adelante) sobre base_model.input
-inputs = base_model.input                # Tensor de entrada (None,300,300,3)
-x      = base_model(inputs)              # Sale de EfficientNet
-conv_outputs = last_conv_layer.output    # Activaciones de top_conv
-
-# Aplica las capas restantes del Sequential original
-for layer in full_model.layers[1:]:
-    x = layer(x)
-
-# 'x' es ahora la salida final del modelo completo, pero dentro del mismo grafo
-final_output = x
-
-# 5) Modelo funcional que expone CONcurrentemente:
-#    [activaciones de top_conv, salida final]
-gradcam_model = Model(inputs=inputs, outputs=[conv_outputs, final_output])
+from utils.arranque import importar_en_segundo_plano, registrar, resumen
+from utils.modelos import precargar, version, version_perfil
+from utils.backends import backend
+from utils.lotes import predecir
+from utils.preprocessing import PERFILES, decodificar, preparar_lote
+from utils.cache_predicciones import en_cache
+from utils.melanoma import PERFIL, etiqueta, pipeline
+from utils.metricas import etapa, mostrar_admin, servir
 
 # ——— Streamlit UI ———
 st.set_page_config(page_title="Detección de Melanoma", layout="centered")
+# Página de métricas oculta (?admin=<token>) y endpoint /metrics si está configurado
+mostrar_admin("app6")
+servir()
 st.title("🩺 Clasificación de Melanoma con Grad-CAM")
+registrar("app6", "primer_pintado")
+
+# El registro carga TensorFlow y el modelo una vez por proceso, en segundo plano
+# (no en cada ejecución del script); el modelo combinado [activaciones de
+# top_conv, salida final] se construye con él. Grad-CAM necesita el modelo en
+# este proceso también con el pool de modelos (local=True)
+precargar("melanoma", local=True)
+importar_en_segundo_plano("utils.gradcam")
+
+# Lado mayor del Grad-CAM superpuesto en pantalla (px)
+TAMANIO_PANTALLA = 700
 
 uploaded = st.file_uploader("Sube una imagen de la piel", type=["jpg","jpeg","png"])
 if uploaded:
-    img = Image.open(uploaded).convert("RGB")
+    with etapa("app6", "decodificacion"):
+        # A la menor escala JPEG que sirve para la pantalla y para el modelo, no a la de la subida
+        lado = max(TAMANIO_PANTALLA // 2, *PERFILES[PERFIL].tamanio)
+        img = decodificar(uploaded, (lado, lado))
     st.image(img, caption="Imagen subida", use_container_width=True)
 
-    # Preprocesa
-    arr   = preprocess_image(img)          # → (300,300,3)
-    batch = np.expand_dims(arr, axis=0)    # → (1,300,300,3)
+    con_tflite = backend(PERFIL, PERFILES[PERFIL].tamanio) == "tflite"
+    if con_tflite:
+        # La puntuación sale de TFLite y se muestra sin esperar a TensorFlow;
+        # el heatmap necesita gradientes y se calcula después con el modelo Keras
+        def clasificar():
+            with etapa("app6", "preprocesamiento"):
+                lote = preparar_lote([img], PERFIL)
+            with etapa("app6", "inferencia"):
+                return {"prediccion": predecir(PERFIL, lote)[:, 0]}
+
+        prediccion = en_cache(uploaded.getvalue(), "melanoma_tflite", clasificar, version_perfil(PERFIL))
+        label, conf = etiqueta(float(prediccion["prediccion"][0]))
+        st.write(f"**Predicción:** {label} ({conf*100:.2f}%)")
+        registrar("app6", "primera_prediccion")
+
+    tiempos = {}
+
+    def analizar():
+        # Solo sin acierto en la caché se carga el modelo Keras y se construye el pipeline
+        melanoma = pipeline()
+        # Puntuación y Grad-CAM salen de la misma pasada hacia delante/atrás
+        with etapa("app6", "preprocesamiento"):
+            lote = preparar_lote([img], PERFIL)
+        with etapa("app6", "gradcam"):
+            probabilidades, heatmaps = melanoma.analizar_lote(lote)
+        tiempos.update(melanoma.arranque(), ultima_peticion_ms=melanoma.ultima_peticion_ms)
+        return {"prediccion": probabilidades[0], "heatmap": heatmaps[0]}
 
-    # Predicción normal
-    pred  = full_model.predict(batch)[0][0]
-    label = "Melanoma" if pred>=0.5 else "No Melanoma"
-    conf  = pred if pred>=0.5 else 1-pred
-    st.write(f"**Predicción:** {label} ({conf*100:.2f}%)")
+    # La misma imagen ya analizada se sirve desde la caché (puntuación y heatmap)
+    with etapa("app6", "analisis"):
+        resultado = en_cache(uploaded.getvalue(), "melanoma", analizar, version(PERFIL))
+    if not con_tflite:
+        label, conf = etiqueta(float(resultado["prediccion"]))
+        st.write(f"**Predicción:** {label} ({conf*100:.2f}%)")
+        registrar("app6", "primera_prediccion")
 
-    # Grad-CAM
-    heatmap = make_gradcam_heatmap(batch, gradcam_model)
-    gcam    = save_and_display_gradcam(img, heatmap)
+    # Grad-CAM, superpuesto a resolución de pantalla y no a la de la subida
+    from utils.gradcam import save_and_display_gradcam
+    with etapa("app6", "superposicion"):
+        gcam = save_and_display_gradcam(img, resultado["heatmap"], tamanio_max=TAMANIO_PANTALLA)
     st.image(gcam, caption="Grad-CAM", use_container_width=True)
 
+    if tiempos:
+        st.caption(
+            f"⏱️ Modelo: carga {tiempos['carga_modelo_s']:.1f} s + "
+            f"pipeline {tiempos['construccion_pipeline_s']:.1f} s · "
+            f"última pasada {tiempos['ultima_peticion_ms']:.0f} ms"
+        )
 
+if (arranque := resumen("app6")):
+    st.caption(arranque)
@@ -0,0 +1,107 @@
+import streamlit as st
+from utils.arranque import importar_en_segundo_plano, registrar, resumen
+from utils.modelos import precargar
+from utils.enrutador import UMBRAL, clasificar
+from utils.etiquetas import titulo_wiki
+from utils.metricas import etapa, mostrar_admin, servir
+from utils.resultados import mostrar_top, top_k_nombres
+from utils.wiki import esperar_info, obtener_info_async
+
+# Configuración de la página
+st.set_page_config(page_title="¿Qué es esto? Clasificador unificado", layout="wide")
+# Página de métricas oculta (?admin=<token>) y endpoint /metrics si está configurado
+mostrar_admin("app_unificada")
+servir()
+
+st.title("🔎 ¿Qué es esto?")
+st.markdown("""
+Sube cualquier imagen: **MobileNetV2** (ImageNet) la clasifica primero y, si es un perro o una flor,
+el modelo especialista afina la raza (Stanford Dogs) o la especie (Oxford Flowers 102),
+con información de Wikipedia.
+""")
+registrar("app_unificada", "primer_pintado")
+
+# Solo se precarga el modelo general; cada especialista se carga la primera vez que se enruta a él
+precargar("imagenet")
+importar_en_segundo_plano("wikipedia")
+
+NOMBRES_RUTA = {"perros": "🐶 perro", "flores": "🌸 flor"}
+
+uploaded_file = st.file_uploader("Elige una imagen...", type=["jpg", "jpeg", "png"])
+
+if uploaded_file is not None:
+    col_upload, col_results = st.columns([1, 2], gap="large")
+
+    with col_upload:
+        with st.container(border=True):
+            st.image(uploaded_file, caption="Imagen subida", width=300, use_container_width=True)
+            st.markdown("---")
+            classify_btn = st.button("🔎 Analizar", type="primary", use_container_width=True)
+
+    with col_results:
+        if classify_btn:
+            with st.spinner("Analizando la imagen..."), etapa("app_unificada", "clasificacion"):
+                try:
+                    resultado = clasificar(uploaded_file.getvalue())
+                    from tensorflow.keras.applications.mobilenet_v2 import decode_predictions
+                    generales = decode_predictions(resultado["imagenet"][None], top=3)[0]
+                except Exception as e:
+                    st.error(f"Ocurrió un error en la predicción: {e}")
+                    st.stop()
+
+            ruta = resultado["ruta"]
+            st.markdown("#### ImageNet")
+            for i, (_, label, prob) in enumerate(generales):
+                st.write(f"{i+1}. **{label}** (probabilidad: {prob*100:.2f}%)")
+
+            if ruta is None:
+                st.info(
+                    "No parece un perro ni una flor (probabilidad en ImageNet: "
+                    + ", ".join(f"{NOMBRES_RUTA[r]} {m*100:.0f}%" for r, m in resultado["masas"].items())
+                    + f"; umbral {UMBRAL*100:.0f}%): no se ha usado ningún modelo especialista."
+                )
+                registrar("app_unificada", "primera_prediccion")
+            else:
+                especialista = resultado["especialista"]
+                etiquetas_top, indices_top, valores_top = top_k_nombres(ruta, especialista)
+                predicted_class = int(indices_top[0, 0])
+                # Desde el almacén local; si falta, se consulta en segundo plano
+                wiki_futuro = obtener_info_async(titulo_wiki(ruta, predicted_class, "es"), "es")
+
+                result_tabs = st.tabs(["📚 Análisis", "📊 Top 5", "🌍 Wikipedia"])
+
+                with result_tabs[0]:
+                    st.success(f"Es un(a) {NOMBRES_RUTA[ruta]}: **{etiquetas_top[0, 0]}**")
+                    st.metric("Confianza del especialista", f"{float(valores_top[0, 0]) * 100:.2f}%")
+                    st.caption(f"Enrutado con {resultado['masas'][ruta]*100:.0f}% de probabilidad en ImageNet")
+                registrar("app_unificada", "primera_prediccion")
+
+                with result_tabs[1]:
+                    st.subheader("Mejores 5 Coincidencias: ")
+                    mostrar_top(ruta, especialista)
+
+                with result_tabs[2]:
+                    with st.spinner("Consultando Wikipedia..."), etapa("app_unificada", "wikipedia"):
+                        wiki_info = esperar_info(wiki_futuro)
+                    if wiki_info:
+                        st.subheader(wiki_info["titulo"])
+                        st.write(wiki_info["resumen"])
+                        if wiki_info["imagenes"]:
+                            st.image(wiki_info["imagenes"][0], use_container_width=True)
+                        st.page_link(wiki_info["url"], label="📖 Ver artículo completo")
+                    else:
+                        st.warning("Información no encontrada en Wikipedia")
+
+# --- Sidebar ---
+with st.sidebar:
+    st.markdown("## ℹ️ Acerca de")
+    st.markdown("""
+*Modelos:*
+- MobileNetV2 (ImageNet) como clasificador general
+- Especialistas: razas de perro (Stanford Dogs) y flores (Oxford Flowers 102)
+*Autor:* Romero Luis E.
+""")
+    st.markdown("---")
+    st.markdown("👨‍💻 [Código en GitHub](https://github.com/LuisEduardoRomeroOlmos/Proyectos)")
+    if (arranque := resumen("app_unificada")):
+        st.caption(arranque)
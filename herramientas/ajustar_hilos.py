@@ -0,0 +1,144 @@
+"""
+Ajuste automático de los hilos intra-op / inter-op de TensorFlow para este host.
+
+Para cada modelo y cada punto de la rejilla (intra, inter) se lanzan a la vez
+tantos procesos como réplicas previstas (PROYECTOS_REPLICAS o --replicas),
+cada uno con esa configuración, y durante unos segundos cada réplica clasifica
+imágenes de una en una sin pausa, como con carga sostenida. Se imprime la
+curva (p50, p99 y throughput total de cada punto) y se guarda el punto de
+menor p99 en PROYECTOS_HILOS_TF, de donde el registro lo aplica al cargar el
+modelo (ver utils.hilos).
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.ajustar_hilos --replicas 4
+    python -m herramientas.ajustar_hilos --modelos perros --intra 1 2 4 --inter 1 2 --segundos 10
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import time
+
+import numpy as np
+
+from utils import hilos
+from utils.modelos import MODELOS
+
+# Espera máxima de una réplica, además de la duración del punto: carga del modelo y calentamiento (s)
+ESPERA_S = 300
+
+
+def _rejilla_intra():
+    nucleos = os.cpu_count() or 1
+    valores = {nucleos}
+    n = 1
+    while n < nucleos:
+        valores.add(n)
+        n *= 2
+    return sorted(valores)
+
+
+def _replica(nombre, intra, inter, segundos, salida, barrera):
+    # Antes de cargar nada: la configuración de hilos solo se acepta con TensorFlow sin inicializar
+    hilos.fijar(intra, inter)
+    from utils.modelos import registro
+
+    alto, ancho = MODELOS[nombre].entradas[0]
+    funcion = registro.funcion(nombre, (alto, ancho))
+    lote = np.random.default_rng(os.getpid()).uniform(0, 255, (1, alto, ancho, 3)).astype(np.float32)
+    for _ in range(3):
+        funcion(lote)
+
+    barrera.wait()
+    latencias = []
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        np.asarray(funcion(lote))
+        latencias.append(time.perf_counter() - inicio)
+    salida.put(latencias)
+
+
+def _recoger(salida, procesos, segundos):
+    """Latencias de todas las réplicas, o None si alguna muere o no responde a tiempo."""
+    latencias = []
+    limite = time.monotonic() + ESPERA_S + segundos
+    while len(latencias) < len(procesos):
+        try:
+            latencias.append(salida.get(timeout=1))
+        except queue.Empty:
+            # Una réplica que muere no manda nada: sin esto la espera sería infinita
+            if any(p.exitcode not in (None, 0) for p in procesos) or time.monotonic() > limite:
+                return None
+    return latencias
+
+
+def medir(nombre, intra, inter, replicas, segundos):
+    """Curva de un punto de la rejilla, o None si alguna réplica falla."""
+    contexto = multiprocessing.get_context("spawn")
+    salida = contexto.Queue()
+    # Con timeout: si una réplica muere antes de llegar, las demás no se quedan esperando
+    barrera = contexto.Barrier(replicas, timeout=ESPERA_S)
+    procesos = [contexto.Process(target=_replica, args=(nombre, intra, inter, segundos, salida, barrera))
+                for _ in range(replicas)]
+    for proceso in procesos:
+        proceso.start()
+    try:
+        latencias = _recoger(salida, procesos, segundos)
+    finally:
+        for proceso in procesos:
+            proceso.join(timeout=5)
+            if proceso.is_alive():
+                proceso.terminate()
+                proceso.join()
+    if latencias is None:
+        return None
+    latencias = np.concatenate(latencias) * 1000
+    return {
+        "intra": intra,
+        "inter": inter,
+        "p50_ms": float(np.percentile(latencias, 50)),
+        "p99_ms": float(np.percentile(latencias, 99)),
+        "imagenes_por_segundo": len(latencias) / segundos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelos", nargs="+", default=["flores", "perros", "melanoma"], choices=list(MODELOS))
+    parser.add_argument("--replicas", type=int, default=hilos.REPLICAS, help="réplicas previstas en el host")
+    parser.add_argument("--intra", type=int, nargs="+", default=_rejilla_intra())
+    parser.add_argument("--inter", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--segundos", type=float, default=5.0, help="duración de cada punto de la rejilla")
+    parser.add_argument("--no-guardar", action="store_true", help="solo imprime la curva")
+    args = parser.parse_args()
+
+    print(f"Host {hilos.host()}, {args.replicas} réplicas a la vez")
+    for nombre in args.modelos:
+        print(f"\n{nombre}")
+        print(f"{'intra':>6}{'inter':>6}{'p50 ms':>10}{'p99 ms':>10}{'img/s':>10}")
+        curva = []
+        for intra in args.intra:
+            for inter in args.inter:
+                punto = medir(nombre, intra, inter, args.replicas, args.segundos)
+                if punto is None:
+                    print(f"{intra:>6}{inter:>6}  falló (alguna réplica terminó con error o no respondió)",
+                          flush=True)
+                    continue
+                curva.append(punto)
+                print(f"{intra:>6}{inter:>6}{punto['p50_ms']:>10.1f}{punto['p99_ms']:>10.1f}"
+                      f"{punto['imagenes_por_segundo']:>10.1f}", flush=True)
+
+        if not curva:
+            print("Ningún punto de la rejilla se pudo medir")
+            continue
+        # Menor latencia de cola; a igualdad, más throughput
+        mejor = min(curva, key=lambda p: (round(p["p99_ms"], 1), -p["imagenes_por_segundo"]))
+        print(f"Mejor: intra {mejor['intra']}, inter {mejor['inter']} (p99 {mejor['p99_ms']:.1f} ms)")
+        if not args.no_guardar:
+            hilos.guardar(nombre, args.replicas, {**mejor, "curva": curva})
+            print(f"Guardado en {hilos.RUTA}")
+
+
+if __name__ == "__main__":
+    main()
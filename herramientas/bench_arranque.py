@@ -0,0 +1,69 @@
+"""
+Mide el arranque en frío de las apps: primer pintado y primera predicción.
+
+Cada app se ejecuta en un proceso nuevo con el ejecutor de pruebas de
+Streamlit (`streamlit.testing.v1.AppTest`), sin imagen subida:
+
+- primer pintado: el script llega a `registrar(app, "primer_pintado")`, justo
+  después del título y la descripción;
+- primera predicción: terminada la primera ejecución del script se clasifica
+  una imagen sintética por la misma ruta que la app (preprocesamiento, cola de
+  micro-lotes y backend configurado), que espera a la precarga en curso.
+
+Los tiempos son desde el inicio del proceso. Para comparar con otra versión,
+se ejecuta la herramienta en esa versión del repositorio.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.bench_arranque --apps app3 app5 --repeticiones 3
+"""
+import argparse
+import multiprocessing
+
+import numpy as np
+
+from utils.inferencia import FIRMAS
+
+
+def _medir(args):
+    # Proceso nuevo por medida: nada importado ni cargado de antes
+    app, timeout = args
+    from PIL import Image
+    from streamlit.testing.v1 import AppTest
+
+    from utils import arranque
+    from utils.lotes import predecir
+    from utils.preprocessing import perfil_para, preparar_lote
+
+    AppTest.from_file(f"{app}.py", default_timeout=timeout).run()
+    fin_script = arranque.transcurrido()
+
+    modelo, tamanio = FIRMAS[app]
+    img = Image.fromarray(np.random.default_rng(0).integers(0, 256, (600, 800, 3), dtype=np.uint8))
+    predecir(modelo, preparar_lote([img], perfil_para(modelo, tamanio)))
+    return {
+        "primer_pintado": arranque.tiempos(app)["primer_pintado"],
+        "fin_script": fin_script,
+        "primera_prediccion": arranque.transcurrido(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=list(FIRMAS), choices=list(FIRMAS))
+    parser.add_argument("--repeticiones", type=int, default=3, help="procesos nuevos por app")
+    parser.add_argument("--timeout", type=float, default=300, help="segundos máximos de la primera ejecución")
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{'app':<8}{'primer pintado s':>18}{'fin del script s':>18}{'primera predicción s':>22}")
+    for app in args.apps:
+        medidas = []
+        for _ in range(args.repeticiones):
+            with contexto.Pool(1) as pool:
+                medidas.append(pool.apply(_medir, ((app, args.timeout),)))
+        p50 = {clave: float(np.median([m[clave] for m in medidas])) for clave in medidas[0]}
+        print(f"{app:<8}{p50['primer_pintado']:>18.2f}{p50['fin_script']:>18.2f}{p50['primera_prediccion']:>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
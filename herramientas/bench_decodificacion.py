@@ -0,0 +1,83 @@
+"""
+Mide la decodificación a escala reducida (draft) frente a la decodificación completa.
+
+Recorre un directorio con subidas reales (o genera JPEG sintéticos de 12 MP si
+no se indica ninguno) y ejecuta cada modo en un proceso propio para que el pico
+de RSS de uno no contamine al otro.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.bench_decodificacion --directorio subidas/ --perfil perros
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from utils.preprocessing import PERFILES, _rss_pico_mb, abrir_imagen
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+
+def _escribir_sinteticas(directorio, n):
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        # Ruido a baja resolución ampliado a 4000x3000 (~12 MP): comprime como una foto real
+        pixeles = rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)
+        img = Image.fromarray(pixeles).resize((4000, 3000), Image.Resampling.BICUBIC)
+        img.save(os.path.join(directorio, f"sintetica_{i:03d}.jpg"), quality=90)
+
+
+def _ejecutar(args):
+    # Se ejecuta en un proceso nuevo: el pico de RSS se mide desde aquí
+    directorio, tamanio, reducido = args
+    rutas = sorted(os.path.join(directorio, n) for n in os.listdir(directorio) if n.lower().endswith(EXTENSIONES))
+    datos = [open(r, "rb").read() for r in rutas]
+    rss_base = _rss_pico_mb()
+    estadisticas = []
+    for d in datos:
+        abrir_imagen(io.BytesIO(d), tamanio, reducido=reducido, estadisticas=estadisticas)
+    return estadisticas, rss_base
+
+
+def _resumen(nombre, estadisticas, rss_base):
+    decodificacion = np.array([e["decodificacion_ms"] for e in estadisticas])
+    total = decodificacion + np.array([e["redimension_ms"] for e in estadisticas])
+    memoria = np.array([e["memoria_decodificada_mb"] for e in estadisticas])
+    rss = max(e["rss_pico_proceso_mb"] for e in estadisticas) - rss_base
+    print(f"{nombre:<10}{np.median(decodificacion):>12.1f}{np.median(total):>12.1f}"
+          f"{np.median(memoria):>14.1f}{memoria.max():>14.1f}{rss:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", help="imágenes subidas reales; si falta se usan sintéticas")
+    parser.add_argument("--sinteticas", type=int, default=8)
+    parser.add_argument("--perfil", default="perros", choices=list(PERFILES))
+    args = parser.parse_args()
+
+    tamanio = PERFILES[args.perfil].tamanio
+    contexto = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as temporal:
+        directorio = args.directorio
+        if directorio is None:
+            directorio = temporal
+            # También en otro proceso: el pico de RSS se hereda al crear los procesos hijos
+            with contexto.Pool(1) as pool:
+                pool.apply(_escribir_sinteticas, (directorio, args.sinteticas))
+
+        print(f"directorio={directorio} perfil={args.perfil} ({tamanio[0]}x{tamanio[1]})")
+        print(f"{'modo':<10}{'decod. ms':>12}{'total ms':>12}{'mem. med. MB':>14}"
+              f"{'mem. máx. MB':>14}{'Δ RSS MB':>12}")
+        for nombre, reducido in (("completo", False), ("draft", True)):
+            with contexto.Pool(1) as pool:
+                estadisticas, rss_base = pool.apply(_ejecutar, ((directorio, tamanio, reducido),))
+            _resumen(nombre, estadisticas, rss_base)
+
+
+if __name__ == "__main__":
+    main()
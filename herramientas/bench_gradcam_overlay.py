@@ -0,0 +1,82 @@
+"""
+Compara la superposición de Grad-CAM con LUT y mezcla entera con la versión anterior.
+
+La versión anterior evaluaba el colormap de matplotlib sobre una imagen float y
+mezclaba en float64 a la resolución de la subida. Se mide tiempo y pico de
+memoria de NumPy (tracemalloc) a resolución completa y a resolución de pantalla.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.bench_gradcam_overlay --resolucion 4000x3000
+"""
+import argparse
+import time
+import tracemalloc
+
+import matplotlib
+import numpy as np
+from PIL import Image
+
+from utils.gradcam import superponer_heatmap
+
+
+def superponer_anterior(img, heatmap, alpha=0.4):
+    # Copia de save_and_display_gradcam antes del cambio
+    heatmap_uint = np.uint8(255 * heatmap)
+    heatmap_img  = Image.fromarray(heatmap_uint).resize(img.size, Image.BILINEAR)
+    heatmap_arr  = np.array(heatmap_img)
+
+    cmap = matplotlib.colormaps["jet"]
+    colored = cmap(heatmap_arr/255.0)[:, :, :3]
+    colored = np.uint8(colored * 255)
+
+    img_arr = np.array(img)
+    superimposed = img_arr * (1-alpha) + colored * alpha
+    superimposed = np.clip(superimposed, 0, 255).astype(np.uint8)
+
+    return Image.fromarray(superimposed)
+
+
+def medir(funcion, repeticiones):
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.median(tiempos)), pico / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolucion", default="4000x3000", help="ANCHOxALTO de la imagen subida")
+    parser.add_argument("--pantalla", type=int, default=700, help="lado mayor a resolución de pantalla")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    ancho, alto = (int(v) for v in args.resolucion.split("x"))
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8))
+    heatmap = rng.random((10, 10)).astype(np.float32)   # top_conv de EfficientNetB3 a 300x300
+
+    casos = [
+        ("anterior (float64)", lambda: superponer_anterior(img, heatmap)),
+        ("LUT + uint16", lambda: superponer_heatmap(img, heatmap)),
+        (f"LUT + uint16 a {args.pantalla}px", lambda: superponer_heatmap(img, heatmap, tamanio_max=args.pantalla)),
+    ]
+    diferencia = np.abs(np.asarray(superponer_anterior(img, heatmap), dtype=np.int16)
+                        - np.asarray(superponer_heatmap(img, heatmap), dtype=np.int16)).max()
+
+    print(f"imagen {args.resolucion}")
+    print(f"{'versión':<28}{'ms p50':>10}{'pico NumPy MB':>16}")
+    for nombre, funcion in casos:
+        ms, mb = medir(funcion, args.repeticiones)
+        print(f"{nombre:<28}{ms:>10.1f}{mb:>16.1f}")
+    print(f"diferencia máxima por píxel a resolución completa: {diferencia}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compara el pipeline de melanoma de una pasada con el de dos pasadas que usaba app6.
+
+- Arranque: antes, cada ejecución del script cargaba el modelo, hacía una
+  pasada en vacío y reconstruía el modelo de Grad-CAM; ahora eso pasa una
+  vez por proceso.
+- Petición: antes `predict` + Grad-CAM (dos pasadas hacia delante); ahora la
+  puntuación sale de la pasada de Grad-CAM.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.bench_melanoma --repeticiones 20
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.gradcam import construir_modelo_gradcam, make_gradcam_heatmap
+from utils.melanoma import PERFIL, PipelineMelanoma
+from utils.modelos import MODELOS, obtener_modelo
+from utils.preprocessing import PERFILES, preparar_lote
+
+
+def _ms(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return float(np.median(tiempos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    alto, ancho = PERFILES[PERFIL].tamanio
+    img = Image.fromarray(np.random.default_rng(0).integers(0, 256, (600, 800, 3), dtype=np.uint8))
+
+    # Arranque de la versión anterior: lo que app6 repetía en cada ejecución del script
+    inicio = time.perf_counter()
+    modelo_antes = tf.keras.models.load_model(MODELOS[PERFIL].ruta)
+    modelo_antes(np.zeros((1, alto, ancho, 3), dtype=np.float32))
+    grad_model = construir_modelo_gradcam(modelo_antes)
+    arranque_antes = time.perf_counter() - inicio
+
+    # Arranque actual: registro + pipeline, una vez por proceso
+    inicio = time.perf_counter()
+    melanoma = PipelineMelanoma(obtener_modelo(PERFIL))
+    arranque_despues = time.perf_counter() - inicio
+
+    def peticion_antes():
+        lote = preparar_lote([img], PERFIL)
+        modelo_antes.predict(lote, verbose=0)
+        make_gradcam_heatmap(lote, grad_model)
+
+    peticion_antes()
+    melanoma.analizar([img])
+    antes = _ms(peticion_antes, args.repeticiones)
+    despues = _ms(lambda: melanoma.analizar([img]), args.repeticiones)
+
+    print(f"{'':<34}{'antes':>10}{'ahora':>10}")
+    print(f"{'arranque (s)':<34}{arranque_antes:>10.2f}{arranque_despues:>10.2f}")
+    print(f"{'  repetido en cada ejecución':<34}{'sí':>10}{'no':>10}")
+    print(f"{'petición p50 (ms)':<34}{antes:>10.1f}{despues:>10.1f}")
+    print(f"ahorro por petición: {antes - despues:.1f} ms ({antes / despues:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compara el preprocesamiento por imagen que usaban las apps con `preparar_lote`.
+
+Genera JPEG sintéticos en memoria y mide, para cada camino, el tiempo por
+imagen y la memoria reservada por NumPy (tracemalloc).
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.bench_preprocesamiento
+    python -m herramientas.bench_preprocesamiento --perfil perros --imagenes 64 --resolucion 1600x1200
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from utils.preprocessing import NORMALIZACIONES, PERFILES, preparar_lote
+
+
+def imagenes_sinteticas(n, ancho, alto, semilla=0):
+    rng = np.random.default_rng(semilla)
+    datos = []
+    for _ in range(n):
+        pixeles = rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixeles).save(buffer, format="JPEG", quality=90)
+        datos.append(buffer.getvalue())
+    return datos
+
+
+def camino_por_imagen(datos, perfil):
+    # Réplica de cargar_preprocesar_imagen_desde_bytes: un array por imagen y luego concatenar
+    alto, ancho = perfil.tamanio
+    arrays = []
+    for d in datos:
+        img = Image.open(io.BytesIO(d)).convert("RGB")
+        img = img.resize((ancho, alto))
+        img_array = np.asarray(img, dtype=np.float32)   # image.img_to_array
+        img_array = np.expand_dims(img_array, axis=0)
+        if perfil.normalizacion == "escala_01":
+            img_array = img_array / 255.0
+        elif perfil.normalizacion != "efficientnet":
+            NORMALIZACIONES[perfil.normalizacion](img_array)
+        arrays.append(img_array)
+    return np.concatenate(arrays)
+
+
+def camino_por_lote(datos, perfil):
+    return preparar_lote([io.BytesIO(d) for d in datos], perfil)
+
+
+def medir(funcion, datos, perfil):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion(datos, perfil)
+    transcurrido = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, transcurrido, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perfil", default="flores", choices=list(PERFILES))
+    parser.add_argument("--imagenes", type=int, default=32)
+    parser.add_argument("--resolucion", default="1024x768", help="ANCHOxALTO de las imágenes sintéticas")
+    args = parser.parse_args()
+
+    ancho, alto = (int(v) for v in args.resolucion.split("x"))
+    perfil = PERFILES[args.perfil]
+    datos = imagenes_sinteticas(args.imagenes, ancho, alto)
+
+    antes, t_antes, m_antes = medir(camino_por_imagen, datos, perfil)
+    despues, t_despues, m_despues = medir(camino_por_lote, datos, perfil)
+    diferencia = float(np.max(np.abs(antes - despues)))
+
+    print(f"perfil={args.perfil} imagenes={args.imagenes} resolucion={args.resolucion}")
+    print(f"{'camino':<12}{'ms/imagen':>12}{'pico NumPy':>14}")
+    print(f"{'por imagen':<12}{t_antes / len(datos) * 1000:>12.2f}{m_antes / 2**20:>11.1f} MB")
+    print(f"{'por lote':<12}{t_despues / len(datos) * 1000:>12.2f}{m_despues / 2**20:>11.1f} MB")
+    print(f"diferencia máxima entre salidas: {diferencia:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Benchmark sin conexión de todo el camino de una clasificación, etapa por etapa.
+
+Para cada perfil de preprocesamiento (cada modelo del registro y tamaño de
+entrada que usan las apps: MobileNetV2 y EfficientNetB0 de app.py/app-1.py,
+mobile_fine_tuning.keras de app2.py y los modelos de Modelos/; los pesos de
+keras.applications tienen que estar ya en la caché de Keras) se procesa un
+conjunto fijo de imágenes sintéticas (misma semilla en todas las ejecuciones)
+y se cronometra por separado:
+
+    decodificacion   Image.open + draft + convert (utils.preprocessing.abrir_imagen)
+    redimension      redimensionado al tamaño del modelo
+    normalizacion    normalización del perfil sobre el lote
+    inferencia       pasada hacia delante (backend configurado: Keras o TFLite)
+    top_k            selección de las 5 clases más probables
+    gradcam          Grad-CAM de la clase predicha (si el modelo tiene capa convolucional)
+    wiki_local       búsqueda de la etiqueta en el almacén local de Wikipedia
+    reporte          PDF de una página (si fpdf está instalado)
+
+Cada perfil corre en un proceso nuevo, así el RSS de uno no se mezcla con el
+de otro. El resultado (p50/p95/p99 por etapa, RSS, commit) se guarda en JSON;
+con --comparar se muestran las diferencias de p50 con otro JSON, p. ej. el de
+otro commit.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.benchmark --salida bench/actual.json
+    python -m herramientas.benchmark --perfiles flores melanoma --comparar bench/anterior.json
+"""
+import argparse
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.preprocessing import PERFILES
+
+ETAPAS = ("decodificacion", "redimension", "normalizacion", "inferencia", "top_k", "gradcam", "wiki_local", "reporte")
+
+
+def imagenes_sinteticas(n, ancho, alto, semilla=0):
+    """JPEG en memoria: ruido a baja resolución ampliado (comprime como una foto real)."""
+    rng = np.random.default_rng(semilla)
+    imagenes = []
+    for _ in range(n):
+        pixeles = rng.integers(0, 256, (alto // 10, ancho // 10, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixeles).resize((ancho, alto), Image.Resampling.BICUBIC).save(buffer, "JPEG", quality=90)
+        imagenes.append(buffer.getvalue())
+    return imagenes
+
+
+def _rss_actual_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _percentiles(tiempos_ms):
+    t = np.asarray(tiempos_ms)
+    return {"n": int(t.size), "media_ms": float(t.mean()), "p50_ms": float(np.percentile(t, 50)),
+            "p95_ms": float(np.percentile(t, 95)), "p99_ms": float(np.percentile(t, 99))}
+
+
+def _medir_perfil(args):
+    # Proceso nuevo por perfil: las importaciones y la carga del modelo cuentan en su RSS
+    nombre_perfil, imagenes, repeticiones = args
+    from utils.backends import backend
+    from utils.etiquetas import ETIQUETADOS, titulo_wiki
+    from utils.modelos import funcion_inferencia, obtener_modelo, registro
+    from utils.preprocessing import NORMALIZACIONES, _rss_pico_mb, abrir_imagen
+    from utils.resultados import top_k
+    from utils.wiki import almacen
+
+    perfil = PERFILES[nombre_perfil]
+    alto, ancho = perfil.tamanio
+    rss_inicio = _rss_actual_mb()
+    inicio = time.perf_counter()
+    obtener_modelo(perfil.modelo)
+    inferir = funcion_inferencia(perfil.modelo, perfil.tamanio)
+    carga_s = time.perf_counter() - inicio
+
+    try:
+        from utils.gradcam import gradcam
+        gradcam(perfil.modelo, np.zeros((1, alto, ancho, 3), dtype=np.float32))
+    except ValueError:
+        gradcam = None
+    # utils.reportes importa fpdf solo al escribir: se comprueba aquí si está instalado
+    from utils.reportes import EntradaInforme, escribir_informe
+    if importlib.util.find_spec("fpdf") is None:
+        escribir_informe = None
+
+    tiempos = {etapa: [] for etapa in ETAPAS}
+
+    def cronometrar(etapa, funcion, *a):
+        t0 = time.perf_counter()
+        resultado = funcion(*a)
+        tiempos[etapa].append((time.perf_counter() - t0) * 1000)
+        return resultado
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # La primera vuelta calienta cachés y trazas y no se cuenta
+        for vuelta in range(repeticiones + 1):
+            if vuelta == 1:
+                tiempos = {etapa: [] for etapa in ETAPAS}
+            for datos in imagenes:
+                estadisticas = []
+                img = abrir_imagen(io.BytesIO(datos), perfil.tamanio, estadisticas=estadisticas)
+                tiempos["decodificacion"].append(estadisticas[0]["decodificacion_ms"])
+                tiempos["redimension"].append(estadisticas[0]["redimension_ms"])
+
+                lote = np.asarray(img, dtype=np.float32)[None]
+                cronometrar("normalizacion", NORMALIZACIONES[perfil.normalizacion], lote)
+                salida = cronometrar("inferencia", lambda: np.asarray(inferir(lote)))
+                indices, valores = cronometrar("top_k", top_k, salida, 5)
+                clase = int(indices[0, 0]) if salida.shape[-1] > 1 else int(salida[0, 0] >= 0.5)
+
+                heatmap = None
+                if gradcam is not None:
+                    heatmap = cronometrar("gradcam", gradcam, perfil.modelo, lote, [int(indices[0, 0])])[0][0]
+                if perfil.modelo in ETIQUETADOS:
+                    cronometrar("wiki_local", almacen.buscar, titulo_wiki(perfil.modelo, clase), "es")
+                if escribir_informe is not None:
+                    entrada = EntradaInforme(imagen=datos, titulo=nombre_perfil, clase=str(clase),
+                                             confianza=float(valores[0, 0]),
+                                             top=tuple(zip(map(str, indices[0]), valores[0].tolist())),
+                                             heatmap=heatmap)
+                    cronometrar("reporte", escribir_informe, [entrada], os.path.join(directorio, "informe.pdf"))
+
+    return {
+        "modelo": perfil.modelo,
+        "tamanio": [alto, ancho],
+        "backend": backend(perfil.modelo, perfil.tamanio),
+        "carga_modelo_s": carga_s,
+        "memoria_modelos_mb": registro.memoria_usada() / 2**20,
+        "rss_inicio_mb": rss_inicio,
+        "rss_final_mb": _rss_actual_mb(),
+        "rss_pico_mb": _rss_pico_mb(),
+        "etapas": {etapa: _percentiles(t) for etapa, t in tiempos.items() if t},
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _comparar(actual, anterior):
+    print(f"\nComparación de p50 con {anterior.get('commit') or 'el JSON anterior'} (ms, negativo = más rápido)")
+    for perfil, datos in actual["perfiles"].items():
+        previo = anterior.get("perfiles", {}).get(perfil)
+        if previo is None:
+            continue
+        print(f"{perfil}:")
+        for etapa, estadisticas in datos["etapas"].items():
+            if etapa in previo["etapas"]:
+                antes = previo["etapas"][etapa]["p50_ms"]
+                ahora = estadisticas["p50_ms"]
+                print(f"  {etapa:<16}{antes:>10.2f}{ahora:>10.2f}{ahora - antes:>+10.2f} ({(ahora / antes - 1) * 100:+.0f}%)"
+                      if antes else f"  {etapa:<16}{antes:>10.2f}{ahora:>10.2f}")
+        print(f"  {'rss_pico_mb':<16}{previo['rss_pico_mb']:>10.1f}{datos['rss_pico_mb']:>10.1f}"
+              f"{datos['rss_pico_mb'] - previo['rss_pico_mb']:>+10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perfiles", nargs="+", default=list(PERFILES), choices=list(PERFILES))
+    parser.add_argument("--imagenes", type=int, default=16, help="imágenes sintéticas del conjunto fijo")
+    parser.add_argument("--resolucion", default="1600x1200", help="ANCHOxALTO de las imágenes sintéticas")
+    parser.add_argument("--repeticiones", type=int, default=3, help="vueltas al conjunto por perfil")
+    parser.add_argument("--salida", default=None, help="JSON de resultados (por defecto bench/<commit>.json)")
+    parser.add_argument("--comparar", default=None, help="JSON de otra ejecución con el que comparar")
+    args = parser.parse_args()
+
+    ancho, alto = (int(v) for v in args.resolucion.split("x"))
+    imagenes = imagenes_sinteticas(args.imagenes, ancho, alto)
+    commit = _commit()
+    resultado = {
+        "commit": commit,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "plataforma": {"python": platform.python_version(), "sistema": platform.platform(),
+                       "cpus": os.cpu_count()},
+        "config": {"imagenes": args.imagenes, "resolucion": args.resolucion, "repeticiones": args.repeticiones,
+                   "entorno": {k: v for k, v in os.environ.items() if k.startswith("PROYECTOS_")}},
+        "perfiles": {},
+    }
+
+    contexto = multiprocessing.get_context("spawn")
+    for nombre in args.perfiles:
+        print(f"{nombre}...", flush=True)
+        with contexto.Pool(1) as pool:
+            datos = pool.apply(_medir_perfil, ((nombre, imagenes, args.repeticiones),))
+        resultado["perfiles"][nombre] = datos
+        print(f"{'etapa':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for etapa, e in datos["etapas"].items():
+            print(f"{etapa:<16}{e['p50_ms']:>10.2f}{e['p95_ms']:>10.2f}{e['p99_ms']:>10.2f}")
+        print(f"carga {datos['carga_modelo_s']:.1f} s, RSS pico {datos['rss_pico_mb']:.0f} MB ({datos['backend']})\n")
+
+    salida = args.salida or os.path.join("bench", f"{commit or 'sin-commit'}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            _comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Clasificación por lotes, sin interfaz, sobre directorios de imágenes archivadas.
+
+Las imágenes se decodifican en paralelo, una tarea por imagen en un pool de
+--trabajadores hilos (Pillow suelta el GIL al decodificar y redimensionar),
+directamente en el lote al que van; --prefetch acota cuántos lotes esperan a
+la inferencia. Se clasifican lote a lote y los resultados se escriben en
+cuanto salen. Si la salida ya existe, las imágenes que ya están en ella se
+saltan, así que un trabajo interrumpido se reanuda lanzando el mismo comando;
+una última fila a medio escribir por la interrupción se descarta.
+
+Formatos de salida según la extensión:
+    .csv / .jsonl   se añaden filas al archivo
+    .parquet        directorio con un archivo por lote (requiere pyarrow)
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.clasificar_lote archivo/flores/ --perfil flores --salida flores.csv
+    python -m herramientas.clasificar_lote manifiesto.txt --perfil melanoma --salida melanoma.parquet
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.etiquetas import ETIQUETADOS, nombres
+from utils.modelos import funcion_inferencia
+from utils.preprocessing import NORMALIZACIONES, PERFILES, abrir_imagen
+from utils.resultados import top_k
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+COLUMNAS = ["ruta", "clase", "etiqueta", "confianza", "top", "error"]
+
+
+def listar_entradas(entrada):
+    """Rutas de imágenes de un directorio (recursivo) o de un manifiesto (.txt o .csv con columna 'ruta')."""
+    if os.path.isdir(entrada):
+        for raiz, _, archivos in os.walk(entrada):
+            for nombre in sorted(archivos):
+                if nombre.lower().endswith(EXTENSIONES):
+                    yield os.path.join(raiz, nombre)
+    elif entrada.endswith(".csv"):
+        with open(entrada, newline="", encoding="utf-8") as f:
+            for fila in csv.DictReader(f):
+                yield fila["ruta"]
+    else:
+        with open(entrada, encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    yield linea.strip()
+
+
+class Escritor:
+    """Escritura incremental de resultados y lectura de lo ya hecho para reanudar."""
+
+    def __init__(self, salida):
+        self.salida = salida
+        self.formato = os.path.splitext(salida)[1].lstrip(".").lower()
+        if self.formato not in ("csv", "jsonl", "parquet"):
+            sys.exit(f"Formato de salida no soportado: {salida}")
+        if self.formato == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                sys.exit("La salida .parquet requiere pyarrow (pip install pyarrow)")
+
+    def _reparar(self):
+        # Cada fila es una línea terminada en salto de línea: si el archivo no acaba en uno,
+        # la última se cortó al interrumpir el trabajo y se descarta para no anexar detrás
+        with open(self.salida, "rb+") as f:
+            fin = f.seek(0, os.SEEK_END)
+            if fin == 0:
+                return
+            f.seek(fin - 1)
+            if f.read(1) == b"\n":
+                return
+            corte = posicion = fin
+            while posicion > 0:
+                inicio = max(0, posicion - 65536)
+                f.seek(inicio)
+                salto = f.read(posicion - inicio).rfind(b"\n")
+                if salto >= 0:
+                    corte = inicio + salto + 1
+                    break
+                posicion = inicio
+            else:
+                corte = 0
+            f.truncate(corte)
+        print(f"Descartada una última fila incompleta de {self.salida} ({fin - corte} bytes)")
+
+    def hechas(self):
+        if not os.path.exists(self.salida):
+            return set()
+        if self.formato == "csv":
+            self._reparar()
+            with open(self.salida, newline="", encoding="utf-8") as f:
+                # Una fila corta (sin todas las columnas) no cuenta como hecha
+                return {fila["ruta"] for fila in csv.DictReader(f) if fila.get("error") is not None}
+        if self.formato == "jsonl":
+            self._reparar()
+            hechas = set()
+            with open(self.salida, encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        hechas.add(json.loads(linea)["ruta"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+            return hechas
+        import pyarrow.parquet as pq
+        return set(pq.read_table(self.salida, columns=["ruta"]).column("ruta").to_pylist())
+
+    def escribir(self, filas):
+        if self.formato == "csv":
+            nuevo = not os.path.exists(self.salida) or os.path.getsize(self.salida) == 0
+            with open(self.salida, "a", newline="", encoding="utf-8") as f:
+                escritor = csv.DictWriter(f, fieldnames=COLUMNAS)
+                if nuevo:
+                    escritor.writeheader()
+                escritor.writerows(filas)
+        elif self.formato == "jsonl":
+            with open(self.salida, "a", encoding="utf-8") as f:
+                for fila in filas:
+                    f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            os.makedirs(self.salida, exist_ok=True)
+            parte = os.path.join(self.salida, f"parte-{time.time_ns()}.parquet")
+            pq.write_table(pa.Table.from_pylist(filas), parte)
+
+
+def decodificar_en(lote, i, ruta, tamanio):
+    """Decodifica `ruta` en `lote[i]`. Devuelve None o el error en una sola línea (una fila por línea)."""
+    try:
+        lote[i] = abrir_imagen(ruta, tamanio)
+        return None
+    except Exception as e:
+        return " ".join(str(e).split()) or type(e).__name__
+
+
+def ensamblar(lote, rutas, futuros, perfil):
+    """Espera las tareas de un lote. Devuelve el lote normalizado de las válidas, sus rutas y los errores."""
+    validas, errores = [], {}
+    for i, (ruta, futuro) in enumerate(zip(rutas, futuros)):
+        error = futuro.result()
+        if error is None:
+            validas.append(i)
+        else:
+            errores[ruta] = error
+    if len(validas) < len(rutas):
+        lote = lote[validas]
+    NORMALIZACIONES[perfil.normalizacion](lote)
+    return lote, [rutas[i] for i in validas], errores
+
+
+def filas_resultado(salida, rutas, etiquetas, top):
+    filas = []
+    if salida.shape[-1] == 1:
+        # Sigmoide de una neurona: probabilidad de la clase 1
+        for ruta, p in zip(rutas, salida[:, 0]):
+            clase = int(p >= 0.5)
+            filas.append({"ruta": ruta, "clase": clase, "etiqueta": str(etiquetas[clase]),
+                          "confianza": float(p if clase else 1 - p), "top": None, "error": None})
+        return filas
+
+    # Selección parcial sobre todo el lote y nombres por indexado del array de etiquetas
+    indices, valores = top_k(salida, top)
+    for ruta, nombre, fila_indices, fila_valores in zip(rutas, etiquetas[indices[:, 0]], indices, valores):
+        filas.append({
+            "ruta": ruta,
+            "clase": int(fila_indices[0]),
+            "etiqueta": str(nombre),
+            "confianza": float(fila_valores[0]),
+            "top": json.dumps([[int(i), float(v)] for i, v in zip(fila_indices, fila_valores)]),
+            "error": None,
+        })
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entrada", help="directorio de imágenes o manifiesto (.txt o .csv con columna 'ruta')")
+    parser.add_argument("--perfil", required=True,
+                        choices=[n for n, p in PERFILES.items() if p.modelo in ETIQUETADOS])
+    parser.add_argument("--salida", required=True, help="archivo .csv, .jsonl o .parquet")
+    parser.add_argument("--lote", type=int, default=32)
+    parser.add_argument("--trabajadores", type=int, default=os.cpu_count() or 4,
+                        help="hilos de decodificación (una imagen por tarea)")
+    parser.add_argument("--prefetch", type=int, default=4,
+                        help="lotes decodificados o en decodificación que esperan a la inferencia")
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    perfil = PERFILES[args.perfil]
+    etiquetas = nombres(perfil.modelo)
+    escritor = Escritor(args.salida)
+    hechas = escritor.hechas()
+    rutas = [r for r in listar_entradas(args.entrada) if r not in hechas]
+    print(f"{len(hechas)} imágenes ya clasificadas, {len(rutas)} pendientes")
+    if not rutas:
+        return
+
+    inferir = funcion_inferencia(perfil.modelo, perfil.tamanio)
+
+    # La cola acotada limita cuántos lotes esperan a la inferencia; la concurrencia
+    # de la decodificación la da el pool, que reparte las imágenes de esos lotes
+    en_vuelo = queue.Queue(maxsize=max(1, args.prefetch - 1))
+
+    def productor(ejecutor):
+        for i in range(0, len(rutas), args.lote):
+            trozo = rutas[i:i + args.lote]
+            lote = np.empty((len(trozo), *perfil.tamanio, 3), dtype=np.float32)
+            futuros = [ejecutor.submit(decodificar_en, lote, j, ruta, perfil.tamanio) for j, ruta in enumerate(trozo)]
+            en_vuelo.put((lote, trozo, futuros))
+        en_vuelo.put(None)
+
+    inicio = time.perf_counter()
+    procesadas = 0
+    with ThreadPoolExecutor(max_workers=args.trabajadores, thread_name_prefix="decodificar") as ejecutor:
+        hilo = threading.Thread(target=productor, args=(ejecutor,), daemon=True)
+        hilo.start()
+        while (pendiente := en_vuelo.get()) is not None:
+            lote, validas, errores = ensamblar(*pendiente, perfil)
+            filas = []
+            if validas:
+                filas = filas_resultado(np.asarray(inferir(lote)), validas, etiquetas, args.top)
+            filas += [{"ruta": r, "clase": None, "etiqueta": None, "confianza": None, "top": None, "error": e}
+                      for r, e in errores.items()]
+            escritor.escribir(filas)
+
+            procesadas += len(filas)
+            transcurrido = time.perf_counter() - inicio
+            print(f"\r{procesadas}/{len(rutas)} imágenes, {procesadas / transcurrido:.1f} img/s",
+                  end="", flush=True)
+    print()
+
+
+if __name__ == "__main__":
+    main()
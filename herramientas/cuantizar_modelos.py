@@ -0,0 +1,152 @@
+"""
+Genera las variantes cuantizadas de los modelos y un informe de precisión y latencia.
+
+Para cada modelo y cada tamaño de entrada que usan las apps:
+
+1. convierte el .keras a TFLite en cada variante (float32, float16, int8) y la
+   guarda en Modelos/cuantizados/ (se salta si ya existe, salvo con --forzar);
+2. compara las predicciones de cada variante con las del modelo Keras en
+   float sobre un conjunto de imágenes: acuerdo top-1 y top-5;
+3. mide en un proceso nuevo la latencia con una imagen (p50/p99) y la memoria
+   que añade cargar el modelo y hacer una pasada (ΔRSS).
+
+Sin --imagenes para un modelo se usan imágenes de ruido: sirve para la
+latencia y la memoria, pero el acuerdo solo es orientativo.
+
+El informe se imprime y se guarda en JSON; con él se elige la variante de cada
+modelo en PROYECTOS_VARIANTES (p. ej. perros=int8,melanoma=float16).
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.cuantizar_modelos --imagenes perros=validacion/perros flores=validacion/flores
+    python -m herramientas.cuantizar_modelos --modelos melanoma --variantes int8 --forzar
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from herramientas.clasificar_lote import listar_entradas
+from utils.backends import FuncionTFLite
+from utils.cuantizacion import DIRECTORIO, VARIANTES, convertir, ruta_variante
+from utils.inferencia import compilar
+from utils.modelos import MODELOS
+from utils.preprocessing import _rss_pico_mb, perfil_para, preparar_lote
+
+# Modelos propios (los .keras de Modelos/); los de keras.applications no se cuantizan aquí
+CUANTIZABLES = [n for n, e in MODELOS.items() if e.ruta and e.ruta.startswith("Modelos/")]
+
+
+def _imagenes(perfil, directorio, muestras):
+    if directorio:
+        rutas = list(listar_entradas(directorio))[:muestras]
+        return preparar_lote(rutas, perfil)
+    rng = np.random.default_rng(0)
+    ruido = [Image.fromarray(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)) for _ in range(muestras)]
+    return preparar_lote(ruido, perfil)
+
+
+def _predecir(funcion, lote, por_lote=32):
+    return np.concatenate([np.asarray(funcion(lote[i:i + por_lote])) for i in range(0, len(lote), por_lote)])
+
+
+def acuerdo(referencia, salida, k=5):
+    """Acuerdo de `salida` con `referencia`: top-1 (misma clase) y top-k (fracción media de clases comunes)."""
+    if referencia.shape[-1] == 1:
+        # Sigmoide de una neurona: misma decisión con umbral 0.5
+        return {"top1": float(np.mean((referencia[:, 0] >= 0.5) == (salida[:, 0] >= 0.5))), "top5": None,
+                "max_dif": float(np.abs(referencia - salida).max())}
+    k = min(k, referencia.shape[-1])
+    top_ref = np.argsort(referencia, axis=1)[:, -k:]
+    top_sal = np.argsort(salida, axis=1)[:, -k:]
+    comunes = (top_ref[:, :, None] == top_sal[:, None, :]).any(axis=2).mean()
+    return {"top1": float(np.mean(top_ref[:, -1] == top_sal[:, -1])), "top5": float(comunes),
+            "max_dif": float(np.abs(referencia - salida).max())}
+
+
+def _medir(args):
+    # Se ejecuta en un proceso nuevo: el RSS de un modelo no se mezcla con el de los demás
+    nombre, variante, tamanio, repeticiones = args
+    import tensorflow as tf
+
+    rss_base = _rss_pico_mb()
+    if variante == "keras":
+        funcion = compilar(tf.keras.models.load_model(MODELOS[nombre].ruta), tamanio)
+    else:
+        funcion = FuncionTFLite(ruta_variante(nombre, variante, tamanio))
+    x = np.random.default_rng(0).random((1, *tamanio, 3), dtype=np.float32)
+    funcion(x)
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(x)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {"p50_ms": float(np.percentile(tiempos, 50)), "p99_ms": float(np.percentile(tiempos, 99)),
+            "rss_mb": _rss_pico_mb() - rss_base}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelos", nargs="+", default=CUANTIZABLES, choices=CUANTIZABLES)
+    parser.add_argument("--variantes", nargs="+", default=list(VARIANTES), choices=VARIANTES)
+    parser.add_argument("--imagenes", nargs="*", default=[], metavar="MODELO=DIRECTORIO",
+                        help="imágenes de validación por modelo")
+    parser.add_argument("--muestras", type=int, default=200, help="imágenes por modelo como máximo")
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--forzar", action="store_true", help="vuelve a convertir las variantes ya guardadas")
+    parser.add_argument("--informe", default=os.path.join(DIRECTORIO, "informe.json"))
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    directorios = dict(par.split("=", 1) for par in args.imagenes)
+    os.makedirs(DIRECTORIO, exist_ok=True)
+    contexto = multiprocessing.get_context("spawn")
+    informe = []
+
+    for nombre in args.modelos:
+        espec = MODELOS[nombre]
+        modelo = tf.keras.models.load_model(espec.ruta)
+
+        for tamanio in espec.entradas:
+            for variante in args.variantes:
+                ruta = ruta_variante(nombre, variante, tamanio)
+                if args.forzar or not os.path.exists(ruta):
+                    print(f"Convirtiendo {nombre} {tamanio[0]}x{tamanio[1]} a {variante}...")
+                    with open(ruta, "wb") as f:
+                        f.write(convertir(modelo, tamanio, variante))
+
+            lote = _imagenes(perfil_para(nombre, tamanio), directorios.get(nombre), args.muestras)
+            referencia = _predecir(compilar(modelo, tamanio), lote)
+
+            print(f"\n{nombre} {tamanio[0]}x{tamanio[1]} ({len(lote)} imágenes"
+                  f"{'' if nombre in directorios else ' de ruido'})")
+            print(f"{'variante':<10}{'MB':>8}{'top-1':>8}{'top-5':>8}{'p50 ms':>9}{'p99 ms':>9}{'ΔRSS MB':>10}")
+            for variante in ["keras", *args.variantes]:
+                ruta = espec.ruta if variante == "keras" else ruta_variante(nombre, variante, tamanio)
+                if variante == "keras":
+                    precision = {"top1": 1.0, "top5": 1.0 if referencia.shape[-1] > 1 else None, "max_dif": 0.0}
+                else:
+                    precision = acuerdo(referencia, _predecir(FuncionTFLite(ruta), lote))
+                with contexto.Pool(1) as pool:
+                    rendimiento = pool.apply(_medir, ((nombre, variante, tamanio, args.repeticiones),))
+
+                fila = {"modelo": nombre, "tamanio": list(tamanio), "variante": variante,
+                        "archivo_mb": os.path.getsize(ruta) / 2**20, "imagenes": len(lote),
+                        "imagenes_reales": nombre in directorios, **precision, **rendimiento}
+                informe.append(fila)
+                top5 = f"{fila['top5']:>8.3f}" if fila["top5"] is not None else f"{'-':>8}"
+                print(f"{variante:<10}{fila['archivo_mb']:>8.1f}{fila['top1']:>8.3f}{top5}"
+                      f"{fila['p50_ms']:>9.1f}{fila['p99_ms']:>9.1f}{fila['rss_mb']:>10.1f}")
+
+    with open(args.informe, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\nInforme guardado en {args.informe}")
+
+
+if __name__ == "__main__":
+    main()
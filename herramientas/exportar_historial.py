@@ -0,0 +1,90 @@
+"""
+Consulta y exporta el historial de predicciones de todas las sesiones (ver utils.historial).
+
+Solo incluye lo que ya está en el almacén: los registros que salieron del
+anillo de su sesión y los de las sesiones ya terminadas. Cada fila lleva el
+nombre de la clase, la hora en ISO 8601 y el hash de la imagen en hexadecimal
+(el mismo de la caché de predicciones).
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.exportar_historial --salida historial.csv
+    python -m herramientas.exportar_historial --modelo perros --desde 2026-10-01 --salida historial.parquet
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+
+from utils.etiquetas import ETIQUETADOS, nombres
+from utils.historial import RUTA_DB, AlmacenHistorial
+
+COLUMNAS = ("sesion", "modelo", "fecha", "clase", "etiqueta", "confianza", "imagen")
+
+
+def filas_exportadas(almacen, modelo=None, sesion=None, desde=None):
+    etiquetas = {}
+    for sesion_fila, modelo_fila, tiempo, clase, confianza, imagen in almacen.filas(modelo, sesion, desde):
+        if modelo_fila not in etiquetas:
+            etiquetas[modelo_fila] = nombres(modelo_fila) if modelo_fila in ETIQUETADOS else None
+        yield {
+            "sesion": sesion_fila,
+            "modelo": modelo_fila,
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(tiempo)),
+            "clase": clase,
+            "etiqueta": str(etiquetas[modelo_fila][clase]) if etiquetas[modelo_fila] is not None else "",
+            "confianza": confianza,
+            "imagen": imagen.hex(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=RUTA_DB)
+    parser.add_argument("--modelo", default=None)
+    parser.add_argument("--sesion", default=None)
+    parser.add_argument("--desde", default=None, help="fecha AAAA-MM-DD (hora local)")
+    parser.add_argument("--salida", default=None, help=".csv, .jsonl o .parquet; sin salida, resumen por clase")
+    args = parser.parse_args()
+
+    desde = int(datetime.strptime(args.desde, "%Y-%m-%d").timestamp()) if args.desde else None
+    filas = filas_exportadas(AlmacenHistorial(args.db), args.modelo, args.sesion, desde)
+
+    if args.salida is None:
+        conteo = {}
+        for fila in filas:
+            conteo[(fila["modelo"], fila["etiqueta"])] = conteo.get((fila["modelo"], fila["etiqueta"]), 0) + 1
+        for (modelo, etiqueta), n in sorted(conteo.items(), key=lambda c: -c[1]):
+            print(f"{n:>8}  {modelo:<12}{etiqueta}")
+        return
+
+    n = 0
+    if args.salida.endswith(".csv"):
+        with open(args.salida, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.DictWriter(f, fieldnames=COLUMNAS)
+            escritor.writeheader()
+            for fila in filas:
+                escritor.writerow(fila)
+                n += 1
+    elif args.salida.endswith(".jsonl"):
+        with open(args.salida, "w", encoding="utf-8") as f:
+            for fila in filas:
+                f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+                n += 1
+    elif args.salida.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("La salida .parquet requiere pyarrow (pip install pyarrow)")
+        filas = list(filas)
+        pq.write_table(pa.Table.from_pylist(filas), args.salida)
+        n = len(filas)
+    else:
+        sys.exit("Solo se admiten salidas .csv, .jsonl o .parquet")
+    print(f"{n} registros exportados a {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Informe PDF de un lote ya clasificado con `herramientas.clasificar_lote`.
+
+Lee la salida (.csv o .jsonl) fila a fila y escribe una página por imagen:
+miniatura, clase, confianza y tabla top-k. Con --gradcam añade el Grad-CAM de
+la clase predicha, calculado imagen a imagen (requiere TensorFlow). FPDF
+guarda en memoria cada PDF entero hasta escribirlo, así que el informe se
+reparte en archivos de como mucho --paginas páginas (salida-001.pdf,
+salida-002.pdf, ...; uno solo si cabe) y la memoria no crece con el lote.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.informe_pdf flores.csv --perfil flores --salida flores.pdf
+    python -m herramientas.informe_pdf melanoma.jsonl --perfil melanoma --salida melanoma.pdf --gradcam
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from utils.etiquetas import ETIQUETADOS, nombres
+from utils.preprocessing import PERFILES, preparar_lote
+from utils.reportes import PAGINAS_MAX, EntradaInforme, escribir_informes
+
+
+def leer_filas(ruta):
+    """Filas de la salida de clasificar_lote, sin cargar el archivo entero."""
+    with open(ruta, newline="", encoding="utf-8") as f:
+        if ruta.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+
+
+def entradas(filas, perfil, etiquetas, gradcam=False, limite=None):
+    n = 0
+    for fila in filas:
+        if fila.get("error") or fila.get("clase") in (None, ""):
+            continue
+        if limite is not None and n >= limite:
+            return
+        clase = int(fila["clase"])
+        top = json.loads(fila["top"]) if fila.get("top") else []
+
+        heatmap = None
+        if gradcam:
+            from utils.gradcam import gradcam as calcular_gradcam
+            heatmap = calcular_gradcam(perfil.modelo, preparar_lote([fila["ruta"]], perfil), [clase])[0][0]
+
+        yield EntradaInforme(
+            imagen=fila["ruta"],
+            titulo=os.path.basename(fila["ruta"]),
+            clase=str(fila["etiqueta"]),
+            confianza=float(fila["confianza"]),
+            top=tuple((str(etiquetas[i]), p) for i, p in top),
+            heatmap=heatmap,
+        )
+        n += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("resultados", help="salida .csv o .jsonl de clasificar_lote")
+    parser.add_argument("--perfil", required=True,
+                        choices=[n for n, p in PERFILES.items() if p.modelo in ETIQUETADOS])
+    parser.add_argument("--salida", required=True, help="archivo .pdf")
+    parser.add_argument("--gradcam", action="store_true", help="añade el Grad-CAM de la clase predicha")
+    parser.add_argument("--limite", type=int, default=None, help="número máximo de páginas")
+    parser.add_argument("--paginas", type=int, default=PAGINAS_MAX, help="páginas por archivo PDF")
+    args = parser.parse_args()
+
+    if not args.resultados.endswith((".csv", ".jsonl")):
+        sys.exit("Solo se admiten resultados .csv o .jsonl")
+
+    perfil = PERFILES[args.perfil]
+    inicio = time.perf_counter()
+    rutas = escribir_informes(
+        entradas(leer_filas(args.resultados), perfil, nombres(perfil.modelo), args.gradcam, args.limite),
+        args.salida, args.paginas,
+    )
+    if not rutas:
+        sys.exit("No hay filas clasificadas en los resultados")
+    print(f"Informe escrito en {', '.join(rutas)} en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Compara la latencia de `model.predict` con la función trazada de cada app.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.latencia_inferencia
+    python -m herramientas.latencia_inferencia --apps app4 app6 --repeticiones 100
+"""
+import argparse
+
+from utils.inferencia import FIRMAS, comparar_latencia
+from utils.modelos import obtener_modelo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=list(FIRMAS), choices=list(FIRMAS))
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--lote", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'app':<6}{'modelo':<12}{'entrada':<10}{'predict p50':>13}{'trazada p50':>13}"
+          f"{'predict p99':>13}{'trazada p99':>13}{'x':>7}")
+    for app in args.apps:
+        nombre, tamanio = FIRMAS[app]
+        r = comparar_latencia(obtener_modelo(nombre), tamanio, args.repeticiones, args.lote)
+        print(f"{app:<6}{nombre:<12}{tamanio[0]}x{tamanio[1]:<6}"
+              f"{r['predict_p50_ms']:>10.1f} ms{r['compilada_p50_ms']:>10.1f} ms"
+              f"{r['predict_p99_ms']:>10.1f} ms{r['compilada_p99_ms']:>10.1f} ms"
+              f"{r['aceleracion_p50']:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Memoria y latencia de varias réplicas de un modelo en el mismo host.
+
+Para cada modo se lanzan N procesos nuevos que cargan el modelo y, con todos
+cargados, clasifican --pasadas imágenes de una en una a la vez; después se
+lee /proc/<pid>/smaps_rollup de cada uno. El PSS reparte cada página
+compartida entre los procesos que la usan, así que la suma de PSS es la
+memoria física real de las N réplicas.
+
+    keras                .keras con load_model (cada réplica, su copia de los pesos)
+    tflite               variante TFLite con XNNPACK (reempaqueta los pesos en memoria privada)
+    tflite_sin_xnnpack   variante TFLite con los kernels de referencia: los pesos se leen del
+                         mmap del .tflite y las páginas se comparten entre réplicas, a cambio
+                         de más latencia
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.memoria_compartida --modelo perros --replicas 4
+    python -m herramientas.memoria_compartida --modelo perros --modos tflite tflite_sin_xnnpack --variante int8
+"""
+import argparse
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+from utils.modelos import MODELOS
+
+MODOS = ("keras", "tflite", "tflite_sin_xnnpack")
+CAMPOS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+# Espera máxima por la carga y por la medida de cada réplica (s)
+TIMEOUT_S = 600
+
+
+def _cargar(modo, nombre, variante):
+    """Función lote -> salida del modelo en `modo`, ya calentada."""
+    espec = MODELOS[nombre]
+    alto, ancho = espec.entradas[0]
+    lote = np.zeros((1, alto, ancho, 3), dtype=np.float32)
+    if modo.startswith("tflite"):
+        from utils.backends import FuncionTFLite
+        from utils.cuantizacion import ruta_variante
+        funcion = FuncionTFLite(ruta_variante(nombre, variante, (alto, ancho)), xnnpack=(modo == "tflite"))
+    else:
+        import tensorflow as tf
+        modelo = tf.keras.models.load_model(espec.ruta)
+
+        def funcion(lote):
+            return modelo(lote, training=False)
+    funcion(lote)
+    return funcion
+
+
+def _replica(modo, nombre, variante, pasadas, estados, medir, fin):
+    try:
+        funcion = _cargar(modo, nombre, variante)
+    except Exception as e:
+        estados.put(f"{type(e).__name__}: {e}")
+        return
+    estados.put(None)
+
+    medir.wait()
+    alto, ancho = MODELOS[nombre].entradas[0]
+    lote = np.random.default_rng(0).uniform(0, 255, (1, alto, ancho, 3)).astype(np.float32)
+    latencias = []
+    for _ in range(pasadas):
+        inicio = time.perf_counter()
+        np.asarray(funcion(lote))
+        latencias.append(time.perf_counter() - inicio)
+    estados.put(latencias)
+    fin.wait()
+
+
+def _memoria(pid):
+    """Campos de smaps_rollup del proceso `pid`, en MB."""
+    valores = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for linea in f:
+            partes = linea.split()
+            if partes and partes[0].rstrip(":") in CAMPOS:
+                valores[partes[0].rstrip(":")] = int(partes[1]) / 1024
+    return valores
+
+
+def _recoger(estados, procesos):
+    """Un mensaje por réplica; RuntimeError si una falla o muere sin responder."""
+    mensajes = []
+    while len(mensajes) < len(procesos):
+        try:
+            mensajes.append(estados.get(timeout=TIMEOUT_S))
+        except queue.Empty:
+            muertos = [p.exitcode for p in procesos if p.exitcode is not None]
+            raise RuntimeError(f"réplicas sin responder (códigos de salida: {muertos})") from None
+        if isinstance(mensajes[-1], str):
+            raise RuntimeError(mensajes[-1])
+    return mensajes
+
+
+def medir(modo, nombre, variante, replicas, pasadas):
+    """(memoria de cada réplica, latencias en ms de todas) de `replicas` réplicas clasificando a la vez."""
+    contexto = multiprocessing.get_context("spawn")
+    estados = contexto.Queue()
+    medir_ya = contexto.Event()
+    fin = contexto.Event()
+    procesos = [contexto.Process(target=_replica, args=(modo, nombre, variante, pasadas, estados, medir_ya, fin))
+                for _ in range(replicas)]
+    for proceso in procesos:
+        proceso.start()
+    try:
+        _recoger(estados, procesos)
+        medir_ya.set()
+        latencias = np.concatenate(_recoger(estados, procesos)) * 1000
+        # Después de clasificar: la memoria incluye los búferes de trabajo de cada réplica
+        return [_memoria(proceso.pid) for proceso in procesos], latencias
+    finally:
+        fin.set()
+        medir_ya.set()
+        for proceso in procesos:
+            proceso.join(timeout=30)
+            if proceso.is_alive():
+                proceso.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelo", default="perros", choices=[n for n, e in MODELOS.items() if e.ruta is not None])
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--modos", nargs="+", default=list(MODOS), choices=MODOS)
+    parser.add_argument("--variante", default="int8", help="variante TFLite de los modos tflite")
+    parser.add_argument("--pasadas", type=int, default=50, help="imágenes que clasifica cada réplica")
+    args = parser.parse_args()
+
+    print(f"{args.replicas} réplicas de {args.modelo} (memoria en MB, latencia en ms)")
+    print(f"{'modo':<20}{'RSS total':>12}{'PSS total':>12}{'compartida/réplica':>20}{'privada/réplica':>18}"
+          f"{'p50':>8}{'p99':>8}")
+    for modo in args.modos:
+        try:
+            medidas, latencias = medir(modo, args.modelo, args.variante, args.replicas, args.pasadas)
+        except Exception as e:
+            print(f"{modo:<20}no se pudo medir: {e}")
+            continue
+        total = {c: sum(m.get(c, 0.0) for m in medidas) for c in CAMPOS}
+        compartida = (total["Shared_Clean"] + total["Shared_Dirty"]) / args.replicas
+        privada = (total["Private_Clean"] + total["Private_Dirty"]) / args.replicas
+        print(f"{modo:<20}{total['Rss']:>12.0f}{total['Pss']:>12.0f}{compartida:>20.0f}{privada:>18.0f}"
+              f"{np.percentile(latencias, 50):>8.1f}{np.percentile(latencias, 99):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Llena el almacén local de Wikipedia con todas las etiquetas de los modelos.
+
+Consulta el título de Wikipedia de cada flor y de cada raza (columnas wiki_es,
+wiki_en de datos/etiquetas/) en cada idioma del selector de app5 y lo guarda en
+PROYECTOS_WIKI_DB. Las etiquetas que ya están en el almacén se saltan,
+así que se puede interrumpir y volver a lanzar.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.prefetch_wikipedia
+    python -m herramientas.prefetch_wikipedia --dominios perros --idiomas en --forzar
+"""
+import argparse
+
+from utils.etiquetas import tabla
+from utils.wiki import IDIOMAS, actualizar, almacen
+
+DOMINIOS = ("flores", "perros")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dominios", nargs="+", default=list(DOMINIOS), choices=DOMINIOS)
+    parser.add_argument("--idiomas", nargs="+", default=list(IDIOMAS), choices=IDIOMAS)
+    parser.add_argument("--forzar", action="store_true", help="vuelve a consultar las etiquetas ya guardadas")
+    args = parser.parse_args()
+
+    pendientes = []
+    for dominio in args.dominios:
+        for idioma in args.idiomas:
+            for nombre in sorted(set(tabla(dominio)[f"wiki_{idioma}"].tolist())):
+                if args.forzar or not almacen.buscar(nombre, idioma)[0]:
+                    pendientes.append((nombre, idioma))
+
+    print(f"{len(pendientes)} consultas pendientes")
+    sin_articulo = 0
+    # Secuencial a propósito: utils.wiki serializa las consultas por wikipedia.set_lang
+    for i, (nombre, idioma) in enumerate(pendientes, 1):
+        info = actualizar(nombre, idioma)
+        if info is None:
+            sin_articulo += 1
+        print(f"[{i}/{len(pendientes)}] {idioma} {nombre}: {info['titulo'] if info else 'sin artículo'}")
+    print(f"Listo. {sin_articulo} etiquetas sin artículo o con error de red.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Pool local de procesos de inferencia para las apps (ver utils.trabajadores).
+
+Arranca N procesos que precargan los modelos de Modelos/ y atienden el socket
+Unix; las apps lo usan si se arrancan con PROYECTOS_SOCKET_MODELOS apuntando
+al mismo socket. Los lotes y las probabilidades pasan por memoria compartida.
+
+Uso (desde la raíz del repositorio):
+    python -m herramientas.servidor_modelos --socket /tmp/proyectos-modelos.sock --procesos 4
+    PROYECTOS_SOCKET_MODELOS=/tmp/proyectos-modelos.sock streamlit run app4.py
+"""
+import argparse
+import logging
+import os
+
+from utils.trabajadores import SOCKET, iniciar_pool
+
+# Modelos entrenados del repositorio (utils.modelos.MODELOS con archivo en Modelos/)
+MODELOS_REPOSITORIO = ("flores", "perros", "melanoma")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=SOCKET or "/tmp/proyectos-modelos.sock")
+    parser.add_argument("--procesos", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--modelos", nargs="*", default=list(MODELOS_REPOSITORIO),
+                        help="modelos que precarga cada proceso; el resto se carga en la primera petición")
+    args = parser.parse_args()
+
+    # Cada proceso del pool es una réplica: utils.hilos reparte los núcleos entre ellas
+    os.environ.setdefault("PROYECTOS_REPLICAS", str(args.procesos))
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(message)s")
+    print(f"Pool de {args.procesos} procesos en {args.socket} (Ctrl+C para parar)")
+    iniciar_pool(args.socket, args.procesos, args.modelos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import numpy as np
+
+from utils.cache_predicciones import CachePredicciones, clave
+
+
+def _valores(n_bytes, valor=0):
+    return {"probabilidades": np.full(n_bytes // 4, valor, dtype=np.float32)}
+
+
+def test_clave_distingue_perfil_y_version():
+    datos = b"imagen"
+    assert clave(datos, "flores") != clave(datos, "perros")
+    # Los pesos int8 y float32 del mismo perfil no comparten entrada
+    assert clave(datos, "flores", "flores_int8:1") != clave(datos, "flores", "flores:1")
+    assert clave(datos, "flores", "v1") != clave(datos, "flores", "v2")
+    assert clave(datos, "flores", "v1") == clave(b"imagen", "flores", "v1")
+
+
+def test_en_cache_solo_calcula_al_fallar(tmp_path):
+    cache = CachePredicciones(ruta_disco=str(tmp_path / "p.sqlite"))
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        return _valores(16, 1)
+
+    cache.en_cache(b"a", "flores", calcular, "v1")
+    cache.en_cache(b"a", "flores", calcular, "v1")
+    assert len(llamadas) == 1
+    # Otra versión de los pesos vuelve a calcular
+    cache.en_cache(b"a", "flores", calcular, "v2")
+    assert len(llamadas) == 2
+    m = cache.metricas()
+    assert (m["aciertos_memoria"], m["fallos"]) == (1, 2)
+
+
+def test_memoria_acotada_en_bytes_expulsa_lo_menos_reciente():
+    # 1 KiB de memoria y sin disco: caben dos entradas de 400 bytes
+    cache = CachePredicciones(max_memoria_mb=1024 / 2**20, ruta_disco="")
+    cache.guardar("a", _valores(400))
+    cache.guardar("b", _valores(400))
+    cache.obtener("a")
+    cache.guardar("c", _valores(400))
+
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") is not None and cache.obtener("c") is not None
+    assert cache.metricas()["bytes_memoria"] == 800
+
+
+def test_nivel_de_disco_sobrevive_a_la_memoria(tmp_path):
+    ruta = str(tmp_path / "p.sqlite")
+    CachePredicciones(ruta_disco=ruta).guardar("a", _valores(16, 3))
+
+    otra = CachePredicciones(ruta_disco=ruta)
+    np.testing.assert_array_equal(otra.obtener("a")["probabilidades"], np.full(4, 3, dtype=np.float32))
+    assert otra.metricas()["aciertos_disco"] == 1
+
+
+def test_disco_acotado_en_bytes(tmp_path):
+    cache = CachePredicciones(ruta_disco=str(tmp_path / "p.sqlite"), max_disco_mb=1500 / 2**20)
+    for k in "abcd":
+        cache.guardar(k, _valores(400))
+    total = cache._db.execute("SELECT SUM(bytes) FROM predicciones").fetchone()[0]
+    assert total <= 1500
+    assert cache._db.execute("SELECT COUNT(*) FROM predicciones WHERE clave = 'a'").fetchone()[0] == 0
+
+
+def test_sin_disco_escribible_funciona_solo_en_memoria(tmp_path):
+    # El padre es un archivo: no se puede crear el directorio de la base de datos
+    (tmp_path / "archivo").write_text("")
+    cache = CachePredicciones(ruta_disco=str(tmp_path / "archivo" / "p.sqlite"))
+    valores = cache.en_cache(b"a", "flores", lambda: _valores(16, 2))
+    np.testing.assert_array_equal(cache.en_cache(b"a", "flores", lambda: None)["probabilidades"],
+                                  valores["probabilidades"])
@@ -0,0 +1,76 @@
+import csv
+import json
+from concurrent.futures import Future
+
+import numpy as np
+from PIL import Image
+
+from herramientas.clasificar_lote import COLUMNAS, Escritor, decodificar_en, ensamblar
+from utils.preprocessing import PERFILES
+
+
+def _fila(ruta, error=None):
+    return {"ruta": ruta, "clase": 1, "etiqueta": "rosa", "confianza": 0.9, "top": None, "error": error}
+
+
+def test_jsonl_descarta_la_ultima_linea_cortada_y_reanuda(tmp_path):
+    salida = tmp_path / "r.jsonl"
+    escritor = Escritor(str(salida))
+    escritor.escribir([_fila("a.jpg"), _fila("b.jpg")])
+    # Interrupción a mitad de la tercera fila
+    with open(salida, "a", encoding="utf-8") as f:
+        f.write('{"ruta": "c.jpg", "cla')
+
+    assert escritor.hechas() == {"a.jpg", "b.jpg"}
+    escritor.escribir([_fila("c.jpg")])
+    lineas = salida.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(l)["ruta"] for l in lineas] == ["a.jpg", "b.jpg", "c.jpg"]
+
+
+def test_csv_descarta_la_ultima_fila_cortada_y_reanuda(tmp_path):
+    salida = tmp_path / "r.csv"
+    escritor = Escritor(str(salida))
+    escritor.escribir([_fila("a.jpg"), _fila("b.jpg", error="archivo truncado")])
+    with open(salida, "a", encoding="utf-8") as f:
+        f.write("c.jpg,1,ro")
+
+    # Las filas con error también cuentan como hechas
+    assert escritor.hechas() == {"a.jpg", "b.jpg"}
+    escritor.escribir([_fila("c.jpg")])
+    with open(salida, newline="", encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+    assert [f["ruta"] for f in filas] == ["a.jpg", "b.jpg", "c.jpg"]
+    assert list(filas[0]) == COLUMNAS
+
+
+def test_csv_con_la_cabecera_cortada(tmp_path):
+    salida = tmp_path / "r.csv"
+    salida.write_text("ruta,cla", encoding="utf-8")
+    escritor = Escritor(str(salida))
+
+    assert escritor.hechas() == set()
+    escritor.escribir([_fila("a.jpg")])
+    with open(salida, newline="", encoding="utf-8") as f:
+        assert [f["ruta"] for f in csv.DictReader(f)] == ["a.jpg"]
+
+
+def test_decodificar_y_ensamblar_omite_las_imagenes_que_fallan(tmp_path):
+    perfil = PERFILES["flores"]
+    ruta_buena = tmp_path / "buena.png"
+    Image.new("RGB", (40, 30), (255, 0, 0)).save(ruta_buena)
+    ruta_mala = tmp_path / "mala.jpg"
+    ruta_mala.write_bytes(b"no es\nuna imagen")
+
+    rutas = [str(ruta_buena), str(ruta_mala)]
+    lote = np.zeros((2, *perfil.tamanio, 3), dtype=np.float32)
+    futuros = []
+    for i, ruta in enumerate(rutas):
+        futuro = Future()
+        futuro.set_result(decodificar_en(lote, i, ruta, perfil.tamanio))
+        futuros.append(futuro)
+    normalizado, validas, errores = ensamblar(lote, rutas, futuros, perfil)
+
+    assert validas == [str(ruta_buena)]
+    assert normalizado.shape == (1, *perfil.tamanio, 3)
+    # El error cabe en una sola línea de la salida
+    assert list(errores) == [str(ruta_mala)] and "\n" not in errores[str(ruta_mala)]
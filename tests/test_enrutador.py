@@ -0,0 +1,31 @@
+import numpy as np
+
+from utils.enrutador import RUTAS, elegir_ruta
+
+
+def _probabilidades(**masas):
+    # Reparte la masa de cada especialista entre sus clases y el resto en una clase ajena (0)
+    p = np.zeros(1000, dtype=np.float32)
+    for ruta, masa in masas.items():
+        p[RUTAS[ruta]] = masa / len(RUTAS[ruta])
+    p[0] = 1 - p.sum()
+    return p
+
+
+def test_elige_el_especialista_con_mas_masa():
+    ruta, masas = elegir_ruta(_probabilidades(perros=0.6, flores=0.1), umbral=0.3)
+    assert ruta == "perros"
+    assert abs(masas["perros"] - 0.6) < 1e-5 and abs(masas["flores"] - 0.1) < 1e-5
+
+    assert elegir_ruta(_probabilidades(perros=0.2, flores=0.35), umbral=0.3)[0] == "flores"
+
+
+def test_umbral():
+    assert elegir_ruta(_probabilidades(perros=0.29), umbral=0.3)[0] is None
+    assert elegir_ruta(_probabilidades(perros=0.3), umbral=0.3)[0] == "perros"
+    assert elegir_ruta(_probabilidades(), umbral=0.3) == (None, {"perros": 0.0, "flores": 0.0})
+
+
+def test_rutas_de_imagenet():
+    assert RUTAS["perros"][0] == 151 and RUTAS["perros"][-1] == 268
+    assert sorted(RUTAS["flores"]) == [738, 883, 984, 985, 986]
@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils import etiquetas
+
+CABECERA = "indice,carpeta,nombre_es,nombre_en,wiki_es,wiki_en\n"
+
+
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(etiquetas, "DIRECTORIO", str(tmp_path))
+    etiquetas.tabla.cache_clear()
+    yield tmp_path
+    etiquetas.tabla.cache_clear()
+
+
+def _escribir(directorio, filas):
+    (directorio / "flores.csv").write_text(CABECERA + "".join(filas), encoding="utf-8")
+
+
+def test_compila_el_csv_a_npy_ordenado_por_indice(directorio):
+    _escribir(directorio, ["1,10,rosa,rose,Rosa,Rose\n", "0,0,prímula,primrose,Primula,Primrose\n"])
+    tabla = etiquetas.tabla("flores")
+
+    assert os.path.exists(directorio / "flores.npy")
+    np.testing.assert_array_equal(tabla["indice"], [0, 1])
+    assert list(etiquetas.nombres("flores")) == ["prímula", "rosa"]
+    assert list(etiquetas.nombres("flores", "en")) == ["primrose", "rose"]
+    assert etiquetas.titulo_wiki("flores", 1, "en") == "Rose"
+    assert tabla["carpeta"][1] == "10"
+
+
+def test_recompila_si_el_csv_es_mas_reciente(directorio):
+    _escribir(directorio, ["0,0,rosa,rose,Rosa,Rose\n"])
+    etiquetas.tabla("flores")
+    _escribir(directorio, ["0,0,lirio,lily,Lirio,Lily\n"])
+    npy = directorio / "flores.npy"
+    os.utime(npy, (0, 0))
+    etiquetas.tabla.cache_clear()
+
+    assert list(etiquetas.nombres("flores")) == ["lirio"]
+
+
+def test_indices_con_huecos(directorio):
+    _escribir(directorio, ["0,0,a,a,a,a\n", "2,2,c,c,c,c\n"])
+    with pytest.raises(ValueError, match="sin huecos"):
+        etiquetas.compilar("flores")
+
+
+def test_validar(directorio):
+    _escribir(directorio, ["0,0,a,a,a,a\n", "1,1,b,b,b,b\n"])
+    etiquetas.validar("flores", 2)
+    # Una neurona sigmoide cubre dos etiquetas
+    etiquetas.validar("flores", 1)
+    with pytest.raises(ValueError, match="3 salidas"):
+        etiquetas.validar("flores", 3)
+
+
+def test_modelo_sin_etiquetas(directorio):
+    with pytest.raises(KeyError):
+        etiquetas.tabla("imagenet")
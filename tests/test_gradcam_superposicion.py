@@ -0,0 +1,37 @@
+import numpy as np
+from PIL import Image
+
+from herramientas.bench_gradcam_overlay import superponer_anterior
+from utils.gradcam import colorear_heatmap, superponer_heatmap
+
+
+def _entrada(ancho=97, alto=61):
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8))
+    heatmap = rng.random((7, 7)).astype(np.float32)
+    return img, heatmap
+
+
+def test_superposicion_entera_coincide_con_la_float():
+    img, heatmap = _entrada()
+    for alpha in (0.0, 0.4, 0.75, 1.0):
+        nueva = np.asarray(superponer_heatmap(img, heatmap, alpha), dtype=np.int16)
+        anterior = np.asarray(superponer_anterior(img, heatmap, alpha), dtype=np.int16)
+        assert nueva.shape == anterior.shape
+        # alpha en 1/256 y desplazamiento en vez de división: como mucho 2 niveles
+        assert np.abs(nueva - anterior).max() <= 2
+
+
+def test_colorear_usa_el_colormap_jet():
+    _, heatmap = _entrada()
+    color = np.asarray(colorear_heatmap(heatmap, (20, 10)))
+    assert color.shape == (10, 20, 3)
+    # Extremos de 'jet': azul oscuro en 0, rojo oscuro en 1
+    np.testing.assert_array_equal(np.asarray(colorear_heatmap(np.zeros((2, 2)), (1, 1)))[0, 0], [0, 0, 127])
+    np.testing.assert_array_equal(np.asarray(colorear_heatmap(np.ones((2, 2)), (1, 1)))[0, 0], [127, 0, 0])
+
+
+def test_tamanio_max_reduce_a_resolucion_de_pantalla():
+    img, heatmap = _entrada(400, 200)
+    assert superponer_heatmap(img, heatmap, tamanio_max=100).size == (100, 50)
+    assert superponer_heatmap(img, heatmap, tamanio_max=1000).size == (400, 200)
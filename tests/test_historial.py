@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from utils.historial import AlmacenHistorial, HistorialSesion
+
+
+def _clave(i):
+    return f"{i:032x}:flores"
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenHistorial(str(tmp_path / "historial.sqlite"))
+
+
+def test_anillo_guarda_los_ultimos_y_anexa_los_sobrescritos(almacen):
+    historial = HistorialSesion("flores", capacidad=3, destino=almacen)
+    for i in range(5):
+        historial.agregar(i, i / 10, _clave(i))
+
+    assert len(historial) == 3
+    # Del más nuevo al más antiguo
+    np.testing.assert_array_equal(historial.ultimos(5)["clase"], [4, 3, 2])
+    np.testing.assert_array_equal(historial.ultimos(2)["clase"], [4, 3])
+    # Los dos primeros se anexaron al sobrescribirse, en orden de llegada
+    filas = list(almacen.filas(sesion=historial.sesion))
+    assert [f[3] for f in filas] == [0, 1]
+    assert filas[1][5] == bytes.fromhex(_clave(1).partition(":")[0])
+
+
+def test_volcar_anexa_el_resto_en_orden_y_vacia(almacen):
+    historial = HistorialSesion("flores", capacidad=3, destino=almacen)
+    for i in range(4):
+        historial.agregar(i, 0.5, _clave(i))
+    historial.volcar()
+
+    assert len(historial) == 0
+    assert [f[3] for f in almacen.filas(modelo="flores")] == [0, 1, 2, 3]
+    # Volcar otra vez no duplica nada
+    historial.volcar()
+    assert len(list(almacen.filas())) == 4
+
+
+def test_memoria_fija(almacen):
+    historial = HistorialSesion("flores", capacidad=50, destino=almacen)
+    antes = historial.bytes()
+    for i in range(200):
+        historial.agregar(i % 102, 0.9, _clave(i))
+    assert historial.bytes() == antes == 50 * 26
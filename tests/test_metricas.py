@@ -0,0 +1,46 @@
+from utils.metricas import LIMITES_S, Metricas
+
+
+def _lineas(texto):
+    return texto.splitlines()
+
+
+def test_histograma_acumulado_y_contadores():
+    m = Metricas()
+    m.observar("app4", "inferencia", 0.003)
+    m.observar("app4", "inferencia", 0.2)
+    m.observar("app4", "inferencia", 100.0)
+    m.contar("errores", app="app4", etapa="inferencia")
+    lineas = _lineas(m.texto_prometheus())
+
+    cubeta = lambda le: f'proyectos_etapa_segundos_bucket{{app="app4",etapa="inferencia",le="{le}"}}'
+    assert f"{cubeta(0.001)} 0" in lineas
+    assert f"{cubeta(0.005)} 1" in lineas
+    assert f"{cubeta(0.25)} 2" in lineas
+    assert f"{cubeta(LIMITES_S[-1])} 2" in lineas
+    assert f"{cubeta('+Inf')} 3" in lineas
+    assert 'proyectos_etapa_segundos_count{app="app4",etapa="inferencia"} 3' in lineas
+    assert 'proyectos_errores_total{app="app4",etapa="inferencia"} 1' in lineas
+
+
+def test_cabeceras_una_vez_por_familia():
+    m = Metricas()
+    m.observar("app3", "inferencia", 0.01)
+    m.observar("app4", "decodificacion", 0.01)
+    lineas = _lineas(m.texto_prometheus())
+
+    assert lineas.count("# TYPE proyectos_etapa_segundos histogram") == 1
+    assert sum(l.startswith("# HELP proyectos_etapa_segundos ") for l in lineas) == 1
+
+
+def test_etapa_cuenta_errores_y_escapa_etiquetas():
+    m = Metricas()
+    try:
+        with m.etapa('app "x"', "inferencia"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    texto = m.texto_prometheus()
+
+    assert 'proyectos_errores_total{app="app \\"x\\"",etapa="inferencia"} 1' in texto
+    assert m.resumen()[0]["peticiones"] == 1
@@ -0,0 +1,19 @@
+import numpy as np
+
+from utils.resultados import top_k
+
+
+def test_top_k_coincide_con_ordenar_todo():
+    rng = np.random.default_rng(0)
+    p = rng.random((8, 120)).astype(np.float32)
+    indices, valores = top_k(p, 5)
+    esperados = np.argsort(-p, axis=1)[:, :5]
+    assert indices.shape == valores.shape == (8, 5)
+    np.testing.assert_array_equal(indices, esperados)
+    np.testing.assert_array_equal(valores, np.take_along_axis(p, esperados, axis=1))
+
+
+def test_top_k_fila_unica_y_k_mayor_que_clases():
+    indices, valores = top_k(np.array([0.1, 0.7, 0.2]), k=5)
+    np.testing.assert_array_equal(indices, [[1, 2, 0]])
+    np.testing.assert_allclose(valores, [[0.7, 0.2, 0.1]])
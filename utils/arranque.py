@@ -0,0 +1,92 @@
+"""
+Arranque en frío de las apps.
+
+Las apps pintan el título y el cargador de imágenes antes de importar nada
+pesado; TensorFlow, pandas, fpdf, wikipedia, etc. se importan en un hilo de
+fondo (`importar_en_segundo_plano`) mientras el usuario elige la imagen, igual
+que el registro precarga los modelos.
+
+`registrar(app, evento)` apunta la primera vez que ocurre cada evento
+("primer_pintado", "primera_prediccion") en segundos desde el inicio del
+proceso, no desde la ejecución del script: incluye el arranque de Streamlit.
+"""
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+def _segundos_desde_inicio_proceso():
+    # /proc/self/stat: campo 22 = inicio del proceso en ticks desde el arranque del sistema
+    try:
+        with open("/proc/self/stat") as f:
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, AttributeError):
+        # Fuera de Linux: desde que se importó este módulo
+        return 0.0
+
+
+# Inicio del proceso en la escala de time.perf_counter
+INICIO = time.perf_counter() - _segundos_desde_inicio_proceso()
+
+_eventos = {}      # (app, evento) -> segundos desde el inicio del proceso
+_importando = {}   # módulo -> hilo que lo importa
+_lock = threading.Lock()
+
+
+def transcurrido():
+    return time.perf_counter() - INICIO
+
+
+def registrar(app, evento):
+    """Apunta `evento` de `app` la primera vez que ocurre en el proceso."""
+    with _lock:
+        if (app, evento) in _eventos:
+            return
+        _eventos[(app, evento)] = transcurrido()
+    log.info("%s: %s a los %.2f s del inicio del proceso", app, evento, _eventos[(app, evento)])
+
+
+def tiempos(app):
+    with _lock:
+        return {evento: s for (a, evento), s in _eventos.items() if a == app}
+
+
+def resumen(app):
+    """Texto con los tiempos de arranque de `app`, o None si aún no hay ninguno."""
+    t = tiempos(app)
+    partes = []
+    if "primer_pintado" in t:
+        partes.append(f"primer pintado {t['primer_pintado']:.1f} s")
+    if "primera_prediccion" in t:
+        partes.append(f"primera predicción {t['primera_prediccion']:.1f} s")
+    if not partes:
+        return None
+    return "⏱️ Arranque en frío (desde el inicio del proceso): " + " · ".join(partes)
+
+
+def importar_en_segundo_plano(*modulos):
+    """Importa `modulos` en un hilo de fondo, una sola vez por proceso; las importaciones posteriores son inmediatas."""
+    with _lock:
+        pendientes = [m for m in modulos if m not in sys.modules and m not in _importando]
+        if not pendientes:
+            return None
+
+        def _tarea():
+            for modulo in pendientes:
+                try:
+                    importlib.import_module(modulo)
+                except ImportError:
+                    # El fallo se verá (con su mensaje) cuando la app importe el módulo de verdad
+                    log.exception("No se pudo importar %s en segundo plano", modulo)
+
+        hilo = threading.Thread(target=_tarea, name="importaciones", daemon=True)
+        for modulo in pendientes:
+            _importando[modulo] = hilo
+    hilo.start()
+    return hilo
@@ -0,0 +1,101 @@
+"""
+Backend de inferencia de la clasificación: Keras o TFLite.
+
+Con el backend `tflite` la clasificación de una app corre en el intérprete de
+TFLite con XNNPACK sobre la variante exportada por
+`herramientas.cuantizar_modelos` (la de PROYECTOS_VARIANTES o, si no hay,
+`float32`). El intérprete se toma del runtime más ligero instalado
+(`ai-edge-litert` o `tflite-runtime`, unos MB) y solo si no hay ninguno del
+paquete completo de TensorFlow. Keras sigue siendo el backend por defecto y el
+de respaldo si falta el archivo .tflite; Grad-CAM siempre usa Keras.
+
+    PROYECTOS_BACKEND       backend por defecto (keras)
+    PROYECTOS_BACKENDS      backend por app, p. ej. "app4=tflite,app6=tflite"
+    PROYECTOS_TFLITE_HILOS  hilos de cada intérprete (núcleos / PROYECTOS_REPLICAS)
+    PROYECTOS_XNNPACK       1 para usar el delegado XNNPACK, 0 para los kernels de referencia
+                            (más lentos, pero leen los pesos del mmap del .tflite y las
+                            réplicas del host comparten sus páginas)
+"""
+import functools
+import os
+import threading
+
+import numpy as np
+
+from utils.hilos import REPLICAS
+from utils.inferencia import FIRMAS
+
+BACKENDS = ("keras", "tflite")
+BACKEND_POR_DEFECTO = os.environ.get("PROYECTOS_BACKEND", "keras")
+BACKENDS_APPS = dict(
+    par.strip().split("=", 1) for par in os.environ.get("PROYECTOS_BACKENDS", "").split(",") if par.strip()
+)
+# Sin definir: los núcleos repartidos entre las réplicas previstas en el host
+HILOS_TFLITE = int(os.environ.get("PROYECTOS_TFLITE_HILOS", "0")) or max(1, os.cpu_count() // REPLICAS)
+XNNPACK = os.environ.get("PROYECTOS_XNNPACK", "1") != "0"
+
+
+def backend(nombre, tamanio):
+    """Backend configurado para el modelo `nombre` con entrada `tamanio`, según la app que lo usa."""
+    for app, (modelo, tamanio_app) in FIRMAS.items():
+        if modelo == nombre and tamanio_app == tuple(tamanio) and app in BACKENDS_APPS:
+            return BACKENDS_APPS[app]
+    return BACKEND_POR_DEFECTO
+
+
+@functools.lru_cache(maxsize=None)
+def _runtime():
+    # (clase Interpreter, enum OpResolverType, nombre del paquete) del runtime más ligero disponible
+    try:
+        from ai_edge_litert.interpreter import Interpreter, OpResolverType
+        return Interpreter, OpResolverType, "ai_edge_litert"
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter, OpResolverType
+        return Interpreter, OpResolverType, "tflite_runtime"
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter, tf.lite.experimental.OpResolverType, "tensorflow"
+
+
+def runtime():
+    """Paquete que aporta el intérprete de TFLite."""
+    return _runtime()[2]
+
+
+class FuncionTFLite:
+    """Intérprete TFLite con la misma interfaz que las funciones trazadas: lote (N, H, W, 3) -> (N, ...)."""
+
+    def __init__(self, ruta, hilos=None, xnnpack=None):
+        Interpreter, OpResolverType, _ = _runtime()
+        xnnpack = XNNPACK if xnnpack is None else xnnpack
+
+        self.ruta = ruta
+        self._interprete = Interpreter(
+            model_path=ruta,
+            num_threads=hilos or HILOS_TFLITE,
+            # AUTO aplica XNNPACK, el delegado por defecto para CPU
+            experimental_op_resolver_type=(OpResolverType.AUTO if xnnpack
+                                           else OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES),
+        )
+        entrada = self._interprete.get_input_details()[0]
+        self._entrada = entrada["index"]
+        self._salida = self._interprete.get_output_details()[0]["index"]
+        # Reservado una vez para una imagen: cambiar de forma obliga a XNNPACK a
+        # rehacer su grafo, y con una imagen ya reparte cada capa entre los hilos
+        self._interprete.resize_tensor_input(self._entrada, [1, *entrada["shape"][1:]])
+        self._interprete.allocate_tensors()
+        # El intérprete no admite llamadas concurrentes
+        self._lock = threading.Lock()
+
+    def __call__(self, lote):
+        lote = np.asarray(lote, dtype=np.float32)
+        salidas = []
+        with self._lock:
+            for i in range(len(lote)):
+                self._interprete.set_tensor(self._entrada, lote[i:i + 1])
+                self._interprete.invoke()
+                salidas.append(self._interprete.get_tensor(self._salida)[0].copy())
+        return np.stack(salidas)
@@ -0,0 +1,171 @@
+"""
+Caché de predicciones direccionada por contenido.
+
+La clave es un hash de los bytes subidos más el perfil del modelo y la
+versión de los pesos que calculan el valor (utils.modelos.version: variante
+o backend y huella del archivo), así que la misma imagen subida otra vez (o
+por otra persona) no vuelve a pasar por el preprocesamiento ni por el modelo,
+y un modelo reentrenado u otra variante no sirven resultados ajenos. Hay dos
+niveles:
+
+- memoria: LRU acotado en MB, por proceso
+- disco (opcional): SQLite acotado en MB que sobrevive a los reinicios;
+  se expulsan primero las entradas con el acceso más antiguo. Se abre con la
+  primera consulta; si no se puede escribir en el directorio, solo memoria
+
+Los valores son dicts de arrays de NumPy (probabilidades, heatmaps...).
+"""
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+RUTA_DISCO = os.environ.get("PROYECTOS_CACHE_DISCO", ".cache/predicciones.sqlite")
+MAX_MEMORIA_MB = float(os.environ.get("PROYECTOS_CACHE_MEMORIA_MB", "64"))
+MAX_DISCO_MB = float(os.environ.get("PROYECTOS_CACHE_DISCO_MB", "512"))
+
+log = logging.getLogger(__name__)
+
+
+def clave(datos, perfil, version=""):
+    """Clave de caché para los bytes `datos` de una imagen evaluada con `perfil` y los pesos `version`."""
+    k = f"{hashlib.blake2b(datos, digest_size=16).hexdigest()}:{perfil}"
+    return f"{k}:{version}" if version else k
+
+
+def _serializar(valores):
+    buffer = io.BytesIO()
+    np.savez(buffer, **valores)
+    return buffer.getvalue()
+
+
+def _deserializar(blob):
+    with np.load(io.BytesIO(blob), allow_pickle=False) as datos:
+        return {k: datos[k] for k in datos.files}
+
+
+def _bytes_valores(valores):
+    return sum(np.asarray(v).nbytes for v in valores.values())
+
+
+class CachePredicciones:
+    def __init__(self, max_memoria_mb=MAX_MEMORIA_MB, ruta_disco=RUTA_DISCO, max_disco_mb=MAX_DISCO_MB):
+        self.max_memoria = int(max_memoria_mb * 2**20)
+        self.max_disco = int(max_disco_mb * 2**20)
+        self._memoria = OrderedDict()   # clave -> (valores, bytes)
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+        # El nivel de disco se abre con la primera consulta, no al importar el módulo
+        self._ruta_disco = ruta_disco
+        self._db = None
+        self._disco_abierto = not ruta_disco
+
+    def _disco(self):
+        # Se llama con el lock tomado. None si no hay nivel de disco o no se puede escribir en él
+        if not self._disco_abierto:
+            self._disco_abierto = True
+            try:
+                os.makedirs(os.path.dirname(self._ruta_disco) or ".", exist_ok=True)
+                db = sqlite3.connect(self._ruta_disco, check_same_thread=False, isolation_level=None)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS predicciones ("
+                    "clave TEXT PRIMARY KEY, datos BLOB NOT NULL, bytes INTEGER NOT NULL, acceso REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS idx_acceso ON predicciones (acceso)")
+                self._db = db
+            except (OSError, sqlite3.Error) as e:
+                log.warning("Caché de predicciones sin nivel de disco (%s): %s", self._ruta_disco, e)
+        return self._db
+
+    def obtener(self, k):
+        with self._lock:
+            if k in self._memoria:
+                self._memoria.move_to_end(k)
+                self.aciertos_memoria += 1
+                return self._memoria[k][0]
+
+            if self._disco() is not None:
+                fila = self._db.execute("SELECT datos FROM predicciones WHERE clave = ?", (k,)).fetchone()
+                if fila is not None:
+                    self._db.execute("UPDATE predicciones SET acceso = ? WHERE clave = ?", (time.time(), k))
+                    valores = _deserializar(fila[0])
+                    self._guardar_memoria(k, valores)
+                    self.aciertos_disco += 1
+                    return valores
+
+            self.fallos += 1
+            return None
+
+    def guardar(self, k, valores):
+        valores = {n: np.asarray(v) for n, v in valores.items()}
+        with self._lock:
+            self._guardar_memoria(k, valores)
+            if self._disco() is not None:
+                blob = _serializar(valores)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predicciones (clave, datos, bytes, acceso) VALUES (?, ?, ?, ?)",
+                    (k, blob, len(blob), time.time()),
+                )
+                self._expulsar_disco()
+
+    def _guardar_memoria(self, k, valores):
+        if k in self._memoria:
+            self._bytes_memoria -= self._memoria.pop(k)[1]
+        tamanio = _bytes_valores(valores)
+        self._memoria[k] = (valores, tamanio)
+        self._bytes_memoria += tamanio
+        while self._bytes_memoria > self.max_memoria and len(self._memoria) > 1:
+            _, (_, expulsado) = self._memoria.popitem(last=False)
+            self._bytes_memoria -= expulsado
+
+    def _expulsar_disco(self):
+        total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM predicciones").fetchone()[0]
+        while total > self.max_disco:
+            fila = self._db.execute(
+                "SELECT clave, bytes FROM predicciones ORDER BY acceso LIMIT 1"
+            ).fetchone()
+            if fila is None:
+                break
+            self._db.execute("DELETE FROM predicciones WHERE clave = ?", (fila[0],))
+            total -= fila[1]
+
+    def en_cache(self, datos, perfil, calcular, version=""):
+        """Devuelve los valores para (`datos`, `perfil`, `version`), llamando a `calcular()` solo si no están."""
+        k = clave(datos, perfil, version)
+        valores = self.obtener(k)
+        if valores is None:
+            valores = calcular()
+            self.guardar(k, valores)
+        return valores
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.aciertos_memoria + self.aciertos_disco + self.fallos
+            return {
+                "aciertos_memoria": self.aciertos_memoria,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "tasa_aciertos": (self.aciertos_memoria + self.aciertos_disco) / consultas if consultas else 0.0,
+                "entradas_memoria": len(self._memoria),
+                "bytes_memoria": self._bytes_memoria,
+            }
+
+
+# Instancia compartida por todas las sesiones del proceso
+cache = CachePredicciones()
+
+
+def en_cache(datos, perfil, calcular, version=""):
+    return cache.en_cache(datos, perfil, calcular, version)
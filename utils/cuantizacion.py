@@ -0,0 +1,75 @@
+"""
+Variantes cuantizadas (TFLite) de los modelos del registro.
+
+`herramientas.cuantizar_modelos` convierte cada modelo a TFLite en varias
+variantes y las guarda en `Modelos/cuantizados/`, un archivo por variante y
+tamaño de entrada:
+
+    float32   exportación directa, sin cuantizar
+    float16   pesos en float16 (la mitad de tamaño, se calcula en float32)
+    int8      cuantización de rango dinámico: pesos en int8, activaciones en float
+
+En ejecución, `PROYECTOS_VARIANTES` elige qué variante sirve la clasificación
+de cada modelo, p. ej. `perros=int8,melanoma=float16`, y las sirve con el
+backend TFLite (utils.backends). Grad-CAM sigue usando el modelo Keras, que
+necesita los gradientes.
+"""
+import os
+
+from utils.backends import FuncionTFLite
+from utils.inferencia import compilar
+
+VARIANTES = ("float32", "float16", "int8")
+DIRECTORIO = os.environ.get("PROYECTOS_DIR_CUANTIZADOS", "Modelos/cuantizados")
+
+# Variante activa por modelo, p. ej. "perros=int8,melanoma=float16"
+VARIANTES_ACTIVAS = dict(
+    par.strip().split("=", 1) for par in os.environ.get("PROYECTOS_VARIANTES", "").split(",") if par.strip()
+)
+
+
+def ruta_variante(nombre, variante, tamanio):
+    alto, ancho = tamanio
+    return os.path.join(DIRECTORIO, f"{nombre}.{variante}.{alto}x{ancho}.tflite")
+
+
+def convertir(modelo, tamanio, variante):
+    """Convierte `modelo` con entrada (None, alto, ancho, 3) a TFLite. Devuelve los bytes del modelo."""
+    import tensorflow as tf
+
+    if variante not in VARIANTES:
+        raise ValueError(f"Variante desconocida: {variante}")
+
+    conversor = tf.lite.TFLiteConverter.from_concrete_functions(
+        [compilar(modelo, tamanio).get_concrete_function()], modelo
+    )
+    if variante in ("float16", "int8"):
+        conversor.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variante == "float16":
+        conversor.target_spec.supported_types = [tf.float16]
+    return conversor.convert()
+
+
+class ModeloCuantizado:
+    """Lo que guarda el registro para `nombre@variante`: un intérprete por tamaño de entrada."""
+
+    def __init__(self, nombre, variante, hilos=None):
+        if variante not in VARIANTES:
+            raise ValueError(f"Variante desconocida: {variante}")
+        self.nombre = nombre
+        self.variante = variante
+        self.hilos = hilos
+
+    def ruta(self, tamanio):
+        ruta = ruta_variante(self.nombre, self.variante, tamanio)
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(
+                f"No existe {ruta}; genérelo con `python -m herramientas.cuantizar_modelos --modelos {self.nombre}`"
+            )
+        return ruta
+
+    def funcion(self, tamanio):
+        return FuncionTFLite(self.ruta(tamanio), self.hilos)
+
+    def bytes(self, tamanios):
+        return sum(os.path.getsize(self.ruta(t)) for t in tamanios)
@@ -0,0 +1,85 @@
+"""
+Enrutado de una imagen cualquiera al modelo especialista que le corresponde.
+
+Primero se clasifica con MobileNetV2 de ImageNet (el modelo más barato) y
+solo si la probabilidad acumulada en las clases de ImageNet de un especialista
+supera UMBRAL se pasa la imagen por ese especialista:
+
+    perros   razas de perro de ImageNet (151-268)          -> modelo de 120 razas
+    flores   margarita, zapatito de dama, maceta, jarrón,
+             colza (985, 986, 738, 883, 984)               -> modelo de 102 flores
+
+La imagen se decodifica una sola vez (a la escala que necesita el mayor de los
+modelos) y cada modelo solo la redimensiona. Las probabilidades de cada
+modelo se guardan en la caché de predicciones con la clave de su propio
+perfil, así que se comparten con las apps de cada modelo (app4, app3).
+"""
+import io
+import os
+
+import numpy as np
+
+from utils.cache_predicciones import en_cache
+from utils.lotes import predecir
+from utils.metricas import contar, etapa
+from utils.modelos import version_perfil
+from utils.preprocessing import PERFILES, decodificar, preparar_lote
+
+GENERAL = "imagenet"
+
+# Perfil del especialista -> índices de ImageNet que lo activan
+RUTAS = {
+    "perros": np.arange(151, 269),
+    "flores": np.array([738, 883, 984, 985, 986]),
+}
+UMBRAL = float(os.environ.get("PROYECTOS_UMBRAL_RUTA", "0.3"))
+
+
+def _tamanio_decodificacion():
+    perfiles = [PERFILES[GENERAL]] + [PERFILES[r] for r in RUTAS]
+    return max(p.tamanio[0] for p in perfiles), max(p.tamanio[1] for p in perfiles)
+
+
+def elegir_ruta(probabilidades, umbral=UMBRAL):
+    """
+    probabilidades: salida (1000,) de ImageNet
+    Devuelve (especialista o None, {especialista: probabilidad acumulada en sus clases}).
+    """
+    masas = {ruta: float(probabilidades[indices].sum()) for ruta, indices in RUTAS.items()}
+    mejor = max(masas, key=masas.get)
+    return (mejor if masas[mejor] >= umbral else None), masas
+
+
+def clasificar(datos, app="app_unificada"):
+    """
+    datos: bytes de la imagen subida
+    Devuelve un dict con las probabilidades de ImageNet (1000,), la ruta elegida
+    (o None), las masas de cada ruta y las probabilidades del especialista (o None).
+    """
+    decodificada = None
+
+    def imagen():
+        # Solo se decodifica si algún modelo no está en la caché
+        nonlocal decodificada
+        if decodificada is None:
+            with etapa(app, "decodificacion"):
+                decodificada = decodificar(io.BytesIO(datos), _tamanio_decodificacion())
+        return decodificada
+
+    def inferir(perfil):
+        def _calcular():
+            with etapa(app, f"preprocesamiento_{perfil}"):
+                lote = preparar_lote([imagen()], perfil)
+            with etapa(app, f"inferencia_{perfil}"):
+                return {"probabilidades": predecir(PERFILES[perfil].modelo, lote)}
+        return en_cache(datos, perfil, _calcular, version_perfil(perfil))["probabilidades"][0]
+
+    general = inferir(GENERAL)
+    ruta, masas = elegir_ruta(general)
+    contar("rutas", app=app, ruta=ruta or "ninguna")
+    return {
+        "imagenet": general,
+        "ruta": ruta,
+        "masas": masas,
+        "especialista": inferir(ruta) if ruta is not None else None,
+    }
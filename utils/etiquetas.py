@@ -0,0 +1,90 @@
+"""
+Nombres de las clases de cada modelo, compartidos por las apps y las herramientas.
+
+La fuente es un CSV por modelo en `datos/etiquetas/` (editable y legible desde
+cualquier lenguaje) con una fila por índice de salida del modelo:
+
+    indice      índice de salida del modelo
+    carpeta     carpeta del dataset de la que salió la clase, si no coincide con el índice
+                (Oxford Flowers 102: las carpetas se ordenaron como texto, "0", "1", "10", "100", ...)
+    nombre_es, nombre_en    nombre mostrado en cada idioma
+    wiki_es, wiki_en        título que se busca en Wikipedia en cada idioma
+
+Al primer uso el CSV se compila a un .npy de registros de ancho fijo al lado
+(solo si falta o el CSV es más reciente) y se abre con mmap: abrirlo no lee
+el archivo y todos los procesos comparten las mismas páginas. Los .npy son
+derivados y no se versionan (.gitignore); solo se versiona el CSV.
+"""
+import csv
+import functools
+import logging
+import os
+
+import numpy as np
+
+DIRECTORIO = os.environ.get("PROYECTOS_DIR_ETIQUETAS", "datos/etiquetas")
+CAMPOS = ("carpeta", "nombre_es", "nombre_en", "wiki_es", "wiki_en")
+
+# Nombre del modelo en utils.modelos.MODELOS con tabla de etiquetas
+ETIQUETADOS = ("gato_perro", "flores", "perros", "melanoma")
+
+log = logging.getLogger(__name__)
+
+
+def _leer_csv(modelo):
+    with open(os.path.join(DIRECTORIO, f"{modelo}.csv"), newline="", encoding="utf-8") as f:
+        filas = sorted(csv.DictReader(f), key=lambda fila: int(fila["indice"]))
+    indices = [int(fila["indice"]) for fila in filas]
+    if indices != list(range(len(filas))):
+        raise ValueError(f"{modelo}.csv: los índices deben ser 0..{len(filas) - 1} sin huecos ni repetidos")
+
+    dtype = [("indice", np.int32)] + [(c, f"U{max(1, max(len(fila[c]) for fila in filas))}") for c in CAMPOS]
+    return np.array([(i, *(fila[c] for c in CAMPOS)) for i, fila in zip(indices, filas)], dtype=dtype)
+
+
+def compilar(modelo):
+    """Escribe `modelo`.npy a partir de `modelo`.csv y devuelve la tabla."""
+    tabla = _leer_csv(modelo)
+    ruta = os.path.join(DIRECTORIO, f"{modelo}.npy")
+    # Archivo temporal + rename: otro proceso nunca abre un .npy a medio escribir
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        np.save(f, tabla)
+    os.replace(temporal, ruta)
+    return tabla
+
+
+@functools.lru_cache(maxsize=None)
+def tabla(modelo):
+    """Tabla de etiquetas de `modelo` (array estructurado de solo lectura, una fila por índice)."""
+    if modelo not in ETIQUETADOS:
+        raise KeyError(f"Modelo sin etiquetas: {modelo}")
+    ruta_csv = os.path.join(DIRECTORIO, f"{modelo}.csv")
+    ruta_npy = os.path.join(DIRECTORIO, f"{modelo}.npy")
+    if not os.path.exists(ruta_npy) or os.path.getmtime(ruta_csv) > os.path.getmtime(ruta_npy):
+        try:
+            compilar(modelo)
+        except OSError:
+            # Directorio de solo lectura: se usa la tabla en memoria de este proceso
+            log.warning("No se pudo escribir %s; etiquetas de %s cargadas desde el CSV", ruta_npy, modelo)
+            return _leer_csv(modelo)
+    return np.load(ruta_npy, mmap_mode="r")
+
+
+def nombres(modelo, idioma="es"):
+    """Array de nombres indexable con los índices de salida del modelo."""
+    return tabla(modelo)[f"nombre_{idioma}"]
+
+
+def titulo_wiki(modelo, indice, idioma="es"):
+    return str(tabla(modelo)[f"wiki_{idioma}"][indice])
+
+
+def validar(modelo, salidas):
+    """Comprueba que la tabla de `modelo` cubre su salida de `salidas` neuronas."""
+    n = len(tabla(modelo))
+    # Una neurona sigmoide: dos etiquetas (salida < 0.5 y >= 0.5)
+    if salidas != n and not (salidas == 1 and n == 2):
+        raise ValueError(
+            f"El modelo {modelo} tiene {salidas} salidas y {DIRECTORIO}/{modelo}.csv {n} etiquetas"
+        )
@@ -1,52 +1,193 @@
-import tensorflow as tf
+import functools
+import io
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from PIL import Image
-import matplotlib.cm as cm
+import matplotlib
+
+from utils.modelos import registro
+from utils.preprocessing import preparar_lote
+
+# TensorFlow se importa en las funciones que lo usan: la superposición del
+# heatmap (LUT y mezcla entera) solo necesita NumPy y PIL
+
+
+def _ultima_conv(layer):
+    import tensorflow as tf
+
+    if isinstance(layer, tf.keras.layers.Conv2D):
+        return layer
+    if hasattr(layer, "layers"):
+        for sublayer in reversed(layer.layers):
+            encontrada = _ultima_conv(sublayer)
+            if encontrada is not None:
+                return encontrada
+    return None
+
+
+def buscar_ultima_conv(modelo):
+    """
+    Devuelve (capa de primer nivel que la contiene, capa) de la última Conv2D,
+    buscando también dentro de submodelos (p. ej. la base EfficientNet de un Sequential).
+    """
+    for layer in reversed(modelo.layers):
+        encontrada = _ultima_conv(layer)
+        if encontrada is not None:
+            return layer, encontrada
+    raise ValueError("No se encontró una capa Conv2D en el modelo.")
+
+
+def construir_modelo_gradcam(modelo):
+    """
+    Modelo funcional con salidas [activaciones de la última Conv2D, predicción final].
+
+    Si la capa está dentro de una base anidada, se reconstruye la cabeza (las
+    capas posteriores a la base, que se asumen en secuencia) sobre la salida de
+    la base, igual que hacía app6 a mano, para que ambas salidas compartan grafo.
+    """
+    import tensorflow as tf
+
+    base, capa = buscar_ultima_conv(modelo)
+    if base is capa:
+        return tf.keras.Model(inputs=modelo.inputs, outputs=[capa.output, modelo.output])
+
+    x = base.output
+    for layer in modelo.layers[modelo.layers.index(base) + 1:]:
+        if not isinstance(layer, tf.keras.layers.InputLayer):
+            x = layer(x)
+    return tf.keras.Model(inputs=base.inputs, outputs=[capa.output, x])
+
+
+def _mapas(conv_outputs, grads):
+    import tensorflow as tf
+
+    # Pesos por muestra y canal: promedio espacial de los gradientes -> (N, C)
+    pesos = tf.reduce_mean(grads, axis=(1, 2))
+    # Suma ponderada de mapas para todo el lote de una vez -> (N, H, W)
+    heatmaps = tf.einsum("nhwc,nc->nhw", conv_outputs, pesos)
+    # ReLU + normalización por muestra
+    heatmaps = tf.nn.relu(heatmaps)
+    return heatmaps / (tf.reduce_max(heatmaps, axis=(1, 2), keepdims=True) + 1e-10)
+
+
+def _paso_gradcam(grad_model, lote, clases):
+    import tensorflow as tf
+
+    with tf.GradientTape() as tape:
+        conv_outputs, preds = grad_model(lote, training=False)
+        if preds.shape[-1] == 1:
+            # Sigmoide de una neurona: se explica siempre esa salida
+            objetivo = preds[:, 0]
+        else:
+            # clases < 0 -> se explica la clase predicha
+            clases = tf.where(clases < 0, tf.argmax(preds, axis=-1, output_type=tf.int32), clases)
+            objetivo = tf.gather(preds, clases, batch_dims=1)
+    # Las muestras no interactúan (inferencia), así que el gradiente de la
+    # suma del lote da el gradiente de cada muestra respecto a sus activaciones
+    grads = tape.gradient(objetivo, conv_outputs)
+    return _mapas(conv_outputs, grads), preds
+
+
+def motor_gradcam(grad_model):
+    """
+    Función (lote, clases=None) -> (heatmaps, predicciones) trazada una vez para `grad_model`.
+
+    clases: índice a explicar por muestra; None o -1 explica la clase predicha.
+    """
+    import tensorflow as tf
+
+    paso = tf.function(lambda lote, clases: _paso_gradcam(grad_model, lote, clases), reduce_retracing=True)
+
+    def calcular(lote, clases=None):
+        lote = np.asarray(lote, dtype=np.float32)
+        if clases is None:
+            clases = np.full(len(lote), -1)
+        heatmaps, preds = paso(lote, np.asarray(clases, dtype=np.int32))
+        return heatmaps.numpy(), preds.numpy()
+
+    return calcular
+
+
+def motor_registrado(nombre):
+    """
+    Motor de Grad-CAM del modelo `nombre` del registro.
+
+    El modelo de gradientes y su función trazada se construyen una vez por
+    modelo cargado y se liberan con él si el registro lo expulsa.
+    """
+    return registro.recurso(nombre, "gradcam", lambda m: motor_gradcam(construir_modelo_gradcam(m)))
+
+
+def gradcam(nombre, lote, clases=None):
+    """Grad-CAM por lotes: (heatmaps (N, h, w) en [0, 1], predicciones (N, clases))."""
+    return motor_registrado(nombre)(lote, clases)
+
+
+_ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gradcam")
+
+
+def gradcam_async(nombre, imagen, perfil, clase):
+    """Future con el heatmap (h, w) de `clase` para `imagen` (ruta, bytes o PIL), calculado en un hilo aparte."""
+    def _tarea():
+        lote = preparar_lote([io.BytesIO(imagen) if isinstance(imagen, bytes) else imagen], perfil)
+        return np.asarray(gradcam(nombre, lote, [clase])[0][0])
+    return _ejecutor.submit(_tarea)
+
 
 def make_gradcam_heatmap(img_batch, model):
     """
     img_batch: array (1, H, W, 3)
     model: modelo funcional con outputs [conv_outputs, final_pred]
     """
-    with tf.GradientTape() as tape:
-        conv_outputs, preds = model(img_batch, training=False)
-        tape.watch(conv_outputs)
-        # si tu salida es una sigmoide de 1 neurona:
-        class_channel = preds[:, 0]
+    clases = np.full(len(img_batch), -1, dtype=np.int32)
+    heatmaps, _ = _paso_gradcam(model, np.asarray(img_batch, dtype=np.float32), clases)
+    return heatmaps[0].numpy()
+
 
-    grads = tape.gradient(class_channel, conv_outputs)
-    # Si aún grads es None, revisa que last_conv_layer realmente influya en preds
+@functools.lru_cache(maxsize=None)
+def _lut_jet():
+    # Colormap 'jet' evaluado una sola vez en los 256 niveles posibles del heatmap en uint8
+    # (mismos valores que cmap(v / 255.0) en la versión anterior)
+    return (matplotlib.colormaps["jet"](np.arange(256) / 255.0)[:, :3] * 255).astype(np.uint8)
 
-    # Promediado espacial de gradientes
-    pooled_grads = tf.reduce_mean(grads, axis=(0,1,2))
 
-    # Sumar ponderada de mapas
-    conv_outputs = conv_outputs[0]  # quitar batch
-    heatmap      = tf.reduce_sum(conv_outputs * pooled_grads, axis=-1)
+@functools.lru_cache(maxsize=16)
+def _lut_jet_ponderada(alpha_256):
+    # LUT ya multiplicada por alpha (en 1/256) para mezclar con enteros de 16 bits
+    return _lut_jet().astype(np.uint16) * np.uint16(alpha_256)
 
-    # ReLU + normalización
-    heatmap = tf.maximum(heatmap, 0)
-    heatmap = heatmap / (tf.reduce_max(heatmap) + 1e-10)
 
-    return heatmap.numpy()
+def _heatmap_uint8(heatmap, tamanio):
+    # Escala a uint8 y redimensiona en PIL (uint8, sin floats a resolución completa)
+    return np.asarray(Image.fromarray(np.uint8(255 * heatmap)).resize(tamanio, Image.BILINEAR))
 
-def save_and_display_gradcam(img, heatmap, alpha=0.4):
-    # Escala heatmap a uint8 y redimensiona
-    heatmap_uint = np.uint8(255 * heatmap)
-    heatmap_img  = Image.fromarray(heatmap_uint).resize(img.size, Image.BILINEAR)
-    heatmap_arr  = np.array(heatmap_img)
 
-    # Colormap
-    cmap = cm.get_cmap('jet')
-    colored = cmap(heatmap_arr/255.0)[:, :, :3]
-    colored = np.uint8(colored * 255)
+def colorear_heatmap(heatmap, tamanio):
+    """Heatmap en [0, 1] -> imagen RGB con el colormap 'jet' de tamaño `tamanio` (ancho, alto)."""
+    return Image.fromarray(_lut_jet()[_heatmap_uint8(heatmap, tamanio)])
 
-    # Superposición
-    img_arr = np.array(img)
-    superimposed = img_arr * (1-alpha) + colored * alpha
-    superimposed = np.clip(superimposed, 0, 255).astype(np.uint8)
 
-    return Image.fromarray(superimposed)
+def superponer_heatmap(img, heatmap, alpha=0.4, tamanio_max=None):
+    """
+    Superpone `heatmap` (en [0, 1]) coloreado sobre `img` con mezcla entera.
+
+    tamanio_max: si se indica, la superposición se hace a resolución de
+    pantalla (lado mayor <= tamanio_max) en vez de a la resolución de la subida.
+    """
+    if tamanio_max is not None and max(img.size) > tamanio_max:
+        escala = tamanio_max / max(img.size)
+        img = img.resize((max(1, round(img.width * escala)), max(1, round(img.height * escala))),
+                         reducing_gap=2.0)
 
+    a = int(round(alpha * 256))
+    # out = (img * (256 - a) + color * a) >> 8, todo en uint16 y en sitio
+    out = np.asarray(img.convert("RGB"), dtype=np.uint16)
+    out *= np.uint16(256 - a)
+    out += _lut_jet_ponderada(a)[_heatmap_uint8(heatmap, img.size)]
+    out >>= 8
+    return Image.fromarray(out.astype(np.uint8))
 
 
+def save_and_display_gradcam(img, heatmap, alpha=0.4, tamanio_max=None):
+    return superponer_heatmap(img, heatmap, alpha, tamanio_max)
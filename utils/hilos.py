@@ -0,0 +1,98 @@
+"""
+Hilos de TensorFlow (intra-op / inter-op) ajustados al host y al número de réplicas.
+
+Por defecto TensorFlow abre un hilo por núcleo en cada proceso; con varias
+réplicas de una app en la misma máquina se pisan entre ellas y la latencia de
+cola se dispara. `herramientas.ajustar_hilos` mide cada modelo con una rejilla
+de (intra, inter) corriendo a la vez las PROYECTOS_REPLICAS réplicas previstas
+y guarda el mejor ajuste por host, modelo y réplicas en PROYECTOS_HILOS_TF.
+
+El registro (utils.modelos) llama a `aplicar` antes de cargar cada modelo
+Keras. La configuración de hilos es global al proceso y TensorFlow solo la
+acepta antes de ejecutar la primera operación, así que se aplica la del
+primer modelo que se carga. Sin ajuste guardado y con más de una réplica
+se reparten los núcleos (intra = núcleos / réplicas, inter = 1); con una
+réplica y sin ajuste no se toca nada.
+"""
+import json
+import logging
+import os
+import platform
+import threading
+import time
+
+RUTA = os.environ.get("PROYECTOS_HILOS_TF", ".cache/hilos_tf.json")
+REPLICAS = max(1, int(os.environ.get("PROYECTOS_REPLICAS", "1")))
+
+log = logging.getLogger(__name__)
+
+_aplicado = None   # ajuste aplicado en este proceso ({} si ninguno)
+_lock = threading.Lock()
+
+
+def host():
+    """Clave del host en el archivo de ajustes: nombre y núcleos."""
+    return f"{platform.node()}/{os.cpu_count()}cpu"
+
+
+def leer(ruta=RUTA):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar(modelo, replicas, ajuste, ruta=RUTA):
+    """Guarda `ajuste` ({"intra", "inter", ...}) de `modelo` con `replicas` réplicas en este host."""
+    ajustes = leer(ruta)
+    ajustes.setdefault(host(), {}).setdefault(modelo, {})[str(replicas)] = {
+        **ajuste, "fecha": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(ajustes, f, indent=2)
+    os.replace(temporal, ruta)
+
+
+def ajuste(modelo, replicas=REPLICAS):
+    """{"intra", "inter"} para `modelo` en este host, o None si se deja el de TensorFlow."""
+    guardado = leer().get(host(), {}).get(modelo, {}).get(str(replicas))
+    if guardado is not None:
+        return {"intra": guardado["intra"], "inter": guardado["inter"]}
+    if replicas > 1:
+        return {"intra": max(1, (os.cpu_count() or 1) // replicas), "inter": 1}
+    return None
+
+
+def fijar(intra, inter):
+    """Configura los hilos de TensorFlow del proceso si aún no se ha hecho. Devuelve el ajuste vigente."""
+    global _aplicado
+    with _lock:
+        if _aplicado is not None:
+            return _aplicado
+        import tensorflow as tf
+
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(intra)
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+            _aplicado = {"intra": intra, "inter": inter}
+            log.info("Hilos de TensorFlow: intra-op %d, inter-op %d", intra, inter)
+        except RuntimeError:
+            # TensorFlow ya ejecutó alguna operación en este proceso
+            log.warning("TensorFlow ya estaba inicializado; no se aplican intra-op %d, inter-op %d", intra, inter)
+            _aplicado = {}
+        return _aplicado
+
+
+def aplicar(modelo):
+    """Aplica el ajuste de `modelo` si es el primero que se carga en el proceso."""
+    if _aplicado is not None:
+        if _aplicado and ajuste(modelo) not in (None, _aplicado):
+            log.info("%s tiene otro ajuste de hilos; se mantiene el del primer modelo cargado", modelo)
+        return _aplicado
+    elegido = ajuste(modelo)
+    if elegido is None:
+        return None
+    return fijar(elegido["intra"], elegido["inter"])
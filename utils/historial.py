@@ -0,0 +1,134 @@
+"""
+Historial de predicciones por sesión, acotado en memoria.
+
+Cada sesión guarda sus últimas CAPACIDAD predicciones en un anillo de
+registros compactos de tamaño fijo (26 bytes: hora, índice de clase int16,
+confianza float32 y los 16 bytes del hash de la imagen de la caché de
+predicciones), reservado de una vez: la memoria por sesión no crece con el
+uso. Al llenarse, cada registro que se sobrescribe se anexa antes a un
+almacén SQLite local de solo anexado, compartido por todas las sesiones y
+procesos; lo que queda en el anillo se anexa cuando Streamlit descarta la
+sesión. `herramientas.exportar_historial` consulta y exporta el almacén.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+
+import numpy as np
+
+RUTA_DB = os.environ.get("PROYECTOS_HISTORIAL_DB", ".cache/historial.sqlite")
+CAPACIDAD = int(os.environ.get("PROYECTOS_HISTORIAL_CAPACIDAD", "50"))
+
+REGISTRO = np.dtype([("tiempo", "<u4"), ("clase", "<i2"), ("confianza", "<f4"), ("imagen", "S16")])
+
+
+class AlmacenHistorial:
+    def __init__(self, ruta=RUTA_DB):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self.ruta = ruta
+        self._db = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Con WAL, NORMAL no arriesga la integridad y ahorra un fsync por anexado
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS historial ("
+            "sesion TEXT NOT NULL, modelo TEXT NOT NULL, tiempo INTEGER NOT NULL, "
+            "clase INTEGER NOT NULL, confianza REAL NOT NULL, imagen BLOB NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS historial_modelo_tiempo ON historial (modelo, tiempo)")
+        self._lock = threading.Lock()
+
+    def anexar(self, sesion, modelo, registros):
+        """Anexa `registros` (array de REGISTRO) de `sesion`."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO historial (sesion, modelo, tiempo, clase, confianza, imagen) VALUES (?, ?, ?, ?, ?, ?)",
+                ((sesion, modelo, int(r["tiempo"]), int(r["clase"]), float(r["confianza"]), bytes(r["imagen"]))
+                 for r in registros),
+            )
+
+    def filas(self, modelo=None, sesion=None, desde=None):
+        """Filas (sesion, modelo, tiempo, clase, confianza, imagen) en orden de llegada, sin cargarlas todas."""
+        condiciones, parametros = [], []
+        for columna, operador, valor in (("modelo", "=", modelo), ("sesion", "=", sesion), ("tiempo", ">=", desde)):
+            if valor is not None:
+                condiciones.append(f"{columna} {operador} ?")
+                parametros.append(valor)
+        consulta = "SELECT sesion, modelo, tiempo, clase, confianza, imagen FROM historial"
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        # Conexión propia: la iteración no retiene el lock de las sesiones que anexan
+        conexion = sqlite3.connect(self.ruta)
+        try:
+            yield from conexion.execute(consulta + " ORDER BY rowid", parametros)
+        finally:
+            conexion.close()
+
+
+_almacen = None
+_lock_almacen = threading.Lock()
+
+
+def almacen():
+    """Almacén compartido de RUTA_DB; se abre (y se crea) la primera vez que hay algo que anexar."""
+    global _almacen
+    with _lock_almacen:
+        if _almacen is None:
+            _almacen = AlmacenHistorial()
+        return _almacen
+
+
+def _volcar(registros, estado, destino, sesion, modelo):
+    # Sin referencias a la sesión: se llama también cuando esta ya se ha recolectado
+    n, siguiente = estado["n"], estado["siguiente"]
+    if n:
+        orden = (siguiente - n + np.arange(n)) % len(registros)
+        (destino or almacen()).anexar(sesion, modelo, registros[orden])
+        estado["n"] = 0
+
+
+class HistorialSesion:
+    def __init__(self, modelo, capacidad=CAPACIDAD, destino=None):
+        self.modelo = modelo
+        self.sesion = uuid.uuid4().hex
+        # None: el almacén compartido, que no se abre hasta el primer anexado
+        self._destino = destino
+        self._registros = np.zeros(capacidad, dtype=REGISTRO)
+        self._estado = {"n": 0, "siguiente": 0}
+        # Lo que siga en el anillo cuando Streamlit descarte la sesión va al almacén
+        self._finalizador = weakref.finalize(
+            self, _volcar, self._registros, self._estado, self._destino, self.sesion, modelo
+        )
+
+    def agregar(self, clase, confianza, clave_imagen):
+        """
+        clase: índice de salida del modelo; confianza: en [0, 1]
+        clave_imagen: clave de utils.cache_predicciones.clave para la imagen
+        """
+        estado = self._estado
+        i = estado["siguiente"]
+        if estado["n"] == len(self._registros):
+            # Anillo lleno: el registro más antiguo se anexa al almacén antes de sobrescribirlo
+            (self._destino or almacen()).anexar(self.sesion, self.modelo, self._registros[i:i + 1])
+        self._registros[i] = (int(time.time()), clase, confianza, bytes.fromhex(clave_imagen.partition(":")[0]))
+        estado["siguiente"] = (i + 1) % len(self._registros)
+        estado["n"] = min(estado["n"] + 1, len(self._registros))
+
+    def ultimos(self, k=5):
+        """Los `k` registros más recientes, del más nuevo al más antiguo."""
+        n = min(k, self._estado["n"])
+        return self._registros[(self._estado["siguiente"] - 1 - np.arange(n)) % len(self._registros)]
+
+    def volcar(self):
+        """Anexa al almacén todo lo que hay en el anillo y lo vacía."""
+        _volcar(self._registros, self._estado, self._destino, self.sesion, self.modelo)
+
+    def bytes(self):
+        """Memoria del anillo (fija desde la creación)."""
+        return self._registros.nbytes
+
+    def __len__(self):
+        return self._estado["n"]
@@ -0,0 +1,66 @@
+"""
+Funciones de inferencia trazadas con firma fija.
+
+`Model.predict` monta un adaptador de datos y los callbacks en cada llamada,
+lo que para una sola imagen cuesta más que la propia pasada en CPU. Aquí se
+traza una `tf.function` por modelo y tamaño de entrada, con firma
+(None, alto, ancho, 3) para que sirva igual para 1 imagen que para un lote,
+y cada petición llama directamente al grafo ya trazado.
+"""
+import time
+
+import numpy as np
+
+# Tamaño de entrada fijo de cada app
+FIRMAS = {
+    "app2": ("gato_perro", (128, 128)),
+    "app3": ("flores", (224, 224)),
+    "app4": ("perros", (300, 300)),
+    "app5": ("perros", (224, 224)),
+    "app6": ("melanoma", (300, 300)),
+}
+
+
+def compilar(modelo, tamanio):
+    """Traza `modelo` una sola vez para entradas (None, alto, ancho, 3) float32."""
+    import tensorflow as tf
+
+    alto, ancho = tamanio
+
+    @tf.function(input_signature=[tf.TensorSpec([None, alto, ancho, 3], tf.float32)])
+    def _inferir(x):
+        return modelo(x, training=False)
+
+    # Forzamos el trazado aquí y no en la primera petición
+    _inferir.get_concrete_function()
+    return _inferir
+
+
+def _medir(funcion, lote, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(lote)
+        tiempos.append(time.perf_counter() - inicio)
+    return np.array(tiempos) * 1000
+
+
+def comparar_latencia(modelo, tamanio, repeticiones=50, lote=1):
+    """Latencia (ms) de `modelo.predict` frente a la función trazada con la misma entrada."""
+    alto, ancho = tamanio
+    x = np.random.default_rng(0).random((lote, alto, ancho, 3), dtype=np.float32)
+    funcion = compilar(modelo, tamanio)
+
+    # Una llamada de cada para que ninguna de las dos pague el calentamiento en la medida
+    modelo.predict(x, verbose=0)
+    funcion(x)
+
+    antes = _medir(lambda v: modelo.predict(v, verbose=0), x, repeticiones)
+    despues = _medir(funcion, x, repeticiones)
+    return {
+        "predict_p50_ms": float(np.percentile(antes, 50)),
+        "predict_p99_ms": float(np.percentile(antes, 99)),
+        "compilada_p50_ms": float(np.percentile(despues, 50)),
+        "compilada_p99_ms": float(np.percentile(despues, 99)),
+        "aceleracion_p50": float(np.percentile(antes, 50) / np.percentile(despues, 50)),
+    }
@@ -0,0 +1,147 @@
+"""
+Cola de inferencia con micro-lotes.
+
+Las sesiones de Streamlit corren en hilos distintos del mismo proceso. En vez de
+que cada una lance su propio `modelo.predict` con una sola imagen, las
+peticiones se encolan aquí: un hilo por modelo junta lo que llegue durante unos
+milisegundos (o hasta llenar el lote), hace una sola pasada y devuelve a cada
+llamador sus filas.
+
+Con el pool de procesos de modelos (PROYECTOS_SOCKET_MODELOS, ver
+utils.trabajadores) cada pasada se manda al pool en lugar de correr en este
+proceso; si el pool no responde se usa el modelo local.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils import trabajadores
+from utils.modelos import funcion_inferencia
+
+MAX_LOTE = int(os.environ.get("PROYECTOS_LOTE_MAX", "16"))
+MAX_ESPERA_MS = float(os.environ.get("PROYECTOS_LOTE_ESPERA_MS", "5"))
+
+log = logging.getLogger(__name__)
+
+
+class ServidorLotes:
+    def __init__(self, funcion, max_lote=MAX_LOTE, max_espera_ms=MAX_ESPERA_MS, nombre="lotes"):
+        """
+        funcion: recibe un lote (N, H, W, 3) y devuelve un array (N, ...)
+        """
+        self.funcion = funcion
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000.0
+        self._cola = queue.Queue()
+
+        # Métricas: latencias de las últimas peticiones y contadores acumulados
+        self._latencias = deque(maxlen=2000)
+        self._lock = threading.Lock()
+        self.imagenes = 0
+        self.pasadas = 0
+        self._inicio = time.monotonic()
+
+        self._hilo = threading.Thread(target=self._bucle, name=f"servidor-{nombre}", daemon=True)
+        self._hilo.start()
+
+    def predecir(self, lote):
+        """Encola `lote` y bloquea hasta tener sus predicciones."""
+        futuro = Future()
+        self._cola.put((np.asarray(lote, dtype=np.float32), futuro, time.monotonic()))
+        return futuro.result()
+
+    def _juntar(self):
+        pendientes = [self._cola.get()]
+        total = len(pendientes[0][0])
+        limite = time.monotonic() + self.max_espera
+        while total < self.max_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = self._cola.get(timeout=restante)
+            except queue.Empty:
+                break
+            pendientes.append(item)
+            total += len(item[0])
+        return pendientes
+
+    def _bucle(self):
+        while True:
+            pendientes = self._juntar()
+            lote = pendientes[0][0] if len(pendientes) == 1 else np.concatenate([p[0] for p in pendientes])
+
+            try:
+                salida = np.asarray(self.funcion(lote))
+            except Exception as e:
+                for _, futuro, _ in pendientes:
+                    futuro.set_exception(e)
+                continue
+
+            fin = time.monotonic()
+            inicio = 0
+            with self._lock:
+                for arr, futuro, t0 in pendientes:
+                    futuro.set_result(salida[inicio:inicio + len(arr)])
+                    inicio += len(arr)
+                    self._latencias.append(fin - t0)
+                self.imagenes += len(lote)
+                self.pasadas += 1
+
+    def metricas(self):
+        with self._lock:
+            latencias = np.array(self._latencias)
+            transcurrido = time.monotonic() - self._inicio
+            imagenes, pasadas = self.imagenes, self.pasadas
+        return {
+            "imagenes": imagenes,
+            "pasadas": pasadas,
+            "lote_medio": imagenes / pasadas if pasadas else 0.0,
+            "imagenes_por_segundo": imagenes / transcurrido if transcurrido > 0 else 0.0,
+            "latencia_p50_ms": float(np.percentile(latencias, 50) * 1000) if len(latencias) else 0.0,
+            "latencia_p99_ms": float(np.percentile(latencias, 99) * 1000) if len(latencias) else 0.0,
+        }
+
+
+# Un servidor por (modelo, tamaño de entrada): lotes de tamaños distintos no se pueden concatenar
+_servidores = {}
+_lock_servidores = threading.Lock()
+
+
+def _forward(nombre, tamanio):
+    def _funcion(lote):
+        if trabajadores.SOCKET:
+            try:
+                return trabajadores.predecir(nombre, lote)
+            except OSError as e:
+                log.warning("Pool de modelos no disponible (%s); %s se infiere en este proceso", e, nombre)
+        # Se pide la función en cada pasada para respetar la expulsión LRU del registro
+        return np.asarray(funcion_inferencia(nombre, tamanio)(lote))
+    return _funcion
+
+
+def servidor(nombre, forma):
+    clave = (nombre, tuple(forma))
+    with _lock_servidores:
+        if clave not in _servidores:
+            _servidores[clave] = ServidorLotes(_forward(nombre, tuple(forma[:2])),
+                                               nombre=f"{nombre}-{forma[0]}x{forma[1]}")
+        return _servidores[clave]
+
+
+def predecir(nombre, lote):
+    """Equivalente a `obtener_modelo(nombre).predict(lote)` pasando por la cola compartida."""
+    lote = np.asarray(lote, dtype=np.float32)
+    return servidor(nombre, lote.shape[1:]).predecir(lote)
+
+
+def metricas():
+    with _lock_servidores:
+        servidores = dict(_servidores)
+    return {f"{n}@{f[0]}x{f[1]}": s.metricas() for (n, f), s in servidores.items()}
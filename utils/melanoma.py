@@ -0,0 +1,66 @@
+"""
+Pipeline de detección de melanoma con Grad-CAM.
+
+Antes app6 cargaba el modelo, hacía una pasada en vacío y reconstruía el
+modelo de Grad-CAM en cada ejecución del script, y por cada imagen hacía dos
+pasadas: `predict` para la puntuación y otra dentro de Grad-CAM. Aquí el
+modelo combinado [activaciones de top_conv, salida] se construye una vez por
+proceso y la puntuación sale de la misma pasada hacia delante/atrás que el
+heatmap.
+"""
+import time
+
+import numpy as np
+
+from utils.modelos import registro
+from utils.preprocessing import PERFILES, preparar_lote
+
+PERFIL = "melanoma"
+UMBRAL = 0.5
+
+
+class PipelineMelanoma:
+    def __init__(self, modelo):
+        # Grad-CAM (y con él TensorFlow) se importa al construir el pipeline, no al importar el módulo
+        from utils.gradcam import motor_registrado
+
+        inicio = time.perf_counter()
+        self.motor = motor_registrado(PERFIL)
+        # Traza la función de Grad-CAM aquí y no en la primera imagen
+        alto, ancho = PERFILES[PERFIL].tamanio
+        self.motor(np.zeros((1, alto, ancho, 3), dtype=np.float32))
+        self.construccion_s = time.perf_counter() - inicio
+        self.ultima_peticion_ms = None
+
+    def analizar(self, imagenes):
+        """
+        imagenes: lista de imágenes PIL o archivos subidos
+        Devuelve (probabilidades de melanoma (N,), heatmaps (N, h, w) en [0, 1]).
+        """
+        return self.analizar_lote(preparar_lote(imagenes, PERFIL))
+
+    def analizar_lote(self, lote):
+        """Igual que `analizar` con el lote ya preprocesado (N, alto, ancho, 3)."""
+        inicio = time.perf_counter()
+        heatmaps, preds = self.motor(lote)
+        self.ultima_peticion_ms = (time.perf_counter() - inicio) * 1000
+        return preds[:, 0], heatmaps
+
+    def arranque(self):
+        """Segundos de arranque en frío: carga del modelo (registro) + construcción del pipeline."""
+        return {
+            "carga_modelo_s": registro.tiempos_carga.get(PERFIL),
+            "construccion_pipeline_s": self.construccion_s,
+        }
+
+
+def pipeline():
+    """Pipeline único por modelo cargado; se reconstruye solo si el registro expulsó el modelo."""
+    return registro.recurso(PERFIL, "pipeline", PipelineMelanoma)
+
+
+def etiqueta(probabilidad):
+    """(etiqueta, confianza) para la probabilidad de melanoma."""
+    if probabilidad >= UMBRAL:
+        return "Melanoma", probabilidad
+    return "No Melanoma", 1 - probabilidad
@@ -0,0 +1,281 @@
+"""
+Métricas de las peticiones en producción: tiempo de cada etapa y tasas de acierto.
+
+Las apps envuelven cada etapa de una petición en `etapa(app, nombre)`, que la
+cronometra con el reloj monotónico (perf_counter_ns) y la suma a un
+histograma de cubetas fijas. Cada observación es una búsqueda binaria en
+LIMITES_S y unas sumas bajo un lock (del orden de 1 µs), así que se puede
+dejar activo con carga. La subida del archivo no se puede cronometrar desde
+el script: Streamlit la termina antes de ejecutarlo.
+
+Cada histograma guarda además las últimas VENTANA observaciones, de las que
+salen los percentiles de la página de administración; Prometheus calcula los
+suyos sobre las cubetas acumuladas (histogram_quantile sobre rate()).
+
+Los aciertos de la caché de predicciones y del almacén de Wikipedia, la
+memoria del registro de modelos y los contadores de la cola de lotes se leen
+de sus propios módulos al exportar, y solo si el proceso ya los importó.
+
+Exposición:
+- `texto_prometheus()`: formato de texto de Prometheus
+- `servir()`: /metrics en un hilo HTTP del proceso, si PROYECTOS_METRICAS_PUERTO está definida
+- `mostrar_admin(app)`: página oculta en la propia app con ?admin=<PROYECTOS_ADMIN_TOKEN>
+"""
+import bisect
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites superiores de las cubetas (s); la última cubeta es +Inf
+LIMITES_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+VENTANA = int(os.environ.get("PROYECTOS_METRICAS_VENTANA", "1000"))
+# "puerto" o "host:puerto"; sin definir no se abre ningún puerto
+PUERTO = os.environ.get("PROYECTOS_METRICAS_PUERTO", "")
+TOKEN_ADMIN = os.environ.get("PROYECTOS_ADMIN_TOKEN", "")
+
+# Texto de ayuda de los contadores de `contar` en el formato de Prometheus
+AYUDAS = {"errores": "Etapas terminadas con una excepción"}
+
+log = logging.getLogger(__name__)
+
+
+class Histograma:
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_S) + 1)
+        self.suma = 0.0
+        self.n = 0
+        self.recientes = deque(maxlen=VENTANA)
+
+    def observar(self, segundos):
+        self.cubetas[bisect.bisect_left(LIMITES_S, segundos)] += 1
+        self.suma += segundos
+        self.n += 1
+        self.recientes.append(segundos)
+
+
+def _percentil(ordenados, q):
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+class Metricas:
+    def __init__(self):
+        self._histogramas = {}   # (app, etapa) -> Histograma
+        self._contadores = {}    # (nombre, ((etiqueta, valor), ...)) -> n
+        self._lock = threading.Lock()
+
+    def observar(self, app, nombre, segundos):
+        with self._lock:
+            histograma = self._histogramas.get((app, nombre))
+            if histograma is None:
+                histograma = self._histogramas[(app, nombre)] = Histograma()
+            histograma.observar(segundos)
+
+    def contar(self, nombre, n=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + n
+
+    @contextmanager
+    def etapa(self, app, nombre):
+        """Cronometra el bloque como la etapa `nombre` de `app`; las excepciones se cuentan aparte."""
+        inicio = time.perf_counter_ns()
+        try:
+            yield
+        except Exception:
+            # Solo errores: st.stop() y st.rerun() son BaseException de control de flujo
+            self.contar("errores", app=app, etapa=nombre)
+            raise
+        finally:
+            self.observar(app, nombre, (time.perf_counter_ns() - inicio) / 1e9)
+
+    def resumen(self):
+        """Una fila por (app, etapa) con los percentiles de las últimas VENTANA observaciones."""
+        with self._lock:
+            copias = [(app, nombre, h.n, h.suma, sorted(h.recientes))
+                      for (app, nombre), h in sorted(self._histogramas.items())]
+        return [
+            {
+                "app": app,
+                "etapa": nombre,
+                "peticiones": n,
+                "media_ms": suma / n * 1000,
+                "p50_ms": _percentil(recientes, 0.50) * 1000,
+                "p95_ms": _percentil(recientes, 0.95) * 1000,
+                "p99_ms": _percentil(recientes, 0.99) * 1000,
+            }
+            for app, nombre, n, suma, recientes in copias
+        ]
+
+    def tasas_acierto(self):
+        """Tasa de aciertos de cada caché ya importada en el proceso."""
+        tasas = {}
+        cache = sys.modules.get("utils.cache_predicciones")
+        if cache is not None:
+            tasas["cache_predicciones"] = cache.cache.metricas()["tasa_aciertos"]
+        wiki = sys.modules.get("utils.wiki")
+        if wiki is not None:
+            tasas["wikipedia_local"] = wiki.almacen.metricas()["tasa_aciertos"]
+        return tasas
+
+    def texto_prometheus(self):
+        familias = {}   # nombre -> (tipo, ayuda, [(etiquetas, valor)])
+
+        def muestra(nombre, tipo, ayuda, valor, **etiquetas):
+            familias.setdefault(nombre, (tipo, ayuda, []))[2].append((etiquetas, valor))
+
+        with self._lock:
+            histogramas = [(app, nombre, list(h.cubetas), h.suma, h.n)
+                           for (app, nombre), h in sorted(self._histogramas.items())]
+            contadores = sorted(self._contadores.items())
+
+        ayuda = "Duración de cada etapa de una petición"
+        for app, nombre, cubetas, suma, n in histogramas:
+            acumulado = 0
+            for limite, cuenta in zip(LIMITES_S + ("+Inf",), cubetas):
+                acumulado += cuenta
+                muestra("proyectos_etapa_segundos_bucket", "histogram", ayuda, acumulado,
+                        app=app, etapa=nombre, le=limite)
+            muestra("proyectos_etapa_segundos_sum", "histogram", ayuda, suma, app=app, etapa=nombre)
+            muestra("proyectos_etapa_segundos_count", "histogram", ayuda, n, app=app, etapa=nombre)
+        for (nombre, etiquetas), n in contadores:
+            muestra(f"proyectos_{nombre}_total", "counter", AYUDAS.get(nombre, nombre), n, **dict(etiquetas))
+
+        cache = sys.modules.get("utils.cache_predicciones")
+        if cache is not None:
+            m = cache.cache.metricas()
+            for resultado in ("aciertos_memoria", "aciertos_disco", "fallos"):
+                muestra("proyectos_cache_predicciones_consultas_total", "counter",
+                        "Consultas a la caché de predicciones", m[resultado], resultado=resultado)
+            muestra("proyectos_cache_predicciones_memoria_bytes", "gauge",
+                    "Bytes en el nivel de memoria de la caché de predicciones", m["bytes_memoria"])
+        wiki = sys.modules.get("utils.wiki")
+        if wiki is not None:
+            m = wiki.almacen.metricas()
+            for resultado in ("aciertos", "fallos"):
+                muestra("proyectos_wikipedia_local_consultas_total", "counter",
+                        "Consultas al almacén local de Wikipedia", m[resultado], resultado=resultado)
+        modelos = sys.modules.get("utils.modelos")
+        if modelos is not None:
+            estado = modelos.registro.estado()
+            muestra("proyectos_modelos_memoria_bytes", "gauge", "Memoria de los modelos cargados",
+                    estado["memoria_usada"])
+            muestra("proyectos_modelos_expulsiones_total", "counter", "Modelos expulsados por presupuesto",
+                    estado["expulsiones"])
+            for modelo, segundos in estado["tiempos_carga"].items():
+                muestra("proyectos_modelos_carga_segundos", "gauge", "Carga y calentamiento de cada modelo",
+                        segundos, modelo=modelo)
+        lotes = sys.modules.get("utils.lotes")
+        if lotes is not None:
+            for servidor, m in lotes.metricas().items():
+                muestra("proyectos_lotes_imagenes_total", "counter", "Imágenes inferidas por la cola de lotes",
+                        m["imagenes"], servidor=servidor)
+                muestra("proyectos_lotes_pasadas_total", "counter", "Pasadas del modelo de la cola de lotes",
+                        m["pasadas"], servidor=servidor)
+
+        lineas = []
+        emitidas = set()
+        for nombre, (tipo, ayuda, muestras) in familias.items():
+            # Las series _bucket/_sum/_count de un histograma comparten cabecera
+            base = nombre.rsplit("_", 1)[0] if tipo == "histogram" else nombre
+            if base not in emitidas:
+                emitidas.add(base)
+                lineas.append(f"# HELP {base} {ayuda}")
+                lineas.append(f"# TYPE {base} {tipo}")
+            for etiquetas, valor in muestras:
+                lineas.append(f"{nombre}{_etiquetas(etiquetas)} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in etiquetas.items()) + "}"
+
+
+# Instancia compartida por todas las sesiones del proceso
+metricas = Metricas()
+
+
+def etapa(app, nombre):
+    return metricas.etapa(app, nombre)
+
+
+def observar(app, nombre, segundos):
+    metricas.observar(app, nombre, segundos)
+
+
+def contar(nombre, n=1, **etiquetas):
+    metricas.contar(nombre, n, **etiquetas)
+
+
+def texto_prometheus():
+    return metricas.texto_prometheus()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        # Cada raspado de Prometheus no debe llenar el log de Streamlit
+        pass
+
+
+_servidor = None
+_lock_servidor = threading.Lock()
+
+
+def servir(direccion=PUERTO):
+    """Sirve /metrics en `direccion` ("puerto" o "host:puerto") desde un hilo, una sola vez por proceso."""
+    global _servidor
+    if not direccion:
+        return None
+    with _lock_servidor:
+        if _servidor is None:
+            host, _, puerto = direccion.rpartition(":")
+            try:
+                _servidor = ThreadingHTTPServer((host or "127.0.0.1", int(puerto)), _Manejador)
+            except OSError:
+                # Otra app del mismo host ya tiene el puerto: este proceso se queda sin endpoint
+                log.warning("No se pudo abrir el endpoint de métricas en %s", direccion)
+                _servidor = False
+                return None
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, name="metricas-http", daemon=True).start()
+    return _servidor or None
+
+
+def mostrar_admin(app):
+    """Con ?admin=<PROYECTOS_ADMIN_TOKEN> muestra las métricas del proceso en lugar de `app` y detiene el script."""
+    import streamlit as st
+
+    token = st.query_params.get("admin")
+    if not TOKEN_ADMIN or not token or not hmac.compare_digest(token, TOKEN_ADMIN):
+        return
+
+    st.title(f"📈 Métricas del proceso ({app})")
+    st.caption(f"Percentiles de las últimas {VENTANA} peticiones de cada etapa; todas las apps del proceso.")
+    st.dataframe(metricas.resumen(), hide_index=True, use_container_width=True)
+    tasas = metricas.tasas_acierto()
+    if tasas:
+        columnas = st.columns(len(tasas))
+        for columna, (cache, tasa) in zip(columnas, tasas.items()):
+            columna.metric(f"Aciertos {cache}", f"{tasa * 100:.1f}%")
+    with st.expander("Formato Prometheus"):
+        st.code(texto_prometheus(), language="text")
+    st.stop()
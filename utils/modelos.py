@@ -0,0 +1,319 @@
+"""
+Registro compartido de modelos.
+
+Todas las apps piden sus modelos aquí en lugar de cargarlos por su cuenta.
+El registro carga cada modelo la primera vez que se pide (o en segundo plano
+con `precargar`), lo calienta con una pasada en vacío y mantiene un
+presupuesto de memoria: si al cargar uno nuevo se supera, se expulsa el
+modelo usado hace más tiempo (LRU).
+
+Las variantes cuantizadas se piden como `nombre@variante` (p. ej.
+`perros@int8`); `funcion_inferencia` elige entre Keras y TFLite según el
+backend de cada app (ver utils.backends y utils.cuantizacion).
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from utils import hilos
+from utils.backends import backend
+from utils.cuantizacion import VARIANTES_ACTIVAS, ModeloCuantizado, ruta_variante
+from utils.etiquetas import ETIQUETADOS, validar
+from utils.inferencia import compilar
+from utils.preprocessing import PERFILES
+from utils.trabajadores import SOCKET as SOCKET_MODELOS
+
+# Presupuesto por defecto para los pesos de todos los modelos cargados (MB)
+PRESUPUESTO_MB = float(os.environ.get("PROYECTOS_MEMORIA_MODELOS_MB", "1500"))
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EspecModelo:
+    nombre: str
+    ruta: str = None            # archivo .keras; None si se construye con keras.applications
+    constructor: str = None     # "mobilenet_v2" | "efficientnet_b0"
+    entradas: tuple = ((224, 224),)  # tamaños de entrada usados por las apps (para calentar)
+    variante: str = None        # variante TFLite (utils.cuantizacion.VARIANTES); None = Keras
+
+
+MODELOS = {
+    "imagenet":     EspecModelo("imagenet", constructor="mobilenet_v2"),
+    "efficientnet": EspecModelo("efficientnet", constructor="efficientnet_b0"),
+    "gato_perro":   EspecModelo("gato_perro", ruta="mobile_fine_tuning.keras", entradas=((128, 128),)),
+    "flores":       EspecModelo("flores", ruta="Modelos/Clasificacion_flores.keras"),
+    # app4 usa 300x300 y app5 224x224 sobre el mismo modelo
+    "perros":       EspecModelo("perros", ruta="Modelos/Clasificacion_perros.keras",
+                                entradas=((300, 300), (224, 224))),
+    "melanoma":     EspecModelo("melanoma", ruta="Modelos/Clasificacion_melanoma_V1_P2.keras",
+                                entradas=((300, 300),)),
+}
+
+
+def _construir(espec):
+    if espec.variante is not None:
+        return ModeloCuantizado(espec.nombre.partition("@")[0], espec.variante)
+
+    # Hilos intra/inter-op del host (utils.hilos): tienen que fijarse antes de que TensorFlow se inicialice
+    hilos.aplicar(espec.nombre)
+    # TensorFlow se importa aquí para no pagar su importación al importar el registro
+    # (ni nunca, si todas las apps del proceso usan el backend TFLite)
+    import tensorflow as tf
+
+    if espec.ruta is not None:
+        return tf.keras.models.load_model(espec.ruta)
+    if espec.constructor == "mobilenet_v2":
+        return tf.keras.applications.MobileNetV2(weights="imagenet")
+    if espec.constructor == "efficientnet_b0":
+        return tf.keras.applications.EfficientNetB0(weights="imagenet")
+    raise ValueError(f"Modelo sin ruta ni constructor conocido: {espec.nombre}")
+
+
+def _funcion(modelo, tamanio):
+    # Los modelos cuantizados traen un intérprete por tamaño; los de Keras se trazan
+    if isinstance(modelo, ModeloCuantizado):
+        return modelo.funcion(tamanio)
+    return compilar(modelo, tamanio)
+
+
+def _calentar(modelo, espec):
+    # Traza una función por tamaño de entrada y hace una pasada en vacío,
+    # así el primer clic no paga ni la carga ni el trazado
+    funciones = {}
+    for alto, ancho in espec.entradas:
+        funciones[(alto, ancho)] = _funcion(modelo, (alto, ancho))
+        salida = funciones[(alto, ancho)](np.zeros((1, alto, ancho, 3), dtype=np.float32))
+
+    # Las etiquetas tienen que cubrir la salida: un CSV desfasado daría nombres equivocados sin error
+    base = espec.nombre.partition("@")[0]
+    if base in ETIQUETADOS:
+        validar(base, np.asarray(salida).shape[-1])
+    return funciones
+
+
+def _bytes_modelo(modelo, espec):
+    if isinstance(modelo, ModeloCuantizado):
+        return modelo.bytes(espec.entradas)
+    # Con Keras 3 `w.dtype` es una cadena ("float32"), no un dtype
+    return int(sum(np.prod(w.shape) * np.dtype(w.dtype).itemsize for w in modelo.weights))
+
+
+class _Entrada:
+    def __init__(self, modelo, tamanio, funciones):
+        self.modelo = modelo
+        self.tamanio = tamanio
+        # Recursos derivados del modelo (funciones compiladas, etc.): se liberan con él
+        self.extras = {"funciones": funciones}
+        # Crear un recurso (trazar, construir el modelo de Grad-CAM) se hace una sola vez aunque
+        # lo pidan varias sesiones a la vez. Reentrante: un recurso puede pedir otro del mismo modelo
+        self.lock = threading.RLock()
+
+
+class RegistroModelos:
+    def __init__(self, especs=MODELOS, presupuesto_mb=PRESUPUESTO_MB):
+        self.especs = dict(especs)
+        self.presupuesto = int(presupuesto_mb * 1024 * 1024)
+        self._cargados = OrderedDict()   # nombre -> _Entrada, en orden de uso
+        self._cargando = {}              # nombre -> threading.Event
+        self._lock = threading.Lock()
+        self.tiempos_carga = {}          # nombre -> segundos (carga + calentamiento)
+        self.expulsiones = 0
+
+    def obtener(self, nombre):
+        """Devuelve el modelo `nombre`, cargándolo si hace falta."""
+        return self._entrada(nombre).modelo
+
+    def funcion(self, nombre, tamanio):
+        """Función de inferencia trazada para `nombre` con entrada fija `tamanio` (alto, ancho)."""
+        entrada = self._entrada(nombre)
+        funciones = entrada.extras["funciones"]
+        tamanio = tuple(tamanio)
+        funcion = funciones.get(tamanio)
+        if funcion is None:
+            with entrada.lock:
+                if tamanio not in funciones:
+                    funciones[tamanio] = _funcion(entrada.modelo, tamanio)
+                funcion = funciones[tamanio]
+        return funcion
+
+    def recurso(self, nombre, clave, crear):
+        """Recurso derivado del modelo (p. ej. el de Grad-CAM): se crea una vez con `crear(modelo)` y se libera con él."""
+        entrada = self._entrada(nombre)
+        recurso = entrada.extras.get(clave)
+        if recurso is None:
+            with entrada.lock:
+                if clave not in entrada.extras:
+                    entrada.extras[clave] = crear(entrada.modelo)
+                recurso = entrada.extras[clave]
+        return recurso
+
+    def espec(self, nombre):
+        """Especificación de `nombre` o de su variante cuantizada `nombre@variante`."""
+        base, _, variante = nombre.partition("@")
+        if base not in self.especs:
+            raise KeyError(f"Modelo no registrado: {nombre}")
+        if not variante:
+            return self.especs[base]
+        return replace(self.especs[base], nombre=nombre, variante=variante)
+
+    def _entrada(self, nombre):
+        self.espec(nombre)  # KeyError si no está registrado
+
+        while True:
+            with self._lock:
+                if nombre in self._cargados:
+                    self._cargados.move_to_end(nombre)
+                    return self._cargados[nombre]
+                evento = self._cargando.get(nombre)
+                if evento is None:
+                    evento = self._cargando[nombre] = threading.Event()
+                    break
+            # Otro hilo ya lo está cargando: esperamos y volvemos a mirar
+            evento.wait()
+
+        try:
+            return self._cargar(nombre)
+        finally:
+            with self._lock:
+                del self._cargando[nombre]
+            evento.set()
+
+    def _cargar(self, nombre):
+        espec = self.espec(nombre)
+        inicio = time.perf_counter()
+        modelo = _construir(espec)
+        entrada = _Entrada(modelo, _bytes_modelo(modelo, espec), _calentar(modelo, espec))
+
+        with self._lock:
+            self.tiempos_carga[nombre] = time.perf_counter() - inicio
+            self._cargados[nombre] = entrada
+            self._expulsar_sobrantes(conservar=nombre)
+        return entrada
+
+    def _expulsar_sobrantes(self, conservar):
+        # Se llama con el lock tomado; nunca se expulsa el modelo recién pedido
+        while self.memoria_usada() > self.presupuesto and len(self._cargados) > 1:
+            victima = next(iter(self._cargados))
+            if victima == conservar:
+                self._cargados.move_to_end(victima)
+                continue
+            del self._cargados[victima]
+            self.expulsiones += 1
+
+    def memoria_usada(self):
+        return sum(e.tamanio for e in self._cargados.values())
+
+    def precargar(self, *nombres):
+        """Carga los modelos en un hilo de fondo sin bloquear al llamador."""
+        def _tarea():
+            for nombre in nombres:
+                self.obtener(nombre)
+
+        hilo = threading.Thread(target=_tarea, name="precarga-modelos", daemon=True)
+        hilo.start()
+        return hilo
+
+    def liberar(self, nombre):
+        with self._lock:
+            self._cargados.pop(nombre, None)
+
+    def estado(self):
+        with self._lock:
+            return {
+                "cargados": {n: e.tamanio for n, e in self._cargados.items()},
+                "memoria_usada": self.memoria_usada(),
+                "presupuesto": self.presupuesto,
+                "expulsiones": self.expulsiones,
+                "tiempos_carga": dict(self.tiempos_carga),
+            }
+
+
+# Instancia única por proceso: Streamlit reutiliza los módulos importados entre
+# reejecuciones y sesiones, así que todas las apps del proceso la comparten.
+registro = RegistroModelos()
+
+
+def obtener_modelo(nombre):
+    return registro.obtener(nombre)
+
+
+# Variantes TFLite que no se pudieron cargar: se sirven con Keras sin volver a intentarlo
+_sin_tflite = set()
+
+
+def _servido(nombre, tamanio):
+    """Nombre en el registro con el que se sirve la clasificación de `nombre` con `tamanio`."""
+    if "@" in nombre:
+        return nombre
+    variante = VARIANTES_ACTIVAS.get(nombre)
+    if variante is None and backend(nombre, tamanio) == "tflite":
+        variante = "float32"
+    if variante is None or f"{nombre}@{variante}" in _sin_tflite:
+        return nombre
+    return f"{nombre}@{variante}"
+
+
+def funcion_inferencia(nombre, tamanio):
+    """
+    Función de clasificación de `nombre` con entrada `tamanio`.
+
+    Con el backend `tflite` (o una variante en PROYECTOS_VARIANTES) se sirve la
+    variante TFLite; si no existe, se vuelve a Keras.
+    """
+    servido = _servido(nombre, tamanio)
+    if servido != nombre:
+        try:
+            return registro.funcion(servido, tamanio)
+        except FileNotFoundError as e:
+            log.warning("%s; se usa el modelo Keras", e)
+            _sin_tflite.add(servido)
+    return registro.funcion(nombre, tamanio)
+
+
+def version(nombre, tamanio=None):
+    """
+    Identificador de los pesos que calculan un resultado de `nombre`, para la
+    caché de predicciones: modelo o variante y tamaño y fecha de su archivo.
+    Con `tamanio`, el que sirve `funcion_inferencia`; sin él, el modelo Keras
+    (Grad-CAM). Cambia al reentrenar, al cambiar de variante o de backend.
+    """
+    base = nombre.partition("@")[0]
+    servido = _servido(nombre, tamanio) if tamanio is not None else base
+    espec = registro.espec(servido)
+    ruta = espec.ruta
+    if espec.variante is not None:
+        ruta = ruta_variante(base, espec.variante, tamanio)
+        if not os.path.exists(ruta):
+            # funcion_inferencia volverá a Keras
+            servido, ruta = base, registro.espec(base).ruta
+    if ruta is None:
+        # keras.applications: los pesos los fija el constructor
+        return servido
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return servido
+    return f"{servido}:{info.st_size:x}.{info.st_mtime_ns:x}"
+
+
+def version_perfil(perfil):
+    """`version` del modelo y tamaño del perfil de preprocesamiento `perfil`."""
+    perfil = PERFILES[perfil]
+    return version(perfil.modelo, perfil.tamanio)
+
+
+def precargar(*nombres, local=False):
+    """
+    Precarga `nombres` en segundo plano. Con el pool de procesos de modelos
+    (PROYECTOS_SOCKET_MODELOS) la clasificación no usa el modelo de este
+    proceso y solo se precarga con `local=True` (Grad-CAM, `obtener_modelo`).
+    """
+    if SOCKET_MODELOS and not local:
+        return None
+    return registro.precargar(*nombres)
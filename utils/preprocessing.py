@@ -1,17 +1,156 @@
+"""
+Preprocesamiento compartido por todas las apps.
+
+Cada perfil declara el modelo, el tamaño de entrada y la normalización que
+espera; `preparar_lote` decodifica y redimensiona las imágenes directamente
+sobre un lote float32 reservado de antemano y normaliza en sitio, sin copias
+intermedias por imagen.
+
+Las fotos de móvil (12-48 MP) se decodifican a escala reducida: el decodificador
+JPEG de Pillow puede entregar la imagen a 1/2, 1/4 o 1/8 de su tamaño (modo
+draft), así que nunca se llega a tener en memoria la imagen completa.
+"""
+import resource
+import time
+from dataclasses import dataclass
+
 import numpy as np
 from PIL import Image
-from tensorflow.keras.applications.efficientnet import preprocess_input
 
-def preprocess_image(image, target_size=(300, 300)):
-    # Redimensionar y convertir a array
-    image = image.resize(target_size)
-    img_array = np.array(image)
 
-    # Asegurar que tiene 3 canales
-    if img_array.shape[-1] == 4:
-        img_array = img_array[..., :3]  # eliminar canal alpha si existe
+# Normalizaciones en sitio sobre un lote float32 con valores 0..255
+def _escala_01(lote):
+    lote *= 1.0 / 255.0
+
+
+def _mobilenet_v2(lote):
+    # Igual que tf.keras.applications.mobilenet_v2.preprocess_input: [-1, 1]
+    lote /= 127.5
+    lote -= 1.0
+
+
+def _efficientnet(lote):
+    # El preprocess_input de EfficientNet en Keras no hace nada: el reescalado va dentro del modelo
+    pass
+
+
+NORMALIZACIONES = {
+    "escala_01": _escala_01,
+    "mobilenet_v2": _mobilenet_v2,
+    "efficientnet": _efficientnet,
+}
+
+
+@dataclass(frozen=True)
+class Perfil:
+    modelo: str           # nombre en utils.modelos.MODELOS
+    tamanio: tuple        # (alto, ancho)
+    normalizacion: str    # clave de NORMALIZACIONES
+
+
+PERFILES = {
+    "imagenet":     Perfil("imagenet", (224, 224), "mobilenet_v2"),      # app.py
+    "efficientnet": Perfil("efficientnet", (224, 224), "efficientnet"),  # app-1.py
+    "gato_perro":   Perfil("gato_perro", (128, 128), "escala_01"),       # app2.py
+    "flores":       Perfil("flores", (224, 224), "escala_01"),           # app3.py
+    "perros":       Perfil("perros", (300, 300), "efficientnet"),        # app4.py
+    "perros_224":   Perfil("perros", (224, 224), "escala_01"),           # app5.py
+    "melanoma":     Perfil("melanoma", (300, 300), "efficientnet"),      # app6.py
+}
+
+
+def _perfil(perfil):
+    return PERFILES[perfil] if isinstance(perfil, str) else perfil
+
 
-    # Preprocesamiento específico para EfficientNetB3
-    img_array = preprocess_input(img_array)
+def perfil_para(modelo, tamanio):
+    """Nombre del perfil de `modelo` con entrada `tamanio` (alto, ancho)."""
+    for nombre, perfil in PERFILES.items():
+        if perfil.modelo == modelo and perfil.tamanio == tuple(tamanio):
+            return nombre
+    raise KeyError(f"Ningún perfil de preprocesamiento para {modelo} a {tamanio}")
 
-    return img_array
+
+def _rss_pico_mb():
+    # ru_maxrss viene en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def abrir_imagen(archivo, tamanio, reducido=True, estadisticas=None):
+    """
+    Abre `archivo` (ruta, archivo subido o imagen PIL) en RGB redimensionado a `tamanio` (alto, ancho).
+
+    reducido: decodifica los JPEG a la menor escala que siga siendo al menos el
+        doble de `tamanio` y reduce en dos etapas (reduce entero + remuestreo)
+    estadisticas: lista opcional donde se añade un dict con los tiempos y la memoria de la imagen
+    """
+    alto, ancho = tamanio
+    inicio = time.perf_counter()
+
+    if isinstance(archivo, Image.Image):
+        img = archivo
+        original = img.size
+    else:
+        img = Image.open(archivo)
+        original = img.size
+        if reducido:
+            # Sin efecto para formatos que no sean JPEG
+            img.draft("RGB", (ancho * 2, alto * 2))
+
+    img = img.convert("RGB")
+    decodificada = img.size
+    fin_decodificacion = time.perf_counter()
+
+    if reducido:
+        img = img.resize((ancho, alto), reducing_gap=2.0)
+    else:
+        img = img.resize((ancho, alto))
+
+    if estadisticas is not None:
+        estadisticas.append({
+            "original": original,
+            "decodificada": decodificada,
+            "decodificacion_ms": (fin_decodificacion - inicio) * 1000,
+            "redimension_ms": (time.perf_counter() - fin_decodificacion) * 1000,
+            # El búfer RGB decodificado es la mayor reserva por imagen
+            "memoria_decodificada_mb": decodificada[0] * decodificada[1] * 3 / 2**20,
+            "rss_pico_proceso_mb": _rss_pico_mb(),
+        })
+    return img
+
+
+def decodificar(archivo, tamanio):
+    """
+    Abre `archivo` en RGB a la menor escala JPEG que siga siendo al menos el doble de `tamanio`
+    (alto, ancho), sin redimensionar: la imagen se puede pasar a `preparar_lote` con varios
+    perfiles sin volver a decodificarla.
+    """
+    alto, ancho = tamanio
+    img = Image.open(archivo)
+    img.draft("RGB", (ancho * 2, alto * 2))
+    return img.convert("RGB")
+
+
+def preparar_lote(archivos, perfil, salida=None, reducido=True, estadisticas=None):
+    """
+    archivos: lista de rutas, archivos subidos o imágenes PIL
+    perfil: nombre en PERFILES o un Perfil
+    salida: lote (N, alto, ancho, 3) float32 a reutilizar; si es None se reserva uno
+    reducido, estadisticas: ver `abrir_imagen`
+    """
+    perfil = _perfil(perfil)
+    alto, ancho = perfil.tamanio
+    if salida is None:
+        salida = np.empty((len(archivos), alto, ancho, 3), dtype=np.float32)
+
+    for i, archivo in enumerate(archivos):
+        # La conversión uint8 -> float32 se hace al escribir en el lote, sin array intermedio
+        salida[i] = abrir_imagen(archivo, perfil.tamanio, reducido, estadisticas)
+
+    NORMALIZACIONES[perfil.normalizacion](salida)
+    return salida
+
+
+def preprocess_image(image, target_size=(300, 300)):
+    # Compatibilidad con app6: una imagen con el preprocesamiento de EfficientNet, sin dimensión de lote
+    return preparar_lote([image], Perfil("melanoma", target_size, "efficientnet"))[0]
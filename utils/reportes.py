@@ -0,0 +1,147 @@
+"""
+Informes PDF de clasificación.
+
+Cada entrada es una página con la miniatura de la imagen, el Grad-CAM
+superpuesto (si lo hay), la clase, la tabla top-k y el enlace de Wikipedia.
+`escribir_informe` recorre las entradas de una en una: cada imagen se
+decodifica a escala reducida, se guarda como miniatura JPEG, se incrusta y se
+libera antes de pasar a la siguiente. FPDF no escribe nada hasta `output`:
+guarda en memoria los JPEG incrustados y el documento entero, así que la
+memoria de un PDF crece con sus páginas (unos 0,2 MB por página). Para lotes
+grandes `escribir_informes` reparte las entradas en varios PDF de como mucho
+PAGINAS_MAX páginas, y la memoria queda acotada por la de uno de ellos.
+
+En las apps, `generar_async` hace el trabajo en un hilo aparte y solo cuando
+se pide el informe.
+"""
+import io
+import itertools
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image
+
+# Lado mayor de las miniaturas incrustadas (px)
+MINIATURA = 480
+# Páginas por archivo en los informes de lotes (escribir_informes)
+PAGINAS_MAX = int(os.environ.get("PROYECTOS_INFORME_PAGINAS", "100"))
+# Informes temporales generados por las apps que se conservan en disco
+MAX_GENERADOS = 32
+
+
+@dataclass
+class EntradaInforme:
+    imagen: object              # ruta, bytes, archivo o imagen PIL
+    titulo: str
+    clase: str
+    confianza: float            # en [0, 1]
+    top: tuple = ()             # ((nombre, probabilidad), ...)
+    heatmap: object = None      # heatmap de Grad-CAM (h, w) en [0, 1], o None
+    url: str = None
+
+
+def _texto(texto):
+    # Las fuentes base de FPDF solo cubren latin-1
+    return str(texto).encode("latin-1", "replace").decode("latin-1")
+
+
+def _abrir(imagen):
+    if isinstance(imagen, Image.Image):
+        return imagen
+    img = Image.open(io.BytesIO(imagen) if isinstance(imagen, bytes) else imagen)
+    # Los JPEG grandes se decodifican directamente a escala reducida
+    img.draft("RGB", (MINIATURA, MINIATURA))
+    return img
+
+
+def _incrustar(pdf, img, directorio, x, y, ancho):
+    # FPDF incrusta JPEG desde archivo; se borra en cuanto está dentro del PDF
+    fd, ruta = tempfile.mkstemp(suffix=".jpg", dir=directorio)
+    os.close(fd)
+    img.save(ruta, quality=85)
+    pdf.image(ruta, x=x, y=y, w=ancho)
+    os.remove(ruta)
+    return ancho * img.height / img.width
+
+
+def _pagina(pdf, entrada, directorio):
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, _texto(entrada.titulo), ln=True)
+    pdf.set_font("Arial", size=11)
+    pdf.cell(0, 8, _texto(f"Clase: {entrada.clase}    Confianza: {entrada.confianza * 100:.2f}%"), ln=True)
+
+    img = _abrir(entrada.imagen).convert("RGB")
+    img.thumbnail((MINIATURA, MINIATURA))
+    y = pdf.get_y() + 2
+    alto = _incrustar(pdf, img, directorio, 10, y, 90)
+    if entrada.heatmap is not None:
+        from utils.gradcam import superponer_heatmap
+        alto = max(alto, _incrustar(pdf, superponer_heatmap(img, entrada.heatmap), directorio, 110, y, 90))
+    pdf.set_y(y + alto + 4)
+
+    if entrada.top:
+        pdf.set_font("Arial", "B", 11)
+        pdf.cell(130, 8, "Clase", border=1)
+        pdf.cell(40, 8, "Probabilidad", border=1, ln=True)
+        pdf.set_font("Arial", size=11)
+        for nombre, probabilidad in entrada.top:
+            pdf.cell(130, 7, _texto(nombre), border=1)
+            pdf.cell(40, 7, f"{probabilidad * 100:.2f}%", border=1, ln=True)
+    if entrada.url:
+        pdf.ln(2)
+        pdf.multi_cell(0, 7, _texto(f"Wikipedia: {entrada.url}"))
+
+
+def escribir_informe(entradas, destino):
+    """Escribe en `destino` un PDF con una página por entrada (`entradas` puede ser un generador)."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    with tempfile.TemporaryDirectory(prefix="informe-") as directorio:
+        for entrada in entradas:
+            _pagina(pdf, entrada, directorio)
+    pdf.output(destino)
+    return destino
+
+
+def escribir_informes(entradas, destino, paginas=PAGINAS_MAX):
+    """
+    Escribe `entradas` en PDFs de como mucho `paginas` páginas y devuelve sus rutas.
+    Si caben en uno, es `destino`; si no, <destino>-001.pdf, <destino>-002.pdf, ...
+    """
+    base, extension = os.path.splitext(destino)
+    entradas = iter(entradas)
+    rutas = []
+    # Se consume el generador de parte en parte, sin adelantar más que una entrada
+    for primera in entradas:
+        ruta = f"{base}-{len(rutas) + 1:03d}{extension}"
+        escribir_informe(itertools.chain([primera], itertools.islice(entradas, paginas - 1)), ruta)
+        rutas.append(ruta)
+    if len(rutas) == 1:
+        os.replace(rutas[0], destino)
+        rutas = [destino]
+    return rutas
+
+
+_ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reportes")
+_generados = deque()
+_lock = threading.Lock()
+
+
+def generar_async(entradas):
+    """Future con la ruta de un PDF temporal con `entradas`; se conservan los MAX_GENERADOS más recientes."""
+    fd, ruta = tempfile.mkstemp(prefix="informe-", suffix=".pdf")
+    os.close(fd)
+    with _lock:
+        _generados.append(ruta)
+        while len(_generados) > MAX_GENERADOS:
+            antiguo = _generados.popleft()
+            if os.path.exists(antiguo):
+                os.remove(antiguo)
+    return _ejecutor.submit(escribir_informe, entradas, ruta)
@@ -0,0 +1,47 @@
+"""
+Posprocesado de las probabilidades: las k clases más probables y su tabla.
+
+`top_k` usa selección parcial (argpartition, O(C)) sobre la matriz de
+probabilidades (N, C) de todo el lote y solo ordena las k elegidas, en lugar
+de ordenar las C clases de cada fila. Los nombres salen del array de
+`utils.etiquetas.nombres` con indexado vectorizado, y `mostrar_top` pinta el
+resultado con una sola llamada a Streamlit en vez de un `st.write` y un
+`st.progress` por fila.
+"""
+import numpy as np
+
+from utils.etiquetas import nombres
+
+
+def top_k(probabilidades, k=5):
+    """
+    probabilidades: (N, C) o (C,)
+    Devuelve (indices, valores), ambos (N, k), de mayor a menor probabilidad.
+    """
+    p = np.atleast_2d(probabilidades)
+    k = min(k, p.shape[1])
+    indices = np.argpartition(p, -k, axis=1)[:, -k:]
+    valores = np.take_along_axis(p, indices, axis=1)
+    orden = np.argsort(-valores, axis=1)
+    return np.take_along_axis(indices, orden, axis=1), np.take_along_axis(valores, orden, axis=1)
+
+
+def top_k_nombres(modelo, probabilidades, k=5, idioma="es"):
+    """(nombres, indices, valores) de las k clases más probables de cada fila."""
+    indices, valores = top_k(probabilidades, k)
+    return nombres(modelo, idioma)[indices], indices, valores
+
+
+def mostrar_top(modelo, probabilidades, k=5, idioma="es"):
+    """Tabla con barra de probabilidad de las k clases más probables de la primera fila."""
+    import streamlit as st
+
+    etiquetas, _, valores = top_k_nombres(modelo, probabilidades, k, idioma)
+    st.dataframe(
+        {"Clase": etiquetas[0].tolist(), "Probabilidad": (valores[0] * 100).tolist()},
+        column_config={
+            "Probabilidad": st.column_config.ProgressColumn(format="%.2f%%", min_value=0, max_value=100),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
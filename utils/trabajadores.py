@@ -0,0 +1,180 @@
+"""
+Pool local de procesos de inferencia, fuera de los procesos de Streamlit.
+
+Sin el pool, cada proceso de app carga su propio TensorFlow y su copia de
+cada modelo, y la inferencia compite por el GIL con los hilos que reejecutan
+los scripts. Con el pool (`python -m herramientas.servidor_modelos`), N
+procesos cargan los modelos y las apps solo les mandan lotes ya
+preprocesados; la inferencia escala con los núcleos y no con el número de
+procesos de interfaz.
+
+Protocolo, una conexión por petición al socket Unix PROYECTOS_SOCKET_MODELOS:
+
+1. La app crea un bloque de `multiprocessing.shared_memory` con sitio para el
+   lote (N, alto, ancho, 3) float32 y para la salida (N, hasta SALIDAS_MAX)
+   float32, y copia el lote dentro.
+2. Manda una línea JSON {"modelo", "memoria", "forma"}: solo metadatos, los
+   tensores no pasan por el socket ni por pickle.
+3. El proceso del pool lee el lote del bloque sin copiarlo, escribe las
+   probabilidades a continuación y responde {"forma"} o {"error"}.
+4. La app copia la salida (unos KB) y libera el bloque.
+
+Todos los procesos del pool hacen accept() sobre el mismo socket (creado
+antes del fork), así que el núcleo reparte las peticiones entre los libres.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+SOCKET = os.environ.get("PROYECTOS_SOCKET_MODELOS", "")
+# Mayor número de salidas de un modelo (ImageNet): reserva de la salida por imagen
+SALIDAS_MAX = 1000
+TIMEOUT_S = 60.0
+
+log = logging.getLogger(__name__)
+
+
+def _adjuntar(nombre):
+    # Quien adjunta no es el dueño del bloque: no debe quedar registrado en su
+    # resource_tracker, que lo borraría (o avisaría de una fuga) al salir
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        # Python < 3.13
+        memoria = shared_memory.SharedMemory(name=nombre)
+        resource_tracker.unregister(memoria._name, "shared_memory")
+        return memoria
+
+
+# --- Cliente (procesos de las apps) ---
+
+def _pedir(peticion, ruta):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conexion:
+        conexion.settimeout(TIMEOUT_S)
+        conexion.connect(ruta)
+        with conexion.makefile("rwb") as f:
+            f.write(json.dumps(peticion).encode() + b"\n")
+            f.flush()
+            linea = f.readline()
+    if not linea:
+        raise ConnectionError("El pool de modelos cerró la conexión sin responder")
+    return json.loads(linea)
+
+
+def predecir(nombre, lote, ruta=None):
+    """Como `utils.lotes.predecir`, pero en un proceso del pool; `lote` viaja por memoria compartida."""
+    lote = np.asarray(lote, dtype=np.float32)
+    memoria = shared_memory.SharedMemory(create=True, size=lote.nbytes + len(lote) * SALIDAS_MAX * 4)
+    try:
+        entrada = np.ndarray(lote.shape, np.float32, memoria.buf)
+        entrada[:] = lote
+        del entrada
+        respuesta = _pedir({"modelo": nombre, "memoria": memoria.name, "forma": lote.shape}, ruta or SOCKET)
+        if "error" in respuesta:
+            raise RuntimeError(f"Pool de modelos ({nombre}): {respuesta['error']}")
+        salida = np.ndarray(respuesta["forma"], np.float32, memoria.buf, offset=lote.nbytes)
+        resultado = salida.copy()
+        del salida
+        return resultado
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+# --- Procesos del pool ---
+
+def _atender(conexion):
+    with conexion, conexion.makefile("rwb") as f:
+        linea = f.readline()
+        if not linea:
+            return
+        peticion = json.loads(linea)
+        memoria = _adjuntar(peticion["memoria"])
+        lote = salida = None
+        try:
+            # Importado aquí: el proceso padre del pool nunca carga TensorFlow
+            from utils.modelos import funcion_inferencia
+
+            forma = tuple(peticion["forma"])
+            lote = np.ndarray(forma, np.float32, memoria.buf)
+            resultado = np.asarray(funcion_inferencia(peticion["modelo"], forma[1:3])(lote), dtype=np.float32)
+            if resultado.size > forma[0] * SALIDAS_MAX:
+                raise ValueError(f"{resultado.shape[1:]} salidas por imagen, más de SALIDAS_MAX ({SALIDAS_MAX})")
+            salida = np.ndarray(resultado.shape, np.float32, memoria.buf, offset=lote.nbytes)
+            salida[:] = resultado
+            respuesta = {"forma": resultado.shape}
+        except Exception as e:
+            log.exception("Error en la petición %s", peticion.get("modelo"))
+            respuesta = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            del lote, salida
+            memoria.close()
+        f.write(json.dumps(respuesta).encode() + b"\n")
+
+
+def _trabajador(servidor, modelos):
+    # Ctrl+C llega a todo el grupo: el que se encarga de parar es el padre, con SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    from utils.modelos import registro
+
+    for nombre in modelos:
+        registro.obtener(nombre)
+    log.info("Proceso %d listo con %s", os.getpid(), ", ".join(modelos) or "ningún modelo precargado")
+    while True:
+        conexion, _ = servidor.accept()
+        try:
+            _atender(conexion)
+        except OSError:
+            # La app cerró la conexión (p. ej. por timeout): se sigue con la siguiente
+            log.warning("Conexión cerrada por la app antes de responder")
+
+
+def _parar(*_):
+    raise KeyboardInterrupt
+
+
+def iniciar_pool(ruta, procesos, modelos=()):
+    """
+    Abre el socket Unix `ruta` y mantiene `procesos` procesos que lo atienden,
+    cada uno con `modelos` precargados; reemplaza los que mueran. Bloquea hasta SIGINT/SIGTERM.
+    """
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    servidor.bind(ruta)
+    servidor.listen(128)
+
+    # fork: los procesos heredan el socket ya abierto; el padre no ha importado TensorFlow
+    contexto = multiprocessing.get_context("fork")
+
+    def _lanzar():
+        proceso = contexto.Process(target=_trabajador, args=(servidor, tuple(modelos)), daemon=True)
+        proceso.start()
+        return proceso
+
+    pool = [_lanzar() for _ in range(procesos)]
+    signal.signal(signal.SIGTERM, _parar)
+    try:
+        while True:
+            time.sleep(1.0)
+            for i, proceso in enumerate(pool):
+                if not proceso.is_alive():
+                    log.warning("El proceso %d del pool terminó (código %s); se reemplaza", proceso.pid, proceso.exitcode)
+                    pool[i] = _lanzar()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proceso in pool:
+            proceso.terminate()
+        for proceso in pool:
+            proceso.join()
+        servidor.close()
+        os.remove(ruta)
@@ -0,0 +1,161 @@
+"""
+Información de Wikipedia para las etiquetas de los modelos.
+
+La consulta a Wikipedia era la parte más lenta (y la que más fallaba) de cada
+clasificación. Ahora se sirve desde un almacén local en SQLite con una fila
+por (idioma, nombre), llenado de antemano con
+`python -m herramientas.prefetch_wikipedia`. Si falta una etiqueta, la
+consulta en línea se hace en un hilo aparte (`obtener_info_async`) y se
+guarda para la siguiente vez, sin bloquear el pintado de la predicción.
+Si el directorio no admite escritura, el almacén se usa en solo lectura (o,
+si no existe, todas las consultas van en línea y no se guardan).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+RUTA_DB = os.environ.get("PROYECTOS_WIKI_DB", "datos/wikipedia.sqlite")
+IDIOMAS = ("es", "en")
+
+log = logging.getLogger(__name__)
+
+# wikipedia.set_lang cambia una variable global del paquete: las consultas se serializan
+_lock_wikipedia = threading.Lock()
+
+
+def _info_pagina(page, alternativo=False):
+    resumen = page.summary[:1000]
+    return {
+        "titulo": page.title,
+        "resumen": f"(Resultado alternativo)\n\n{resumen}..." if alternativo else resumen + "...",
+        "url": page.url,
+        "imagenes": [img for img in page.images if img.lower().endswith(('.jpg', '.jpeg', '.png'))][:3]
+    }
+
+
+def consultar(nombre, idioma="es"):
+    """Consulta en línea. Devuelve el dict de información o None si no hay artículo."""
+    # Solo hace falta para consultar en línea: las apps leen del almacén sin importarlo
+    import wikipedia
+
+    with _lock_wikipedia:
+        wikipedia.set_lang(idioma)
+        try:
+            return _info_pagina(wikipedia.page(nombre, auto_suggest=True))
+        except wikipedia.exceptions.DisambiguationError as e:
+            try:
+                return _info_pagina(wikipedia.page(e.options[0]), alternativo=True)
+            except Exception:
+                return None
+        except wikipedia.exceptions.PageError:
+            return None
+
+
+class AlmacenWiki:
+    def __init__(self, ruta=RUTA_DB):
+        # La base se abre con la primera búsqueda, no al importar el módulo
+        self.ruta = ruta
+        self._db = None
+        self._abierto = False
+        self.solo_lectura = False
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _conexion(self):
+        # Se llama con el lock tomado. En un despliegue de solo lectura se abre el
+        # almacén ya llenado sin escribir en él; si no existe, todo va en línea (None)
+        if not self._abierto:
+            self._abierto = True
+            try:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                db = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None)
+                db.execute("PRAGMA journal_mode=WAL")
+                # datos = NULL: se consultó y Wikipedia no tiene artículo
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS articulos ("
+                    "idioma TEXT NOT NULL, nombre TEXT NOT NULL, datos TEXT, PRIMARY KEY (idioma, nombre))"
+                )
+                self._db = db
+            except (OSError, sqlite3.Error) as e:
+                try:
+                    db = sqlite3.connect(f"file:{self.ruta}?mode=ro", uri=True, check_same_thread=False)
+                    db.execute("SELECT 1 FROM articulos LIMIT 1")
+                    self._db = db
+                    self.solo_lectura = True
+                    log.warning("Almacén de Wikipedia de solo lectura (%s): %s", self.ruta, e)
+                except sqlite3.Error:
+                    log.warning("Sin almacén de Wikipedia (%s), solo consultas en línea: %s", self.ruta, e)
+        return self._db
+
+    def buscar(self, nombre, idioma):
+        """(encontrado, info): `encontrado` es False si la etiqueta nunca se ha consultado."""
+        with self._lock:
+            if self._conexion() is None:
+                self.fallos += 1
+                return False, None
+            fila = self._db.execute(
+                "SELECT datos FROM articulos WHERE idioma = ? AND nombre = ?", (idioma, nombre)
+            ).fetchone()
+            if fila is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        if fila is None:
+            return False, None
+        return True, json.loads(fila[0]) if fila[0] is not None else None
+
+    def guardar(self, nombre, idioma, info):
+        with self._lock:
+            if self._conexion() is None or self.solo_lectura:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO articulos (idioma, nombre, datos) VALUES (?, ?, ?)",
+                (idioma, nombre, json.dumps(info, ensure_ascii=False) if info is not None else None),
+            )
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            }
+
+
+almacen = AlmacenWiki()
+_ejecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="wikipedia")
+
+
+def actualizar(nombre, idioma):
+    """Consulta en línea y guarda el resultado en el almacén."""
+    try:
+        info = consultar(nombre, idioma)
+    except Exception:
+        # Errores de red: no se guarda nada para volver a intentarlo la próxima vez
+        log.exception("Error al consultar Wikipedia (%s, %s)", idioma, nombre)
+        return None
+    almacen.guardar(nombre, idioma, info)
+    return info
+
+
+def obtener_info_async(nombre, idioma="es"):
+    """Future con la información de `nombre`; ya resuelto si está en el almacén local."""
+    encontrado, info = almacen.buscar(nombre, idioma)
+    if encontrado:
+        futuro = Future()
+        futuro.set_result(info)
+        return futuro
+    return _ejecutor.submit(actualizar, nombre, idioma)
+
+
+def esperar_info(futuro, timeout=10):
+    """Resultado de `obtener_info_async` o None si no llega a tiempo."""
+    try:
+        return futuro.result(timeout=timeout)
+    except Exception:
+        return None